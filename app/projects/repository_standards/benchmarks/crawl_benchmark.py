@@ -0,0 +1,226 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import tracemalloc
+from dataclasses import asdict, dataclass
+from time import perf_counter
+
+import requests
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.projects.repository_standards.benchmarks.github_replay_server import (
+    GitHubReplayServer,
+    synthetic_routes,
+)
+from app.projects.repository_standards.services.github_service import (
+    INGESTION_MODES,
+    GithubService,
+)
+
+logger = logging.getLogger(__name__)
+
+ORG = "ministryofjustice"
+
+# The most calls to each per-repository endpoint the crawl may make per repository.
+# Per-repository endpoints left out may not be called at all, so a crawl that starts
+# completing listed repositories one `GET /repos/{org}/{repo}` at a time fails the
+# benchmark. Organisation-wide endpoints are reported but not budgeted.
+CALL_BUDGET = {
+    "GET /repos/{org}/{repo}/branches/{branch}/protection": 1,
+    "GET /repos/{org}/{repo}/rules/branches/{branch}": 1,
+    "GET /repos/{org}/{repo}/rulesets/{id}": 1,
+}
+
+
+class CallBudgetExceeded(Exception):
+    pass
+
+
+@dataclass
+class CrawlBenchmarkResult:
+    repository_count: int
+    ingestion_mode: str
+    crawl_workers: int
+    latency_ms: float
+    wall_time_seconds: float
+    api_calls: int
+    api_calls_per_repository: float
+    peak_memory_mb: float
+    calls_by_endpoint: dict
+    api_calls_per_repository_by_endpoint: dict
+
+
+def generate_private_key() -> str:
+    """The replay server accepts any JWT, but it still has to be signed."""
+    return (
+        rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        .private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+        .decode()
+    )
+
+
+def get_calls_over_budget(
+    api_calls_per_repository_by_endpoint: dict, call_budget: dict
+) -> dict:
+    return {
+        endpoint: calls
+        for endpoint, calls in api_calls_per_repository_by_endpoint.items()
+        if "{repo}" in endpoint and calls > call_budget.get(endpoint, 0)
+    }
+
+
+def serve_replay(connection, repository_count: int, latency: float) -> None:
+    server = GitHubReplayServer(synthetic_routes(ORG, repository_count), latency=latency)
+    connection.send(server.base_url)
+    server.serve_forever()
+
+
+def run_crawl_benchmark(
+    repository_count: int,
+    ingestion_mode: str = "rest",
+    crawl_workers: int = 8,
+    latency_ms: float = 0,
+    private_key: str | None = None,
+    call_budget: dict | None = CALL_BUDGET,
+) -> CrawlBenchmarkResult:
+    """
+    Crawls a synthetic organisation served by a replay server in its own process, so
+    the peak memory measured is the crawl's alone.
+
+    Raises `CallBudgetExceeded` if any per-repository endpoint is called more often
+    per repository than `call_budget` allows. Pass `None` to only report the calls.
+    """
+    context = multiprocessing.get_context("spawn")
+    parent_connection, child_connection = context.Pipe()
+    server_process = context.Process(
+        target=serve_replay,
+        args=(child_connection, repository_count, latency_ms / 1000),
+        daemon=True,
+    )
+    server_process.start()
+    try:
+        base_url = parent_connection.recv()
+        github_service = GithubService(
+            "benchmark",
+            private_key or generate_private_key(),
+            1,
+            ingestion_mode=ingestion_mode,
+            crawl_workers=crawl_workers,
+            base_url=base_url,
+        )
+
+        tracemalloc.start()
+        started_at = perf_counter()
+        repositories = github_service.get_repositories(limit=repository_count)
+        wall_time_seconds = perf_counter() - started_at
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        stats = requests.get(f"{base_url}/_replay/stats", timeout=10).json()
+    finally:
+        server_process.terminate()
+        server_process.join()
+
+    crawled = max(1, len(repositories))
+    api_calls_per_repository_by_endpoint = {
+        endpoint: round(calls / crawled, 2)
+        for endpoint, calls in stats["by_endpoint"].items()
+    }
+    if call_budget is not None:
+        over_budget = get_calls_over_budget(
+            api_calls_per_repository_by_endpoint, call_budget
+        )
+        if over_budget:
+            raise CallBudgetExceeded(
+                f"[ {ingestion_mode} ] crawl of [ {repository_count} ] repositories went over the call budget per repository: {over_budget}"
+            )
+
+    return CrawlBenchmarkResult(
+        repository_count=repository_count,
+        ingestion_mode=ingestion_mode,
+        crawl_workers=crawl_workers,
+        latency_ms=latency_ms,
+        wall_time_seconds=round(wall_time_seconds, 2),
+        api_calls=stats["requests"],
+        api_calls_per_repository=round(stats["requests"] / crawled, 2),
+        peak_memory_mb=round(peak_memory / 1024 / 1024, 1),
+        calls_by_endpoint=stats["by_endpoint"],
+        api_calls_per_repository_by_endpoint=api_calls_per_repository_by_endpoint,
+    )
+
+
+def main(
+    sizes: list[int],
+    ingestion_modes: list[str],
+    crawl_workers: int,
+    latency_ms: float,
+    output: str | None = None,
+    call_budget: dict | None = CALL_BUDGET,
+):
+    private_key = generate_private_key()
+    results = []
+    for ingestion_mode in ingestion_modes:
+        for repository_count in sizes:
+            logger.info(
+                f"Benchmarking [ {ingestion_mode} ] crawl of [ {repository_count} ] repositories..."
+            )
+            result = run_crawl_benchmark(
+                repository_count,
+                ingestion_mode,
+                crawl_workers,
+                latency_ms,
+                private_key,
+                call_budget,
+            )
+            logger.info(
+                f"[ {ingestion_mode} ] [ {repository_count} ] repositories: wall time [ {result.wall_time_seconds}s ], API calls [ {result.api_calls} ], per repository [ {result.api_calls_per_repository} ], peak memory [ {result.peak_memory_mb} MB ]"
+            )
+            results.append(result)
+
+    if output:
+        with open(output, "w") as output_file:
+            json.dump([asdict(result) for result in results], output_file, indent=2)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    # The crawl logs every repository, which would drown out the results
+    logging.getLogger("app.projects.repository_standards.services").setLevel(
+        logging.WARNING
+    )
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100, 1500, 10000]
+    )
+    parser.add_argument(
+        "--modes", nargs="+", choices=INGESTION_MODES, default=["rest"]
+    )
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument(
+        "--latency-ms",
+        type=float,
+        default=50,
+        help="Delay added to every response, roughly that of the real API",
+    )
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument(
+        "--no-call-budget",
+        action="store_true",
+        help="Report the calls per repository without failing on the call budget",
+    )
+    args = parser.parse_args()
+
+    main(
+        args.sizes,
+        args.modes,
+        args.workers,
+        args.latency_ms,
+        args.output,
+        None if args.no_call_budget else CALL_BUDGET,
+    )
@@ -0,0 +1,454 @@
+import argparse
+import json
+import logging
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import sleep, time
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from app.projects.repository_standards.clients.github_api_metrics import (
+    get_endpoint_template,
+)
+
+logger = logging.getLogger(__name__)
+
+Routes = Dict[Tuple[str, str], Any]
+
+
+def synthetic_routes(
+    org: str, repository_count: int, team_count: int | None = None
+) -> Routes:
+    """
+    Responses for an organisation of `repository_count` repositories that exercise
+    every branch of the crawl: archived and forked repositories, repositories with
+    and without branch protection and rulesets, and a two level team hierarchy.
+
+    As on GitHub, the repository listing leaves out `delete_branch_on_merge`, which
+    is only returned when a repository is fetched on its own.
+    """
+    team_count = team_count or max(1, repository_count // 25)
+    team_slugs = [f"team-{number:04d}" for number in range(team_count)]
+    routes: Routes = {
+        ("POST", "/app/installations/1/access_tokens"): {
+            "token": "replay-token",
+            "expires_at": "2099-01-01T00:00:00Z",
+        },
+        ("GET", f"/orgs/{org}"): {"login": org, "url": f"/orgs/{org}"},
+        ("GET", f"/orgs/{org}/teams"): [
+            {
+                "slug": slug,
+                "parent": {"slug": team_slugs[0]} if number % 5 else None,
+            }
+            for number, slug in enumerate(team_slugs)
+        ],
+        ("GET", f"/orgs/{org}/rulesets"): [{"id": 1}, {"id": 2}],
+        ("GET", f"/orgs/{org}/rulesets/1"): {
+            "id": 1,
+            "enforcement": "active",
+            "bypass_actors": [{"actor_id": 1}],
+        },
+        ("GET", f"/orgs/{org}/rulesets/2"): {
+            "id": 2,
+            "enforcement": "evaluate",
+            "bypass_actors": [],
+        },
+    }
+
+    listing = []
+    team_repositories = {slug: [] for slug in team_slugs}
+    for number in range(repository_count):
+        name = f"repository-{number:05d}"
+        repository = {
+            "name": name,
+            "url": f"/repos/{org}/{name}",
+            "visibility": "public",
+            "description": f"Synthetic repository {number}",
+            "default_branch": "main",
+            "license": {"key": "mit"} if number % 2 else None,
+            "archived": number % 40 == 0,
+            "fork": number % 50 == 1,
+            "pushed_at": "2026-01-01T00:00:00Z",
+            "updated_at": "2026-01-01T00:00:00Z",
+            "security_and_analysis": {
+                "secret_scanning": {"status": "enabled"},
+                "secret_scanning_push_protection": {
+                    "status": "enabled" if number % 3 else "disabled"
+                },
+            },
+        }
+        listing.append(repository)
+        routes[("GET", f"/repos/{org}/{name}")] = {
+            **repository,
+            "delete_branch_on_merge": number % 2 == 0,
+        }
+        if number % 3 == 0:
+            routes[("GET", f"/repos/{org}/{name}/branches/main/protection")] = {
+                "enforce_admins": {"enabled": True},
+                "required_pull_request_reviews": {
+                    "required_approving_review_count": 1
+                },
+            }
+        rules = []
+        if number % 2 == 0:
+            rules.append(
+                {
+                    "type": "pull_request",
+                    "ruleset_id": 1,
+                    "ruleset_source_type": "Organization",
+                    "parameters": {"required_approving_review_count": 2},
+                }
+            )
+        if number % 4 == 0:
+            rules.append(
+                {
+                    "type": "required_signatures",
+                    "ruleset_id": 2,
+                    "ruleset_source_type": "Organization",
+                }
+            )
+        routes[("GET", f"/repos/{org}/{name}/rules/branches/main")] = rules
+
+        roles = {team_slugs[(number * 7 + 1) % team_count]: "pull"}
+        roles[team_slugs[number % team_count]] = "admin" if number % 2 else "maintain"
+        for slug, role_name in roles.items():
+            team_repositories[slug].append({"name": name, "role_name": role_name})
+        routes[("GET", f"/repos/{org}/{name}/teams")] = [
+            {"slug": slug, "permission": role_name}
+            for slug, role_name in roles.items()
+        ]
+
+    routes[("GET", f"/orgs/{org}/repos")] = listing
+    for slug, repositories in team_repositories.items():
+        routes[("GET", f"/orgs/{org}/teams/{slug}/repos")] = repositories
+    return routes
+
+
+def load_recordings(path: str) -> Routes:
+    """
+    Recorded responses are a JSON object of "METHOD /path" to response body, and
+    take precedence over synthetic ones.
+    """
+    with open(path) as recordings_file:
+        recordings = json.load(recordings_file)
+    return {
+        tuple(key.split(" ", 1)): body for key, body in recordings.items()
+    }
+
+
+class GitHubReplayServer:
+    """
+    Serves recorded or synthetic GitHub REST and GraphQL responses, so the crawl can
+    be run and tuned locally without spending real rate limit. Point `GithubService`
+    at `base_url` to use it.
+
+    Each response is delayed by `latency` seconds and carries rate limit headers
+    counting down from `rate_limit` per `rate_limit_window` seconds; once they run
+    out, requests are refused with a 403 until the window resets.
+    """
+
+    def __init__(
+        self,
+        routes: Routes,
+        org: str = "ministryofjustice",
+        latency: float = 0,
+        rate_limit: int = 1_000_000,
+        rate_limit_window: int = 3600,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.routes = routes
+        self.org = org
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.rate_limit_window = rate_limit_window
+        self.request_counts: Counter = Counter()
+        self.__remaining = rate_limit
+        self.__reset_at = time() + rate_limit_window
+        self.__lock = threading.Lock()
+        self.__server = ThreadingHTTPServer((host, port), self.__handler_class())
+        self.__server.daemon_threads = True
+        self.__thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.__server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "GitHubReplayServer":
+        self.__thread = threading.Thread(
+            target=self.__server.serve_forever, name="github-replay", daemon=True
+        )
+        self.__thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self.__server.serve_forever()
+
+    def stop(self) -> None:
+        self.__server.shutdown()
+        self.__server.server_close()
+        if self.__thread:
+            self.__thread.join()
+
+    def __enter__(self) -> "GitHubReplayServer":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def stats(self) -> dict:
+        with self.__lock:
+            return {
+                "requests": sum(self.request_counts.values()),
+                "by_endpoint": dict(self.request_counts.most_common()),
+            }
+
+    def reset_stats(self) -> None:
+        with self.__lock:
+            self.request_counts.clear()
+
+    def respond(
+        self, method: str, path: str, query: dict, body: dict | None, host: str
+    ) -> Tuple[int, dict, Any]:
+        if path == "/_replay/stats":
+            return 200, {}, self.stats()
+        if path == "/_replay/reset":
+            self.reset_stats()
+            return 200, {}, {}
+
+        headers = self.__count(method, path)
+        if int(headers["X-RateLimit-Remaining"]) < 0:
+            headers["X-RateLimit-Remaining"] = "0"
+            return 403, headers, {"message": "API rate limit exceeded"}
+
+        if self.latency:
+            sleep(self.latency)
+
+        if method == "POST" and path == "/graphql":
+            return 200, headers, {"data": self.__graphql(body or {})}
+
+        if (method, path) not in self.routes:
+            return 404, headers, {"message": "Not Found"}
+        response = self.routes[(method, path)]
+        if not isinstance(response, list):
+            return 200, headers, response
+
+        per_page = int(query.get("per_page", ["30"])[0])
+        page = int(query.get("page", ["1"])[0])
+        items = response[(page - 1) * per_page : page * per_page]
+        if page * per_page < len(response):
+            next_query = urlencode(
+                {**{key: values[0] for key, values in query.items()}, "page": page + 1}
+            )
+            headers["Link"] = f'<http://{host}{path}?{next_query}>; rel="next"'
+        return 200, headers, items
+
+    def __count(self, method: str, path: str) -> dict:
+        with self.__lock:
+            self.request_counts[get_endpoint_template(method, path)] += 1
+            if time() >= self.__reset_at:
+                self.__remaining = self.rate_limit
+                self.__reset_at = time() + self.rate_limit_window
+            self.__remaining -= 1
+            return {
+                "X-RateLimit-Limit": str(self.rate_limit),
+                "X-RateLimit-Remaining": str(self.__remaining),
+                "X-RateLimit-Reset": str(int(self.__reset_at)),
+                "X-RateLimit-Resource": "graphql" if path == "/graphql" else "core",
+            }
+
+    def __graphql(self, body: dict) -> dict:
+        """Answers the queries `GitHubClient` sends, told apart by their root field."""
+        query = body.get("query", "")
+        variables = body.get("variables") or {}
+        offset = int(variables.get("cursor") or 0)
+
+        if "repository(owner:" in query:
+            repository = self.routes.get(
+                ("GET", f"/repos/{self.org}/{variables['name']}")
+            )
+            return {"repository": self.__graphql_repository(repository)}
+
+        if "team(slug:" in query:
+            repositories = self.routes.get(
+                ("GET", f"/orgs/{self.org}/teams/{variables['slug']}/repos"), []
+            )
+            return {
+                "organization": {
+                    "team": {
+                        "repositories": self.__graphql_team_repositories(
+                            repositories, offset
+                        )
+                    }
+                }
+            }
+
+        if "teams(first:" in query:
+            teams = self.routes.get(("GET", f"/orgs/{self.org}/teams"), [])
+            page = teams[offset : offset + 100]
+            return {
+                "organization": {
+                    "teams": {
+                        "pageInfo": self.__page_info(offset + 100, len(teams)),
+                        "nodes": [
+                            {
+                                "slug": team["slug"],
+                                "parentTeam": team.get("parent"),
+                                "repositories": self.__graphql_team_repositories(
+                                    self.routes.get(
+                                        (
+                                            "GET",
+                                            f"/orgs/{self.org}/teams/{team['slug']}/repos",
+                                        ),
+                                        [],
+                                    ),
+                                    0,
+                                ),
+                            }
+                            for team in page
+                        ],
+                    }
+                }
+            }
+
+        repositories = [
+            self.routes[("GET", f"/repos/{self.org}/{repository['name']}")]
+            for repository in self.routes.get(("GET", f"/orgs/{self.org}/repos"), [])
+        ]
+        page_size = int(variables.get("pageSize") or 50)
+        return {
+            "organization": {
+                "repositories": {
+                    "pageInfo": self.__page_info(offset + page_size, len(repositories)),
+                    "nodes": [
+                        self.__graphql_repository(repository)
+                        for repository in repositories[offset : offset + page_size]
+                    ],
+                }
+            }
+        }
+
+    def __graphql_repository(self, repository: dict | None) -> dict | None:
+        if repository is None:
+            return None
+        name = repository["name"]
+        branch = repository["default_branch"]
+        protection = self.routes.get(
+            ("GET", f"/repos/{self.org}/{name}/branches/{branch}/protection")
+        )
+        return {
+            "name": name,
+            "visibility": repository["visibility"].upper(),
+            "description": repository.get("description"),
+            "isArchived": repository["archived"],
+            "isFork": repository["fork"],
+            "deleteBranchOnMerge": repository.get("delete_branch_on_merge", False),
+            "licenseInfo": repository.get("license"),
+            "defaultBranchRef": {
+                "name": branch,
+                "branchProtectionRule": {
+                    "isAdminEnforced": protection["enforce_admins"]["enabled"],
+                    "allowsForcePushes": False,
+                    "requiresCommitSignatures": False,
+                    "dismissesStaleReviews": False,
+                    "requiresCodeOwnerReviews": False,
+                    "requireLastPushApproval": False,
+                    "requiredApprovingReviewCount": protection[
+                        "required_pull_request_reviews"
+                    ]["required_approving_review_count"],
+                }
+                if protection
+                else None,
+            },
+            "rulesets": {
+                "pageInfo": {"hasNextPage": False, "endCursor": None},
+                "nodes": [],
+            },
+        }
+
+    def __graphql_team_repositories(self, repositories: List[dict], offset: int) -> dict:
+        return {
+            "pageInfo": self.__page_info(offset + 100, len(repositories)),
+            "edges": [
+                {
+                    "permission": repository["role_name"].upper(),
+                    "node": {"name": repository["name"]},
+                }
+                for repository in repositories[offset : offset + 100]
+            ],
+        }
+
+    def __page_info(self, end: int, total: int) -> dict:
+        return {"hasNextPage": end < total, "endCursor": str(end)}
+
+    def __handler_class(self):
+        replay_server = self
+
+        class ReplayHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Otherwise headers and body written separately stall on delayed ACKs
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                self.__respond("GET")
+
+            def do_POST(self):
+                self.__respond("POST")
+
+            def __respond(self, method: str):
+                content = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                url = urlsplit(self.path)
+                status, headers, body = replay_server.respond(
+                    method,
+                    url.path,
+                    parse_qs(url.query),
+                    json.loads(content) if content else None,
+                    self.headers.get("Host"),
+                )
+                content = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(content)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        return ReplayHandler
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--repositories",
+        type=int,
+        default=1500,
+        help="How many synthetic repositories to serve",
+    )
+    parser.add_argument(
+        "--recordings", help="Recorded responses served in place of synthetic ones"
+    )
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--rate-limit", type=int, default=5000)
+    parser.add_argument("--rate-limit-window-seconds", type=int, default=3600)
+    args = parser.parse_args()
+
+    routes = synthetic_routes("ministryofjustice", args.repositories)
+    if args.recordings:
+        routes.update(load_recordings(args.recordings))
+    server = GitHubReplayServer(
+        routes,
+        latency=args.latency_ms / 1000,
+        rate_limit=args.rate_limit,
+        rate_limit_window=args.rate_limit_window_seconds,
+        port=args.port,
+    )
+    logger.info(f"Serving GitHub replay at [ {server.base_url} ]")
+    server.serve_forever()
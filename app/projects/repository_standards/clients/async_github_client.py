@@ -0,0 +1,471 @@
+import asyncio
+import base64
+import gzip
+import json
+import logging
+import ssl
+from collections import deque
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Any, Dict, List
+from urllib.parse import unquote, urlencode, urljoin, urlsplit
+
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_environ_proxies, parse_header_links
+
+from app.projects.repository_standards.clients.github_api_metrics import (
+    GitHubApiMetrics,
+    get_github_api_metrics,
+)
+from app.projects.repository_standards.clients.github_client import GitHubApiError
+from app.projects.repository_standards.clients.github_rate_limit_governor import (
+    RateLimitGovernor,
+)
+from app.shared.services.github_app_auth_service import (
+    InstallationTokenBroker,
+    get_installation_token_broker,
+)
+from app.shared.services.http_transport import RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AsyncHttpResponse:
+    status_code: int
+    headers: CaseInsensitiveDict
+    content: bytes
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+    @property
+    def next_url(self) -> str | None:
+        for link in parse_header_links(self.headers.get("Link", "")):
+            if link.get("rel") == "next":
+                return link["url"]
+        return None
+
+
+class AsyncConnectionPool:
+    """
+    Keep-alive HTTP/1.1 connections to a single host over asyncio streams.
+
+    Requests beyond `max_connections` wait for a connection to become free, so many
+    coroutines can share a handful of connections without opening one each. A
+    request that fails on a reused connection is retried once on a new one, as the
+    server may have closed it while it sat idle.
+
+    `HTTPS_PROXY`/`HTTP_PROXY` and `NO_PROXY` are honoured as `requests` honours
+    them: HTTPS is tunnelled through the proxy with `CONNECT`, plain HTTP is sent to
+    the proxy with the absolute URL.
+    """
+
+    def __init__(self, base_url: str, max_connections: int = 10, timeout: float = 30):
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.is_tls = url.scheme == "https"
+        self.port = url.port or (443 if self.is_tls else 80)
+        self.host_header = url.netloc
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.connections_opened = 0
+        proxy = get_environ_proxies(base_url).get(url.scheme)
+        self.proxy = (
+            urlsplit(proxy if "://" in proxy else f"http://{proxy}") if proxy else None
+        )
+        self.__idle: deque[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = deque()
+        self.__available = asyncio.Semaphore(max_connections)
+
+    async def request(
+        self, method: str, target: str, headers: Dict[str, str], body: bytes = b""
+    ) -> AsyncHttpResponse:
+        async with self.__available:
+            if self.__idle:
+                try:
+                    return await self.__exchange(
+                        self.__idle.pop(), method, target, headers, body
+                    )
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    logger.debug("Idle connection was closed, reconnecting")
+            return await self.__exchange(
+                await self.__connect(), method, target, headers, body
+            )
+
+    async def __exchange(
+        self,
+        connection: tuple[asyncio.StreamReader, asyncio.StreamWriter],
+        method: str,
+        target: str,
+        headers: Dict[str, str],
+        body: bytes,
+    ) -> AsyncHttpResponse:
+        try:
+            response, keep_alive = await asyncio.wait_for(
+                self.__send(connection, method, target, headers, body), self.timeout
+            )
+        except BaseException:
+            connection[1].close()
+            raise
+        if keep_alive:
+            self.__idle.append(connection)
+        else:
+            connection[1].close()
+        return response
+
+    async def close(self) -> None:
+        while self.__idle:
+            _, writer = self.__idle.pop()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, ssl.SSLError):
+                pass
+
+    async def __connect(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        self.connections_opened += 1
+        if self.proxy:
+            return await asyncio.wait_for(self.__connect_through_proxy(), self.timeout)
+        return await asyncio.wait_for(
+            asyncio.open_connection(
+                self.host,
+                self.port,
+                ssl=ssl.create_default_context() if self.is_tls else None,
+            ),
+            self.timeout,
+        )
+
+    async def __connect_through_proxy(
+        self,
+    ) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        reader, writer = await asyncio.open_connection(
+            self.proxy.hostname,
+            self.proxy.port or (443 if self.proxy.scheme == "https" else 80),
+            ssl=ssl.create_default_context() if self.proxy.scheme == "https" else None,
+        )
+        if not self.is_tls:
+            return reader, writer
+
+        try:
+            authority = f"{self.host}:{self.port}"
+            lines = [f"CONNECT {authority} HTTP/1.1", f"Host: {authority}"]
+            lines.extend(
+                f"{name}: {value}" for name, value in self.__proxy_headers().items()
+            )
+            writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+            await writer.drain()
+            status_line = (await reader.readline()).decode("latin-1").strip()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            if status_line.split(" ")[1:2] != ["200"]:
+                raise ConnectionError(
+                    f"Proxy refused to tunnel to [ {authority} ]: {status_line}"
+                )
+            await writer.start_tls(
+                ssl.create_default_context(), server_hostname=self.host
+            )
+        except BaseException:
+            writer.close()
+            raise
+        return reader, writer
+
+    def __proxy_headers(self) -> Dict[str, str]:
+        if not self.proxy or not self.proxy.username:
+            return {}
+        credentials = (
+            f"{unquote(self.proxy.username)}:{unquote(self.proxy.password or '')}"
+        )
+        return {
+            "Proxy-Authorization": f"Basic {base64.b64encode(credentials.encode()).decode()}"
+        }
+
+    async def __send(
+        self,
+        connection: tuple[asyncio.StreamReader, asyncio.StreamWriter],
+        method: str,
+        target: str,
+        headers: Dict[str, str],
+        body: bytes,
+    ) -> tuple[AsyncHttpResponse, bool]:
+        reader, writer = connection
+        if self.proxy and not self.is_tls:
+            # Without a tunnel the proxy needs the whole URL
+            target = f"http://{self.host_header}{target}"
+            headers = {**headers, **self.__proxy_headers()}
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {self.host_header}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        lines.append(f"Content-Length: {len(body)}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed before a response was received")
+        version, status_code, *_ = status_line.decode("latin-1").split(" ", 2)
+
+        response_headers = CaseInsensitiveDict()
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip()] = value.strip()
+
+        keep_alive = (
+            version == "HTTP/1.1"
+            and response_headers.get("Connection", "").lower() != "close"
+        )
+        status_code = int(status_code)
+        if method == "HEAD" or status_code in (204, 304) or status_code < 200:
+            content = b""
+        elif "chunked" in response_headers.get("Transfer-Encoding", "").lower():
+            content = await self.__read_chunked(reader)
+        elif "Content-Length" in response_headers:
+            content = await reader.readexactly(int(response_headers["Content-Length"]))
+        else:
+            content = await reader.read()
+            keep_alive = False
+
+        if response_headers.get("Content-Encoding", "").lower() == "gzip":
+            content = gzip.decompress(content)
+        return AsyncHttpResponse(status_code, response_headers, content), keep_alive
+
+    async def __read_chunked(self, reader: asyncio.StreamReader) -> bytes:
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b";")[0].strip(), 16)
+            if size == 0:
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        # Skip any trailers up to the blank line that ends the message
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+        return b"".join(chunks)
+
+
+class AsyncGitHubClient:
+    """
+    An asyncio counterpart to `GitHubClient` for the REST endpoints used to enrich
+    repositories. Every request goes through one `AsyncConnectionPool`, so hundreds
+    of requests can be in flight over `max_connections` keep-alive connections.
+
+    The pool belongs to the event loop it was opened on, so the client is used as an
+    async context manager around each crawl.
+    """
+
+    def __init__(
+        self,
+        app_client_id: str,
+        app_private_key: str,
+        app_installation_id: int,
+        org: str,
+        base_url: str = "https://api.github.com",
+        max_connections: int = 10,
+        rate_limit_governor: RateLimitGovernor | None = None,
+        token_broker: InstallationTokenBroker | None = None,
+        api_metrics: GitHubApiMetrics | None = None,
+        retry_policy: RetryPolicy | None = None,
+    ):
+        self.org = org
+        self.base_url = base_url.rstrip("/")
+        self.app_client_id = app_client_id
+        self.app_private_key = app_private_key
+        self.app_installation_id = app_installation_id
+        self.max_connections = max_connections
+        self.rate_limit_governor = rate_limit_governor or RateLimitGovernor()
+        self.pool: AsyncConnectionPool | None = None
+        self.connections_opened = 0
+        self.api_metrics = api_metrics or get_github_api_metrics()
+        self.retry_policy = retry_policy or RetryPolicy("github")
+        self.token_broker = token_broker or get_installation_token_broker(
+            app_client_id, app_private_key, app_installation_id, self.base_url
+        )
+
+    async def __aenter__(self) -> "AsyncGitHubClient":
+        self.pool = AsyncConnectionPool(self.base_url, self.max_connections)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        logger.info(
+            f"Async GitHub client opened [ {self.pool.connections_opened} ] connections"
+        )
+        self.connections_opened += self.pool.connections_opened
+        await self.pool.close()
+        self.pool = None
+
+    async def __request(
+        self, method: str, url: str, params: Dict[str, Any] | None = None
+    ) -> AsyncHttpResponse:
+        # The broker may have to mint a token, a blocking call, so runs off the loop
+        token = await asyncio.to_thread(self.token_broker.get_token)
+        headers = {
+            "Accept": "application/vnd.github+json",
+            "Accept-Encoding": "gzip",
+            "Authorization": f"Bearer {token}",
+            "User-Agent": "github-community",
+        }
+        split_url = urlsplit(url)
+        query = "&".join(
+            part for part in [split_url.query, urlencode(params or {})] if part
+        )
+        target = f"{split_url.path}?{query}" if query else split_url.path
+
+        attempt = 1
+        while True:
+            delay = self.rate_limit_governor.reserve_slot("core")
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.retry_policy.before_attempt(attempt)
+            started_at = perf_counter()
+            try:
+                response = await self.pool.request(method, target, headers)
+            except (OSError, EOFError):
+                self.api_metrics.record(method, url, None, perf_counter() - started_at)
+                retry_delay = self.retry_policy.get_retry_delay(method, None, attempt)
+                if retry_delay is None:
+                    raise
+                await asyncio.sleep(retry_delay)
+                attempt += 1
+                continue
+            self.api_metrics.record(
+                method,
+                url,
+                response.status_code,
+                perf_counter() - started_at,
+                len(response.content),
+                response.headers,
+            )
+            self.rate_limit_governor.observe(response.headers)
+
+            retry_delay = self.retry_policy.get_retry_delay(
+                method, response.status_code, attempt, response.headers
+            )
+            if retry_delay is not None:
+                await asyncio.sleep(retry_delay)
+                attempt += 1
+                continue
+            if (
+                self.rate_limit_governor.get_retry_delay(
+                    response.status_code, response.headers, response.text, attempt
+                )
+                is None
+            ):
+                break
+            attempt += 1
+
+        if not response.ok:
+            raise GitHubApiError(
+                f"Error calling URL: [{url}], Status Code: [{response.status_code}], Response: {response.text}",
+                response.status_code,
+            )
+        return response
+
+    async def __call(self, method: str, path: str) -> Any:
+        """Internal request helper."""
+        return (await self.__request(method, f"{self.base_url}{path}")).json()
+
+    async def __paginate(
+        self, path: str, params: Dict[str, Any] | None = None
+    ) -> List[Dict[str, Any]]:
+        """Follows the `Link: rel="next"` headers of a REST list endpoint."""
+        results = []
+        url = f"{self.base_url}{path}"
+        params = {"per_page": 100, **(params or {})}
+        while url:
+            response = await self.__request("GET", url, params)
+            results.extend(response.json())
+            url = response.next_url and urljoin(url, response.next_url)
+            # The next link already carries the query string
+            params = None
+        return results
+
+    async def get_branch_rulesets(self, repo: str, branch: str) -> List[Dict[str, Any]]:
+        """
+        List branch rulesets for a given repository.
+        Docs: https://docs.github.com/en/rest/repos/rules?apiVersion=2022-11-28#list-repository-rulesets
+        """
+        return await self.__call(
+            "GET", f"/repos/{self.org}/{repo}/rules/branches/{branch}"
+        )
+
+    async def get_branch_protection(self, repo: str, branch: str) -> Dict[str, Any]:
+        """
+        Get branch protection for a branch.
+        Docs: https://docs.github.com/en/rest/branches/branch-protection?apiVersion=2022-11-28#get-branch-protection
+        """
+        return await self.__call(
+            "GET", f"/repos/{self.org}/{repo}/branches/{branch}/protection"
+        )
+
+    async def get_repository_teams(self, repo: str) -> List[Dict[str, Any]]:
+        """
+        List the teams with access to a repository.
+        Docs: https://docs.github.com/en/rest/repos/repos?apiVersion=2022-11-28#list-repository-teams
+        """
+        return await self.__paginate(f"/repos/{self.org}/{repo}/teams")
+
+    async def get_team_repositories(self, team_slug: str) -> List[Dict[str, Any]]:
+        """
+        List the repositories a team has access to, with the team's permission on each.
+        Docs: https://docs.github.com/en/rest/teams/teams?apiVersion=2022-11-28#list-team-repositories
+        """
+        return await self.__paginate(f"/orgs/{self.org}/teams/{team_slug}/repos")
+
+    async def get_organisation_rulesets(self) -> List[Dict[str, Any]]:
+        """
+        List the rulesets configured for the organisation.
+        Docs: https://docs.github.com/en/rest/orgs/rules?apiVersion=2022-11-28#get-all-organization-repository-rulesets
+        """
+        return await self.__paginate(f"/orgs/{self.org}/rulesets")
+
+    async def get_organisation_ruleset(self, ruleset_id: int) -> Dict[str, Any]:
+        """
+        Get an organisation ruleset, including its rules and bypass actors.
+        Docs: https://docs.github.com/en/rest/orgs/rules?apiVersion=2022-11-28#get-an-organization-repository-ruleset
+        """
+        return await self.__call("GET", f"/orgs/{self.org}/rulesets/{ruleset_id}")
+
+    async def get_organisation_teams(self) -> List[Dict[str, Any]]:
+        """
+        List every team in the organisation, including its parent.
+        Docs: https://docs.github.com/en/rest/teams/teams?apiVersion=2022-11-28#list-teams
+        """
+        return await self.__paginate(f"/orgs/{self.org}/teams")
+
+    async def get_repository_ruleset(
+        self, repo: str, ruleset_id: str
+    ) -> Dict[str, Any]:
+        """
+        Get a ruleset for a repository.
+        Docs: https://docs.github.com/en/rest/repos/rules?apiVersion=2022-11-28#get-a-repository-ruleset
+        """
+        return await self.__call(
+            "GET", f"/repos/{self.org}/{repo}/rulesets/{ruleset_id}"
+        )
+
+    async def get_repository(self, repo: str) -> Dict[str, Any]:
+        """
+        Get a repository.
+        Docs: https://docs.github.com/en/rest/repos/repos?apiVersion=2022-11-28#get-a-repository
+        """
+        return await self.__call("GET", f"/repos/{self.org}/{repo}")
+
+    async def get_organisation_repositories(
+        self, repository_type: str = "public"
+    ) -> List[Dict[str, Any]]:
+        """
+        List repositories for the organisation.
+        Docs: https://docs.github.com/en/rest/repos/repos?apiVersion=2022-11-28#list-organization-repositories
+        """
+        return await self.__paginate(
+            f"/orgs/{self.org}/repos", {"type": repository_type}
+        )
@@ -0,0 +1,227 @@
+import logging
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping
+from urllib.parse import urlsplit
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Names and ids are collapsed so calls are counted per endpoint, not per repository
+ENDPOINT_PATTERNS = [
+    (re.compile(r"/repos/[^/]+/[^/]+"), "/repos/{org}/{repo}"),
+    (re.compile(r"/orgs/[^/]+"), "/orgs/{org}"),
+    (re.compile(r"/teams/[^/]+"), "/teams/{team}"),
+    # Branch names may contain slashes
+    (re.compile(r"/branches/.+?(?=/protection$|$)"), "/branches/{branch}"),
+    (re.compile(r"/\d+(?=/|$)"), "/{id}"),
+]
+
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+
+def get_endpoint_template(method: str, url: str) -> str:
+    path = urlsplit(url).path
+    for pattern, replacement in ENDPOINT_PATTERNS:
+        path = pattern.sub(replacement, path)
+    return f"{method} {path}"
+
+
+def get_status_class(status_code: int | None) -> str:
+    if status_code is None:
+        return "error"
+    # Revalidated cache entries are worth telling apart from other responses
+    if status_code == 304:
+        return "304"
+    return f"{status_code // 100}xx"
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+@dataclass
+class EndpointMetrics:
+    calls: int = 0
+    response_bytes: int = 0
+    status_classes: Counter = field(default_factory=Counter)
+    latencies: List[float] = field(default_factory=list)
+
+
+class GitHubApiMetrics:
+    """
+    Counts calls to the GitHub API by endpoint, with their latency, response size
+    and status, so it is clear which endpoints a crawl spends its time and rate
+    limit on.
+    """
+
+    def __init__(self):
+        self.endpoints: Dict[str, EndpointMetrics] = {}
+        self.rate_limit_remaining: Dict[str, int] = {}
+        self.__lock = threading.Lock()
+
+    def record(
+        self,
+        method: str,
+        url: str,
+        status_code: int | None,
+        elapsed_seconds: float,
+        response_bytes: int = 0,
+        headers: Mapping[str, str] | None = None,
+    ) -> None:
+        endpoint = get_endpoint_template(method, url)
+        remaining = (headers or {}).get("X-RateLimit-Remaining")
+        with self.__lock:
+            metrics = self.endpoints.setdefault(endpoint, EndpointMetrics())
+            metrics.calls += 1
+            metrics.response_bytes += response_bytes
+            metrics.status_classes[get_status_class(status_code)] += 1
+            metrics.latencies.append(elapsed_seconds)
+            if remaining is not None:
+                resource = headers.get("X-RateLimit-Resource", "core")
+                self.rate_limit_remaining[resource] = int(remaining)
+
+    def reset(self) -> None:
+        with self.__lock:
+            self.endpoints.clear()
+            self.rate_limit_remaining.clear()
+
+    def summary(self) -> dict:
+        with self.__lock:
+            total_calls = sum(metrics.calls for metrics in self.endpoints.values())
+            endpoints = {}
+            for endpoint, metrics in sorted(
+                self.endpoints.items(),
+                key=lambda item: sum(item[1].latencies),
+                reverse=True,
+            ):
+                latencies = sorted(metrics.latencies)
+                endpoints[endpoint] = {
+                    "calls": metrics.calls,
+                    "call_share": round(metrics.calls / total_calls, 3),
+                    "total_seconds": round(sum(latencies), 3),
+                    "p50_seconds": round(percentile(latencies, 0.5), 3),
+                    "p90_seconds": round(percentile(latencies, 0.9), 3),
+                    "p99_seconds": round(percentile(latencies, 0.99), 3),
+                    "response_bytes": metrics.response_bytes,
+                    "not_modified_rate": round(
+                        metrics.status_classes["304"] / metrics.calls, 3
+                    ),
+                    "client_error_rate": round(
+                        metrics.status_classes["4xx"] / metrics.calls, 3
+                    ),
+                    "server_error_rate": round(
+                        (metrics.status_classes["5xx"] + metrics.status_classes["error"])
+                        / metrics.calls,
+                        3,
+                    ),
+                }
+            return {
+                "calls": total_calls,
+                "endpoints": endpoints,
+                "rate_limit_remaining": dict(self.rate_limit_remaining),
+            }
+
+    def log_summary(self) -> None:
+        summary = self.summary()
+        logger.info(
+            f"GitHub API calls: [ {summary['calls']} ], rate limit remaining: [ {summary['rate_limit_remaining']} ]"
+        )
+        for endpoint, metrics in summary["endpoints"].items():
+            logger.info(
+                f"[ {endpoint} ] calls: [ {metrics['calls']} ], total: [ {metrics['total_seconds']}s ], p50/p90/p99: [ {metrics['p50_seconds']}s / {metrics['p90_seconds']}s / {metrics['p99_seconds']}s ], bytes: [ {metrics['response_bytes']} ], 304: [ {metrics['not_modified_rate']} ], 4xx: [ {metrics['client_error_rate']} ], 5xx: [ {metrics['server_error_rate']} ]"
+            )
+
+    def to_prometheus(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP github_api_requests_total GitHub API requests by endpoint and status.",
+            "# TYPE github_api_requests_total counter",
+        ]
+        with self.__lock:
+            endpoints = sorted(self.endpoints.items())
+            for endpoint, metrics in endpoints:
+                method, path = endpoint.split(" ", 1)
+                for status_class, count in sorted(metrics.status_classes.items()):
+                    lines.append(
+                        f'github_api_requests_total{{method="{method}",endpoint="{path}",status="{status_class}"}} {count}'
+                    )
+
+            lines += [
+                "# HELP github_api_request_duration_seconds GitHub API request latency.",
+                "# TYPE github_api_request_duration_seconds histogram",
+            ]
+            for endpoint, metrics in endpoints:
+                method, path = endpoint.split(" ", 1)
+                labels = f'method="{method}",endpoint="{path}"'
+                for bucket in LATENCY_BUCKETS:
+                    count = len(
+                        [latency for latency in metrics.latencies if latency <= bucket]
+                    )
+                    lines.append(
+                        f'github_api_request_duration_seconds_bucket{{{labels},le="{bucket}"}} {count}'
+                    )
+                lines += [
+                    f'github_api_request_duration_seconds_bucket{{{labels},le="+Inf"}} {metrics.calls}',
+                    f"github_api_request_duration_seconds_sum{{{labels}}} {sum(metrics.latencies)}",
+                    f"github_api_request_duration_seconds_count{{{labels}}} {metrics.calls}",
+                ]
+
+            lines += [
+                "# HELP github_api_response_bytes_total Bytes received from the GitHub API.",
+                "# TYPE github_api_response_bytes_total counter",
+            ]
+            for endpoint, metrics in endpoints:
+                method, path = endpoint.split(" ", 1)
+                lines.append(
+                    f'github_api_response_bytes_total{{method="{method}",endpoint="{path}"}} {metrics.response_bytes}'
+                )
+
+            lines += [
+                "# HELP github_api_rate_limit_remaining Requests left in the current rate limit window.",
+                "# TYPE github_api_rate_limit_remaining gauge",
+            ]
+            for resource, remaining in sorted(self.rate_limit_remaining.items()):
+                lines.append(
+                    f'github_api_rate_limit_remaining{{resource="{resource}"}} {remaining}'
+                )
+        return "\n".join(lines) + "\n"
+
+    def publish(
+        self,
+        textfile_path: str | None = None,
+        pushgateway_url: str | None = None,
+        job: str = "map_github_repositories_to_owners",
+    ) -> None:
+        """
+        Jobs do not live long enough to be scraped, so the metrics are left for the
+        node exporter's textfile collector or pushed to a Pushgateway instead.
+        """
+        exposition = self.to_prometheus()
+        if textfile_path:
+            with open(textfile_path, "w") as textfile:
+                textfile.write(exposition)
+        if pushgateway_url:
+            try:
+                requests.put(
+                    f"{pushgateway_url.rstrip('/')}/metrics/job/{job}",
+                    data=exposition.encode(),
+                    timeout=10,
+                ).raise_for_status()
+            except requests.RequestException as e:
+                logger.warning(f"Unable to push GitHub API metrics: {e}")
+
+
+__github_api_metrics = GitHubApiMetrics()
+
+
+def get_github_api_metrics() -> GitHubApiMetrics:
+    """The metrics shared by every GitHub client in this process."""
+    return __github_api_metrics
+
@@ -1,94 +1,30 @@
 import logging
-from calendar import timegm
-from time import gmtime, sleep, time
-from datetime import datetime, timezone, timedelta
-from typing import Any, Callable, Dict, List
+from typing import Any, Dict, Iterator, List
 
-import jwt
-import requests
-from github import RateLimitExceededException
+from app.projects.repository_standards.clients.github_api_metrics import (
+    GitHubApiMetrics,
+    get_github_api_metrics,
+)
+from app.projects.repository_standards.clients.github_rate_limit_governor import (
+    RateLimitGovernor,
+)
+from app.projects.repository_standards.clients.github_response_cache import (
+    GitHubResponse,
+    GitHubResponseCache,
+)
+from app.shared.services.github_app_auth_service import (
+    InstallationTokenBroker,
+    get_installation_token_broker,
+)
+from app.shared.services.http_transport import HttpTransport, RetryPolicy
 
 logger = logging.getLogger(__name__)
 
 
-def retries_github_rate_limit_exception_at_next_reset_once(func: Callable) -> Callable:
-    def decorator(*args, **kwargs):
-        """
-        A decorator to retry the method when rate limiting for GitHub resets if the method fails due to Rate Limit related exception.
-
-        WARNING: Since this decorator retries methods, ensure that the method being decorated is idempotent
-         or contains only one non-idempotent method at the end of a call chain to GitHub.
-
-         Example of idempotent methods are:
-            - Retrieving data
-         Example of (potentially) non-idempotent methods are:
-            - Deleting data
-            - Updating data
-        """
-        try:
-            return func(*args, **kwargs)
-        except RateLimitExceededException as exception:
-            logger.warning(
-                f"Caught {type(exception).__name__}, retrying calls when rate limit resets."
-            )
-            rate_limits = args[0].github_client_core_api.get_rate_limit()
-            rate_limit_to_use = (
-                rate_limits.core
-                if isinstance(exception, RateLimitExceededException)
-                else rate_limits.graphql
-            )
-
-            reset_timestamp = timegm(rate_limit_to_use.reset.timetuple())
-            now_timestamp = timegm(gmtime())
-            time_until_core_api_rate_limit_resets = (
-                (reset_timestamp - now_timestamp)
-                if reset_timestamp > now_timestamp
-                else 0
-            )
-
-            wait_time_buffer = 5
-            sleep(
-                time_until_core_api_rate_limit_resets + wait_time_buffer
-                if time_until_core_api_rate_limit_resets
-                else 0
-            )
-            return func(*args, **kwargs)
-
-    return decorator
-
-
-def create_installation_token(
-    app_id: str, private_key: str, installation_id: int
-) -> dict:
-    """
-    Create a GitHub App installation token.
-
-    Returns:
-        dict: { "token": str, "expires_at": datetime }
-    """
-    now_ts = int(time())
-    payload = {
-        "iat": now_ts,
-        "exp": now_ts + 600,  # max 10 minutes
-        "iss": app_id,
-    }
-    encoded_jwt = jwt.encode(payload, private_key, algorithm="RS256")
-
-    url = f"https://api.github.com/app/installations/{installation_id}/access_tokens"
-    headers = {
-        "Authorization": f"Bearer {encoded_jwt}",
-        "Accept": "application/vnd.github+json",
-    }
-    response = requests.post(url, headers=headers)
-    response.raise_for_status()
-    data = response.json()
-
-    return {
-        "token": data["token"],
-        "expires_at": datetime.strptime(
-            data["expires_at"], "%Y-%m-%dT%H:%M:%SZ"
-        ).replace(tzinfo=timezone.utc),
-    }
+class GitHubApiError(ValueError):
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
 
 
 class GitHubClient:
@@ -99,6 +35,12 @@ class GitHubClient:
         app_installation_id: int,
         org: str,
         base_url: str = "https://api.github.com",
+        rate_limit_governor: RateLimitGovernor | None = None,
+        pool_size: int = 10,
+        response_cache: GitHubResponseCache | None = None,
+        token_broker: InstallationTokenBroker | None = None,
+        api_metrics: GitHubApiMetrics | None = None,
+        retry_policy: RetryPolicy | None = None,
     ):
         self.org = org
         self.base_url = base_url.rstrip("/")
@@ -106,37 +48,136 @@ class GitHubClient:
         self.app_private_key = app_private_key
         self.app_installation_id = app_installation_id
 
-        self.__token = None
-        self.__token_expires_at = datetime.fromtimestamp(0, tz=timezone.utc)
+        self.token_broker = token_broker or get_installation_token_broker(
+            app_client_id, app_private_key, app_installation_id, self.base_url
+        )
+        self.rate_limit_governor = rate_limit_governor or RateLimitGovernor()
+        self.response_cache = response_cache
+        self.api_metrics = api_metrics or get_github_api_metrics()
 
-        self.session = requests.Session()
-        self.session.headers.update({"Accept": "application/vnd.github+json"})
+        self.transport = HttpTransport(
+            "github",
+            pool_size=pool_size,
+            retry_policy=retry_policy,
+            observer=self.api_metrics.record,
+        )
+        self.transport.session.headers.update(
+            {"Accept": "application/vnd.github+json"}
+        )
 
-    def __get_token(self) -> str:
-        now = datetime.now(timezone.utc)
-        if not self.__token or now >= self.__token_expires_at:
-            token_data = create_installation_token(
-                self.app_client_id,
-                self.app_private_key,
-                self.app_installation_id,
+    def __request(
+        self,
+        method: str,
+        url: str,
+        params: Dict[str, Any] | None = None,
+        idempotent: bool | None = None,
+        **kwargs,
+    ) -> GitHubResponse:
+        # Headers are passed per request as the session is shared between workers
+        headers = {"Authorization": f"Bearer {self.token_broker.get_token()}"}
+
+        cached = None
+        if self.response_cache and method == "GET":
+            cached = self.response_cache.get(url, params)
+            headers.update(self.response_cache.conditional_headers(cached))
+
+        resource = "graphql" if url.endswith("/graphql") else "core"
+        attempt = 1
+        while True:
+            self.rate_limit_governor.wait(resource)
+            # The transport retries transient failures, the governor rate limits
+            response = self.transport.request(
+                method,
+                url,
+                idempotent=idempotent,
+                params=params,
+                headers=headers,
+                **kwargs,
             )
-            self.__token = token_data["token"]
-            self.__token_expires_at = now + timedelta(minutes=55)
-        return self.__token
+            self.rate_limit_governor.observe(response.headers)
 
-    def __call(self, method: str, path: str, **kwargs) -> Any:
-        """Internal request helper."""
-        self.session.headers.update({"Authorization": f"Bearer {self.__get_token()}"})
+            retry_delay = self.rate_limit_governor.get_retry_delay(
+                response.status_code, response.headers, response.text, attempt
+            )
+            if retry_delay is None:
+                break
+            # The governor holds back every worker, including this one, for the delay
+            attempt += 1
 
-        url = f"{self.base_url}{path}"
-        response = self.session.request(method, url, **kwargs)
+        if cached and response.status_code == 304:
+            self.response_cache.record_hit()
+            if cached.status_code == 404:
+                raise GitHubApiError(
+                    f"Error calling URL: [{url}], Status Code: [404], Response: {cached.body}",
+                    404,
+                )
+            return cached
 
         if not response.ok:
-            raise ValueError(
-                f"Error calling URL: [{url}], Status Code: [{response.status_code}], Response: {response.text}"
+            # Most repositories have no branch protection, so the 404 saying so is
+            # cached like any other response and revalidated next time
+            if self.response_cache and method == "GET" and response.status_code == 404:
+                self.response_cache.record_miss()
+                self.response_cache.put(
+                    url,
+                    params,
+                    GitHubResponse(
+                        body=response.text,
+                        etag=response.headers.get("ETag"),
+                        last_modified=response.headers.get("Last-Modified"),
+                        status_code=404,
+                    ),
+                )
+            raise GitHubApiError(
+                f"Error calling URL: [{url}], Status Code: [{response.status_code}], Response: {response.text}",
+                response.status_code,
             )
 
-        return response.json()
+        result = GitHubResponse(
+            body=response.json(),
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            next_url=response.links.get("next", {}).get("url"),
+        )
+        if self.response_cache and method == "GET":
+            self.response_cache.record_miss()
+            self.response_cache.put(url, params, result)
+        return result
+
+    def __call(self, method: str, path: str, **kwargs) -> Any:
+        """Internal request helper."""
+        return self.__request(method, f"{self.base_url}{path}", **kwargs).body
+
+    def __paginate(
+        self, path: str, params: Dict[str, Any] | None = None
+    ) -> List[Dict[str, Any]]:
+        """Follows the `Link: rel="next"` headers of a REST list endpoint."""
+        results = []
+        url = f"{self.base_url}{path}"
+        params = {"per_page": 100, **(params or {})}
+        while url:
+            response = self.__request("GET", url, params=params)
+            results.extend(response.body)
+            url = response.next_url
+            # The next link already carries the query string
+            params = None
+        return results
+
+    def graphql(self, query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run a GraphQL query and return its `data`.
+        Docs: https://docs.github.com/en/graphql/guides/forming-calls-with-graphql
+        """
+        # Queries only read, so are as safe to retry as a GET
+        response = self.__call(
+            "POST",
+            "/graphql",
+            idempotent=True,
+            json={"query": query, "variables": variables},
+        )
+        if response.get("errors"):
+            raise ValueError(f"GraphQL query failed: {response['errors']}")
+        return response["data"]
 
     def get_branch_rulesets(self, repo: str, branch: str) -> List[Dict[str, Any]]:
         """
@@ -145,9 +186,369 @@ class GitHubClient:
         """
         return self.__call("GET", f"/repos/{self.org}/{repo}/rules/branches/{branch}")
 
+    def get_branch_protection(self, repo: str, branch: str) -> Dict[str, Any]:
+        """
+        Get branch protection for a branch.
+        Docs: https://docs.github.com/en/rest/branches/branch-protection?apiVersion=2022-11-28#get-branch-protection
+        """
+        return self.__call(
+            "GET", f"/repos/{self.org}/{repo}/branches/{branch}/protection"
+        )
+
+    def get_repository_teams(self, repo: str) -> List[Dict[str, Any]]:
+        """
+        List the teams with access to a repository.
+        Docs: https://docs.github.com/en/rest/repos/repos?apiVersion=2022-11-28#list-repository-teams
+        """
+        return self.__paginate(f"/repos/{self.org}/{repo}/teams")
+
+    def get_team_repositories(self, team_slug: str) -> List[Dict[str, Any]]:
+        """
+        List the repositories a team has access to, with the team's permission on each.
+        Docs: https://docs.github.com/en/rest/teams/teams?apiVersion=2022-11-28#list-team-repositories
+        """
+        return self.__paginate(f"/orgs/{self.org}/teams/{team_slug}/repos")
+
+    def get_team(self, team_slug: str) -> Dict[str, Any]:
+        """
+        Get a team, with its parent.
+        Docs: https://docs.github.com/en/rest/teams/teams?apiVersion=2022-11-28#get-a-team-by-name
+        """
+        return self.__call("GET", f"/orgs/{self.org}/teams/{team_slug}")
+
+    def get_organisation_rulesets(self) -> List[Dict[str, Any]]:
+        """
+        List the rulesets configured for the organisation.
+        Docs: https://docs.github.com/en/rest/orgs/rules?apiVersion=2022-11-28#get-all-organization-repository-rulesets
+        """
+        return self.__paginate(f"/orgs/{self.org}/rulesets")
+
+    def get_organisation_ruleset(self, ruleset_id: int) -> Dict[str, Any]:
+        """
+        Get an organisation ruleset, including its rules and bypass actors.
+        Docs: https://docs.github.com/en/rest/orgs/rules?apiVersion=2022-11-28#get-an-organization-repository-ruleset
+        """
+        return self.__call("GET", f"/orgs/{self.org}/rulesets/{ruleset_id}")
+
+    def get_organisation_teams(self) -> List[Dict[str, Any]]:
+        """
+        List every team in the organisation, including its parent.
+        Docs: https://docs.github.com/en/rest/teams/teams?apiVersion=2022-11-28#list-teams
+        """
+        return self.__paginate(f"/orgs/{self.org}/teams")
+
     def get_repository_ruleset(self, repo: str, ruleset_id: str) -> Dict[str, Any]:
         """
         Get a ruleset for a repository.
         Docs: https://docs.github.com/en/rest/repos/rules?apiVersion=2022-11-28#get-a-repository-ruleset
         """
         return self.__call("GET", f"/repos/{self.org}/{repo}/rulesets/{ruleset_id}")
+
+    def get_organisation_repositories(
+        self, repository_type: str = "public"
+    ) -> List[Dict[str, Any]]:
+        """
+        List repositories for the organisation.
+        Docs: https://docs.github.com/en/rest/repos/repos?apiVersion=2022-11-28#list-organization-repositories
+        """
+        return self.__paginate(f"/orgs/{self.org}/repos", {"type": repository_type})
+
+    def get_repository(self, repo: str) -> Dict[str, Any]:
+        """
+        Get a repository, including the settings the organisation listing leaves out.
+        Docs: https://docs.github.com/en/rest/repos/repos?apiVersion=2022-11-28#get-a-repository
+        """
+        return self.__call("GET", f"/repos/{self.org}/{repo}")
+
+    def get_delete_branch_on_merge_graphql(self) -> Dict[str, bool]:
+        """
+        The `delete_branch_on_merge` setting of every public repository, which the
+        REST listing leaves out, for 100 repositories per request rather than one.
+        """
+        settings = {}
+        cursor = None
+        while True:
+            data = self.graphql(
+                DELETE_BRANCH_ON_MERGE_QUERY,
+                {"org": self.org, "pageSize": 100, "cursor": cursor},
+            )
+            repositories = data["organization"]["repositories"]
+            for node in repositories["nodes"]:
+                settings[node["name"]] = node["deleteBranchOnMerge"]
+            if not repositories["pageInfo"]["hasNextPage"]:
+                return settings
+            cursor = repositories["pageInfo"]["endCursor"]
+
+    def get_repositories_graphql(
+        self, page_size: int = 50
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the public repositories of the organisation with everything needed to
+        build a `RepositoryInfo`, `page_size` repositories per request.
+        """
+        cursor = None
+        while True:
+            data = self.graphql(
+                REPOSITORIES_QUERY,
+                {"org": self.org, "pageSize": page_size, "cursor": cursor},
+            )
+            repositories = data["organization"]["repositories"]
+            for node in repositories["nodes"]:
+                yield self.__with_remaining_rulesets_graphql(node)
+            if not repositories["pageInfo"]["hasNextPage"]:
+                return
+            cursor = repositories["pageInfo"]["endCursor"]
+
+    def get_repository_graphql(self, repo: str) -> Dict[str, Any]:
+        """Get a single repository using the same fields as `get_repositories_graphql`."""
+        data = self.graphql(REPOSITORY_QUERY, {"org": self.org, "name": repo})
+        if not data["repository"]:
+            return data["repository"]
+        return self.__with_remaining_rulesets_graphql(data["repository"])
+
+    def __with_remaining_rulesets_graphql(
+        self, repository: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Adds the rulesets, and the rules of each ruleset, beyond the first page the
+        repository query returns, so the default branch ruleset is built from all
+        of them as the REST endpoint would.
+        """
+        rulesets = repository["rulesets"]
+        while rulesets["pageInfo"]["hasNextPage"]:
+            data = self.graphql(
+                REPOSITORY_RULESETS_QUERY,
+                {
+                    "org": self.org,
+                    "name": repository["name"],
+                    "cursor": rulesets["pageInfo"]["endCursor"],
+                },
+            )
+            page = data["repository"]["rulesets"]
+            rulesets["nodes"].extend(page["nodes"])
+            rulesets["pageInfo"] = page["pageInfo"]
+
+        for ruleset in rulesets["nodes"]:
+            rules = ruleset["rules"]
+            while rules["pageInfo"]["hasNextPage"]:
+                data = self.graphql(
+                    RULESET_RULES_QUERY,
+                    {"id": ruleset["id"], "cursor": rules["pageInfo"]["endCursor"]},
+                )
+                page = data["node"]["rules"]
+                rules["nodes"].extend(page["nodes"])
+                rules["pageInfo"] = page["pageInfo"]
+        return repository
+
+    def get_team_repository_permissions_graphql(self) -> List[Dict[str, Any]]:
+        """
+        List every team in the organisation with its parent and the permission it
+        has on each of its repositories:
+        [{"slug": str, "parent": str | None, "repositories": [(name, permission)]}]
+        """
+        teams = []
+        cursor = None
+        while True:
+            data = self.graphql(TEAMS_QUERY, {"org": self.org, "cursor": cursor})
+            page = data["organization"]["teams"]
+            for node in page["nodes"]:
+                repositories = node["repositories"]
+                permissions = [
+                    (edge["node"]["name"], edge["permission"])
+                    for edge in repositories["edges"]
+                ]
+                if repositories["pageInfo"]["hasNextPage"]:
+                    permissions.extend(
+                        self.__get_remaining_team_repository_permissions_graphql(
+                            node["slug"], repositories["pageInfo"]["endCursor"]
+                        )
+                    )
+                teams.append(
+                    {
+                        "slug": node["slug"],
+                        "parent": (node.get("parentTeam") or {}).get("slug"),
+                        "repositories": permissions,
+                    }
+                )
+            if not page["pageInfo"]["hasNextPage"]:
+                return teams
+            cursor = page["pageInfo"]["endCursor"]
+
+    def __get_remaining_team_repository_permissions_graphql(
+        self, team_slug: str, cursor: str
+    ) -> List[tuple[str, str]]:
+        permissions = []
+        while cursor:
+            data = self.graphql(
+                TEAM_REPOSITORIES_QUERY,
+                {"org": self.org, "slug": team_slug, "cursor": cursor},
+            )
+            repositories = data["organization"]["team"]["repositories"]
+            permissions.extend(
+                (edge["node"]["name"], edge["permission"])
+                for edge in repositories["edges"]
+            )
+            cursor = (
+                repositories["pageInfo"]["endCursor"]
+                if repositories["pageInfo"]["hasNextPage"]
+                else None
+            )
+        return permissions
+
+
+RULE_FIELDS_FRAGMENT = """
+fragment RuleFields on RepositoryRule {
+  type
+  parameters {
+    ... on PullRequestParameters {
+      requiredApprovingReviewCount
+      dismissStaleReviewsOnPush
+      requireCodeOwnerReview
+    }
+  }
+}
+"""
+
+RULESET_FIELDS_FRAGMENT = (
+    """
+fragment RulesetFields on RepositoryRuleset {
+  id
+  databaseId
+  enforcement
+  target
+  conditions { refName { include exclude } }
+  bypassActors { totalCount }
+  rules(first: 50) {
+    pageInfo { hasNextPage endCursor }
+    nodes { ...RuleFields }
+  }
+}
+"""
+    + RULE_FIELDS_FRAGMENT
+)
+
+REPOSITORY_FIELDS_FRAGMENT = (
+    """
+fragment RepositoryFields on Repository {
+  name
+  visibility
+  description
+  isArchived
+  isFork
+  deleteBranchOnMerge
+  licenseInfo { key }
+  defaultBranchRef {
+    name
+    branchProtectionRule {
+      isAdminEnforced
+      allowsForcePushes
+      requiresCommitSignatures
+      dismissesStaleReviews
+      requiresCodeOwnerReviews
+      requireLastPushApproval
+      requiredApprovingReviewCount
+    }
+  }
+  rulesets(first: 25, includeParents: true) {
+    pageInfo { hasNextPage endCursor }
+    nodes { ...RulesetFields }
+  }
+}
+"""
+    + RULESET_FIELDS_FRAGMENT
+)
+
+REPOSITORIES_QUERY = (
+    """
+query($org: String!, $pageSize: Int!, $cursor: String) {
+  organization(login: $org) {
+    repositories(first: $pageSize, after: $cursor, privacy: PUBLIC, orderBy: {field: NAME, direction: ASC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes { ...RepositoryFields }
+    }
+  }
+}
+"""
+    + REPOSITORY_FIELDS_FRAGMENT
+)
+
+REPOSITORY_QUERY = (
+    """
+query($org: String!, $name: String!) {
+  repository(owner: $org, name: $name) { ...RepositoryFields }
+}
+"""
+    + REPOSITORY_FIELDS_FRAGMENT
+)
+
+REPOSITORY_RULESETS_QUERY = (
+    """
+query($org: String!, $name: String!, $cursor: String) {
+  repository(owner: $org, name: $name) {
+    rulesets(first: 25, after: $cursor, includeParents: true) {
+      pageInfo { hasNextPage endCursor }
+      nodes { ...RulesetFields }
+    }
+  }
+}
+"""
+    + RULESET_FIELDS_FRAGMENT
+)
+
+RULESET_RULES_QUERY = (
+    """
+query($id: ID!, $cursor: String) {
+  node(id: $id) {
+    ... on RepositoryRuleset {
+      rules(first: 50, after: $cursor) {
+        pageInfo { hasNextPage endCursor }
+        nodes { ...RuleFields }
+      }
+    }
+  }
+}
+"""
+    + RULE_FIELDS_FRAGMENT
+)
+
+DELETE_BRANCH_ON_MERGE_QUERY = """
+query($org: String!, $pageSize: Int!, $cursor: String) {
+  organization(login: $org) {
+    repositories(first: $pageSize, after: $cursor, privacy: PUBLIC) {
+      pageInfo { hasNextPage endCursor }
+      nodes { name deleteBranchOnMerge }
+    }
+  }
+}
+"""
+
+TEAMS_QUERY = """
+query($org: String!, $cursor: String) {
+  organization(login: $org) {
+    teams(first: 100, after: $cursor) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        slug
+        parentTeam { slug }
+        repositories(first: 100) {
+          pageInfo { hasNextPage endCursor }
+          edges { permission node { name } }
+        }
+      }
+    }
+  }
+}
+"""
+
+TEAM_REPOSITORIES_QUERY = """
+query($org: String!, $slug: String!, $cursor: String) {
+  organization(login: $org) {
+    team(slug: $slug) {
+      repositories(first: 100, after: $cursor) {
+        pageInfo { hasNextPage endCursor }
+        edges { permission node { name } }
+      }
+    }
+  }
+}
+"""
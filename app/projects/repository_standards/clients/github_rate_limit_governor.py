@@ -0,0 +1,146 @@
+import logging
+import random
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from time import sleep, time
+from typing import Mapping
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED_STATUS_CODES = [403, 429]
+
+
+@dataclass
+class RateLimitState:
+    limit: int | None = None
+    remaining: int | None = None
+    reset_timestamp: float = 0.0
+    next_request_at: float = 0.0
+    paused_until: float = 0.0
+
+
+class RateLimitGovernor:
+    """
+    Paces every GitHub request made by a crawl against the installation's rate limits.
+
+    The `X-RateLimit-*` headers of each response keep a per resource (`core`,
+    `graphql`...) view of the budget shared by all workers:
+
+    - once less than `pacing_threshold` of the limit is left, requests are spaced so
+      the remainder lasts until the reset rather than running out early
+    - once only `reserve` requests are left, every worker waits for the reset
+    - a secondary rate limit pauses every worker for `Retry-After`, or an exponential
+      backoff with jitter when GitHub does not say how long to wait
+
+    A rate limited request is retried on its own by the caller via `get_retry_delay`,
+    so work that already succeeded is never repeated.
+    """
+
+    def __init__(
+        self,
+        reserve: int = 50,
+        pacing_threshold: float = 0.2,
+        max_attempts: int = 5,
+        secondary_backoff_seconds: float = 60,
+        max_backoff_seconds: float = 900,
+    ):
+        self.reserve = reserve
+        self.pacing_threshold = pacing_threshold
+        self.max_attempts = max_attempts
+        self.secondary_backoff_seconds = secondary_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.__states: dict[str, RateLimitState] = {}
+        self.__lock = threading.Lock()
+
+    def __get_state(self, resource: str) -> RateLimitState:
+        return self.__states.setdefault(resource, RateLimitState())
+
+    def wait(self, resource: str = "core") -> None:
+        """Block until a request against `resource` may be sent."""
+        delay = self.reserve_slot(resource)
+        if delay > 0:
+            sleep(delay)
+
+    def reserve_slot(self, resource: str = "core") -> float:
+        """
+        Reserve the next slot for a request against `resource` and return how many
+        seconds to wait for it, for callers such as an event loop that cannot block.
+        """
+        with self.__lock:
+            state = self.__get_state(resource)
+            now = time()
+            send_at = max(now, state.paused_until, state.next_request_at)
+            state.next_request_at = send_at + self.__pacing_interval(state, send_at)
+        return send_at - now
+
+    def __pacing_interval(self, state: RateLimitState, now: float) -> float:
+        if state.limit is None or state.remaining is None:
+            return 0.0
+        if state.remaining > state.limit * self.pacing_threshold:
+            return 0.0
+        seconds_until_reset = max(state.reset_timestamp - now, 0.0)
+        return seconds_until_reset / max(state.remaining - self.reserve, 1)
+
+    def update(
+        self,
+        remaining: int,
+        reset_timestamp: float,
+        limit: int | None = None,
+        resource: str = "core",
+    ) -> None:
+        with self.__lock:
+            state = self.__get_state(resource)
+            state.remaining = remaining
+            state.reset_timestamp = reset_timestamp
+            state.limit = limit or state.limit
+            if remaining <= self.reserve and reset_timestamp > state.paused_until:
+                logger.warning(
+                    f"Rate limit [ {resource} ] budget low [ {remaining} ], pausing until [ {datetime.fromtimestamp(reset_timestamp, tz=timezone.utc)} ]"
+                )
+                state.paused_until = reset_timestamp
+
+    def observe(self, headers: Mapping[str, str]) -> None:
+        if "X-RateLimit-Remaining" not in headers or "X-RateLimit-Reset" not in headers:
+            return
+        self.update(
+            remaining=int(headers["X-RateLimit-Remaining"]),
+            reset_timestamp=float(headers["X-RateLimit-Reset"]),
+            limit=int(headers["X-RateLimit-Limit"])
+            if "X-RateLimit-Limit" in headers
+            else None,
+            resource=headers.get("X-RateLimit-Resource", "core"),
+        )
+
+    def get_retry_delay(
+        self, status_code: int, headers: Mapping[str, str], body: str, attempt: int
+    ) -> float | None:
+        """
+        How long to wait before retrying a response, or `None` if it should not be
+        retried. The wait also pauses every other worker using the same resource.
+        """
+        if status_code not in RATE_LIMITED_STATUS_CODES or attempt >= self.max_attempts:
+            return None
+
+        resource = headers.get("X-RateLimit-Resource", "core")
+        now = time()
+        if "Retry-After" in headers:
+            delay = float(headers["Retry-After"])
+        elif headers.get("X-RateLimit-Remaining") == "0":
+            delay = max(float(headers.get("X-RateLimit-Reset", now)) - now, 0) + 1
+        elif "secondary rate limit" in body.lower():
+            backoff = min(
+                self.secondary_backoff_seconds * 2 ** (attempt - 1),
+                self.max_backoff_seconds,
+            )
+            delay = backoff + random.uniform(0, backoff / 2)
+        else:
+            return None
+
+        logger.warning(
+            f"Rate limited on [ {resource} ] (attempt {attempt}/{self.max_attempts}), retrying in [ {delay:.0f} ] seconds"
+        )
+        with self.__lock:
+            state = self.__get_state(resource)
+            state.paused_until = max(state.paused_until, now + delay)
+        return delay
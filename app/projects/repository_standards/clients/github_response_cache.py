@@ -0,0 +1,167 @@
+import hashlib
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict
+
+from sqlalchemy import create_engine, delete, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.projects.repository_standards.db_models import GithubResponseCache
+
+logger = logging.getLogger(__name__)
+
+github_response_cache_table = GithubResponseCache.__table__
+
+
+@dataclass
+class GitHubResponse:
+    body: Any
+    etag: str | None = None
+    last_modified: str | None = None
+    next_url: str | None = None
+    # Only `200` and `404`, so a missing resource is revalidated rather than
+    # requested in full every run
+    status_code: int = 200
+
+
+class GitHubResponseCache:
+    """
+    Stores GitHub GET responses with their validators so later requests can be sent
+    with `If-None-Match`/`If-Modified-Since`. A `304 Not Modified` does not count
+    against the primary rate limit and is answered from the stored body.
+
+    The cache uses its own engine rather than the Flask session so it can be used
+    from the crawl's worker threads. Once it holds more than `max_entries` responses
+    the least recently used ones are evicted. Reads do not write: the responses used
+    are only marked as such in `evict()`, in one statement per batch.
+    """
+
+    def __init__(self, database_url: str, auth_scope: str, max_entries: int = 50000):
+        self.__engine = create_engine(database_url, pool_pre_ping=True)
+        self.__insert = (
+            postgresql.insert
+            if self.__engine.dialect.name == "postgresql"
+            else sqlite.insert
+        )
+        self.auth_scope = auth_scope
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__used_keys: set[str] = set()
+        self.__lock = threading.Lock()
+
+    def __key(self, url: str, params: Dict[str, Any] | None) -> str:
+        material = json.dumps([self.auth_scope, url, params or {}], sort_keys=True)
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def get(self, url: str, params: Dict[str, Any] | None) -> GitHubResponse | None:
+        key = self.__key(url, params)
+        with self.__engine.connect() as connection:
+            row = connection.execute(
+                select(github_response_cache_table).where(
+                    github_response_cache_table.c.key == key
+                )
+            ).first()
+        if row is None:
+            return None
+        with self.__lock:
+            self.__used_keys.add(key)
+        return GitHubResponse(
+            body=json.loads(row.body),
+            etag=row.etag,
+            last_modified=row.last_modified,
+            next_url=row.next_url,
+            status_code=row.status_code,
+        )
+
+    def put(
+        self,
+        url: str,
+        params: Dict[str, Any] | None,
+        response: GitHubResponse,
+    ) -> None:
+        if not response.etag and not response.last_modified:
+            return
+
+        values = {
+            "key": self.__key(url, params),
+            "url": url,
+            "etag": response.etag,
+            "last_modified": response.last_modified,
+            "next_url": response.next_url,
+            "body": json.dumps(response.body),
+            "status_code": response.status_code,
+            "last_used": datetime.now(),
+        }
+        statement = self.__insert(github_response_cache_table).values(**values)
+        statement = statement.on_conflict_do_update(
+            index_elements=["key"],
+            set_={name: value for name, value in values.items() if name != "key"},
+        )
+        with self.__engine.begin() as connection:
+            connection.execute(statement)
+
+    def conditional_headers(self, cached: GitHubResponse | None) -> Dict[str, str]:
+        headers = {}
+        if cached and cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached and cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+        return headers
+
+    def record_hit(self) -> None:
+        with self.__lock:
+            self.hits += 1
+
+    def record_miss(self) -> None:
+        with self.__lock:
+            self.misses += 1
+
+    def evict(self, batch_size: int = 500) -> int:
+        with self.__lock:
+            used_keys = sorted(self.__used_keys)
+            self.__used_keys.clear()
+        with self.__engine.begin() as connection:
+            now = datetime.now()
+            for start in range(0, len(used_keys), batch_size):
+                connection.execute(
+                    update(github_response_cache_table)
+                    .where(
+                        github_response_cache_table.c.key.in_(
+                            used_keys[start : start + batch_size]
+                        )
+                    )
+                    .values(last_used=now)
+                )
+            size = connection.execute(
+                select(func.count()).select_from(github_response_cache_table)
+            ).scalar_one()
+            if size <= self.max_entries:
+                return 0
+            least_recently_used = (
+                select(github_response_cache_table.c.key)
+                .order_by(github_response_cache_table.c.last_used)
+                .limit(size - self.max_entries)
+            )
+            evicted = connection.execute(
+                delete(github_response_cache_table).where(
+                    github_response_cache_table.c.key.in_(least_recently_used)
+                )
+            ).rowcount
+        with self.__lock:
+            self.evictions += evicted
+        logger.info(f"Evicted [ {evicted} ] cached GitHub responses")
+        return evicted
+
+    def stats(self) -> Dict[str, float]:
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / requests, 3) if requests else 0.0,
+        }
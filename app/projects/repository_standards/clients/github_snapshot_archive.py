@@ -0,0 +1,326 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import zlib
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List
+
+from app.projects.repository_standards.models.fetch_plan import replace_fields
+from app.projects.repository_standards.models.repository_info import (
+    RepositoryAccess,
+    RepositoryInfo,
+    RepositoryInfoFactory,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SnapshotDiff:
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    # The payloads that changed, by repository
+    changed: Dict[str, List[str]] = field(default_factory=dict)
+
+
+def rest_snapshot_record(
+    repo: dict,
+    branch_protection: dict | None,
+    branch_rules: List[dict] | None,
+    rulesets: Dict[int, dict],
+    access: RepositoryAccess,
+    reused: Dict[str, Any] | None = None,
+    fetched_at: Dict[str, str] | None = None,
+) -> dict:
+    """
+    `reused` are the fields, by path, that were carried forward from an earlier run
+    instead of fetched, so are not in the payloads.
+    """
+    return {
+        "name": repo["name"],
+        "source": "rest",
+        "repository": repo,
+        "branch_protection": branch_protection,
+        "branch_rules": branch_rules,
+        # JSON keys are strings, so the ids are put back when the record is read
+        "rulesets": {
+            str(ruleset_id): ruleset for ruleset_id, ruleset in rulesets.items()
+        },
+        "access": asdict(access),
+        "reused": reused or {},
+        "fetched_at": fetched_at or {},
+    }
+
+
+def graphql_snapshot_record(
+    repo: dict, security_and_analysis: dict | None, access: RepositoryAccess
+) -> dict:
+    return {
+        "name": repo["name"],
+        "source": "graphql",
+        "repository": repo,
+        "security_and_analysis": security_and_analysis,
+        "access": asdict(access),
+    }
+
+
+def repository_info_snapshot_record(repository: RepositoryInfo) -> dict:
+    """For a repository that was not built from this run's payloads."""
+    return {
+        "name": repository.basic.name,
+        "source": "repository_info",
+        "repository_info": repository.to_dict(),
+    }
+
+
+def repository_info_from_snapshot(record: dict) -> RepositoryInfo:
+    """Rebuild a `RepositoryInfo` from a snapshot record with the current factory."""
+    if record["source"] == "repository_info":
+        return RepositoryInfo.from_dict(record["repository_info"])
+
+    access = RepositoryAccess(**record["access"])
+    if record["source"] == "graphql":
+        return RepositoryInfoFactory.from_graphql_repo(
+            record["repository"],
+            record["security_and_analysis"],
+            access.teams_with_admin,
+            access.teams_with_admin_parents,
+            access.teams,
+            access.teams_parents,
+        )
+    repository = RepositoryInfoFactory.from_rest_payloads(
+        record["repository"],
+        record["branch_protection"],
+        record["branch_rules"],
+        {
+            int(ruleset_id): ruleset
+            for ruleset_id, ruleset in record["rulesets"].items()
+        },
+        access.teams_with_admin,
+        access.teams_with_admin_parents,
+        access.teams,
+        access.teams_parents,
+    )
+    return replace_fields(
+        repository, record.get("reused", {}), record.get("fetched_at", {})
+    )
+
+
+class GitHubSnapshotArchive:
+    """
+    Keeps the raw GitHub payloads each sync run built its repositories from, so a
+    new or changed check can be evaluated against the whole estate without
+    crawling it again.
+
+    Records are spread over `segment_count` gzipped JSONL segments by a hash of the
+    repository name. Each segment is stored under the hash of its content, so a
+    segment whose repositories did not change between runs is stored once and
+    can be skipped when diffing. A run is a manifest per shard listing its segments.
+    """
+
+    def __init__(self, path: str, segment_count: int = 64):
+        self.path = path
+        self.segment_count = segment_count
+        os.makedirs(os.path.join(path, "segments"), exist_ok=True)
+        os.makedirs(os.path.join(path, "runs"), exist_ok=True)
+
+    def get_segment_index(self, name: str) -> int:
+        return zlib.crc32(name.encode()) % self.segment_count
+
+    def write_segment(self, lines: List[str]) -> str:
+        content = "".join(lines).encode()
+        digest = hashlib.sha256(content).hexdigest()
+        segment_path = self.__segment_path(digest)
+        if not os.path.exists(segment_path):
+            # Written aside and renamed so a reader never sees half a segment
+            with tempfile.NamedTemporaryFile(
+                dir=os.path.dirname(segment_path), delete=False
+            ) as segment_file:
+                segment_file.write(gzip.compress(content, mtime=0))
+            os.replace(segment_file.name, segment_path)
+        return digest
+
+    def read_segment(self, digest: str) -> Iterator[dict]:
+        with gzip.open(self.__segment_path(digest), "rt") as segment_file:
+            for line in segment_file:
+                yield json.loads(line)
+
+    def write_manifest(self, run_id: str, shard_name: str, manifest: dict) -> None:
+        os.makedirs(os.path.join(self.path, "runs", run_id), exist_ok=True)
+        manifest_path = os.path.join(self.path, "runs", run_id, f"{shard_name}.json")
+        with open(manifest_path, "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+
+    def get_segments(self, run_id: str) -> Dict[int, List[str]]:
+        """The segments of every shard of a run, by segment index."""
+        run_path = os.path.join(self.path, "runs", run_id)
+        if not os.path.isdir(run_path):
+            raise ValueError(f"No snapshot for run [ {run_id} ]")
+        segments: Dict[int, List[str]] = {}
+        for manifest_name in sorted(os.listdir(run_path)):
+            with open(os.path.join(run_path, manifest_name)) as manifest_file:
+                manifest = json.load(manifest_file)
+            if manifest["segment_count"] != self.segment_count:
+                raise ValueError(
+                    f"Run [ {run_id} ] has [ {manifest['segment_count']} ] segments, expected [ {self.segment_count} ]"
+                )
+            for index, digest in manifest["segments"].items():
+                segments.setdefault(int(index), []).append(digest)
+        return segments
+
+    def list_runs(self) -> List[str]:
+        """Runs from oldest to newest, by when their last shard was archived."""
+        runs = []
+        for run_id in os.listdir(os.path.join(self.path, "runs")):
+            run_path = os.path.join(self.path, "runs", run_id)
+            created_at = []
+            for manifest_name in os.listdir(run_path):
+                with open(os.path.join(run_path, manifest_name)) as manifest_file:
+                    created_at.append(json.load(manifest_file)["created_at"])
+            if created_at:
+                runs.append((max(created_at), run_id))
+        return [run_id for _, run_id in sorted(runs)]
+
+    def read_records(self, run_id: str) -> Iterator[dict]:
+        for digests in self.get_segments(run_id).values():
+            for digest in digests:
+                yield from self.read_segment(digest)
+
+    def load_repositories(self, run_id: str) -> Iterator[RepositoryInfo]:
+        for record in self.read_records(run_id):
+            yield repository_info_from_snapshot(record)
+
+    def diff(self, old_run_id: str, new_run_id: str) -> SnapshotDiff:
+        old_segments = self.get_segments(old_run_id)
+        new_segments = self.get_segments(new_run_id)
+        diff = SnapshotDiff()
+        for index in sorted(set(old_segments) | set(new_segments)):
+            if sorted(old_segments.get(index, [])) == sorted(
+                new_segments.get(index, [])
+            ):
+                continue
+            old_records = {
+                record["name"]: record
+                for digest in old_segments.get(index, [])
+                for record in self.read_segment(digest)
+            }
+            new_records = {
+                record["name"]: record
+                for digest in new_segments.get(index, [])
+                for record in self.read_segment(digest)
+            }
+            diff.added += [name for name in new_records if name not in old_records]
+            diff.removed += [name for name in old_records if name not in new_records]
+            for name in new_records.keys() & old_records.keys():
+                old_record, new_record = old_records[name], new_records[name]
+                changed = [
+                    key
+                    for key in sorted(old_record.keys() | new_record.keys())
+                    if old_record.get(key) != new_record.get(key)
+                ]
+                if changed:
+                    diff.changed[name] = changed
+        diff.added.sort()
+        diff.removed.sort()
+        diff.changed = dict(sorted(diff.changed.items()))
+        return diff
+
+    def __segment_path(self, digest: str) -> str:
+        return os.path.join(self.path, "segments", f"{digest}.jsonl.gz")
+
+
+class GitHubSnapshotWriter:
+    """
+    Collects the records of one shard of a sync run while it crawls. Records are
+    spooled to a temporary file per segment, so memory stays flat, and only
+    written to the archive once the crawl is done.
+
+    Repositories that were carried forward rather than fetched again take their
+    record from `base_run_id`, or their `RepositoryInfo` when the base run does not
+    have them.
+    """
+
+    def __init__(
+        self,
+        archive: GitHubSnapshotArchive,
+        run_id: str,
+        shard_name: str = "shard-1-of-1",
+        base_run_id: str | None = None,
+    ):
+        self.archive = archive
+        self.run_id = run_id
+        self.shard_name = shard_name
+        self.base_run_id = base_run_id
+        self.__spools: Dict[int, tempfile.SpooledTemporaryFile] = {}
+        self.__carried_forward: Dict[int, Dict[str, str]] = {}
+        self.__lock = threading.Lock()
+
+    def add(self, record: dict) -> None:
+        line = json.dumps(record, sort_keys=True) + "\n"
+        index = self.archive.get_segment_index(record["name"])
+        with self.__lock:
+            spool = self.__spools.setdefault(
+                index, tempfile.SpooledTemporaryFile(max_size=1024 * 1024, mode="w+")
+            )
+            spool.write(line)
+
+    def carry_forward(self, repository: RepositoryInfo) -> None:
+        name = repository.basic.name
+        record = repository_info_snapshot_record(repository)
+        with self.__lock:
+            self.__carried_forward.setdefault(
+                self.archive.get_segment_index(name), {}
+            )[name] = json.dumps(record, sort_keys=True) + "\n"
+
+    def close(self) -> dict:
+        base_segments = (
+            self.archive.get_segments(self.base_run_id) if self.base_run_id else {}
+        )
+        segments = {}
+        repository_count = 0
+        for index in sorted(self.__spools.keys() | self.__carried_forward.keys()):
+            lines = {}
+            spool = self.__spools.get(index)
+            if spool:
+                spool.seek(0)
+                for line in spool:
+                    lines[json.loads(line)["name"]] = line
+                spool.close()
+
+            carried_forward = self.__carried_forward.get(index, {})
+            if carried_forward:
+                for digest in base_segments.get(index, []):
+                    for record in self.archive.read_segment(digest):
+                        if record["name"] in carried_forward:
+                            carried_forward[record["name"]] = (
+                                json.dumps(record, sort_keys=True) + "\n"
+                            )
+            lines.update(
+                (name, line)
+                for name, line in carried_forward.items()
+                if name not in lines
+            )
+
+            segments[str(index)] = self.archive.write_segment(
+                [lines[name] for name in sorted(lines)]
+            )
+            repository_count += len(lines)
+
+        manifest = {
+            "run_id": self.run_id,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "base_run_id": self.base_run_id,
+            "segment_count": self.archive.segment_count,
+            "repository_count": repository_count,
+            "segments": segments,
+        }
+        self.archive.write_manifest(self.run_id, self.shard_name, manifest)
+        logger.info(
+            f"Archived snapshot of [ {repository_count} ] repositories for run [ {self.run_id} ] in [ {len(segments)} ] segments"
+        )
+        return manifest
@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import threading
+from typing import Any, Dict
+
+import requests
+
+from app.projects.repository_standards.clients.async_github_client import (
+    AsyncGitHubClient,
+)
+from app.projects.repository_standards.clients.github_client import GitHubClient
+
+logger = logging.getLogger(__name__)
+
+ORGANISATION_SOURCE_TYPE = "Organization"
+
+# The prefetch is only an optimisation, so an API error, a timeout or an open
+# circuit leaves the rulesets to be fetched when a repository uses them
+PREFETCH_ERRORS = (ValueError, requests.RequestException)
+ASYNC_PREFETCH_ERRORS = (ValueError, OSError, EOFError)
+
+
+class RulesetCache:
+    """
+    Most repositories inherit the same organisation rulesets, so rulesets are kept
+    for the whole crawl, keyed by their source and id, rather than fetched for every
+    rule of every repository.
+    """
+
+    def __init__(self, github_client: GitHubClient):
+        self.github_client = github_client
+        self.lookups = 0
+        self.prefetches = 0
+        self.fetches = 0
+        self.__rulesets: Dict[tuple[str, int], Dict[str, Any]] = {}
+        self.__lock = threading.Lock()
+
+    def prefetch_organisation_rulesets(self) -> None:
+        try:
+            summaries = self.github_client.get_organisation_rulesets()
+        except PREFETCH_ERRORS as e:
+            logger.warning(f"Unable to prefetch organisation rulesets: {e}")
+            return
+
+        for summary in summaries:
+            try:
+                ruleset = self.github_client.get_organisation_ruleset(summary["id"])
+            except PREFETCH_ERRORS as e:
+                logger.warning(
+                    f"Unable to prefetch organisation ruleset [ {summary['id']} ]: {e}"
+                )
+                continue
+            with self.__lock:
+                self.prefetches += 1
+                self.__rulesets[("organisation", ruleset["id"])] = ruleset
+        logger.info(
+            f"Prefetched [ {self.prefetches} ] of [ {len(summaries)} ] organisation rulesets"
+        )
+
+    def get_ruleset(self, repo: str, rule: Dict[str, Any]) -> Dict[str, Any]:
+        """Get the ruleset a rule returned by `get_branch_rulesets` belongs to."""
+        ruleset_id = rule["ruleset_id"]
+        key = ruleset_key(repo, rule)
+
+        with self.__lock:
+            self.lookups += 1
+            ruleset = self.__rulesets.get(key)
+        if ruleset is not None:
+            return ruleset
+
+        ruleset = self.github_client.get_repository_ruleset(repo, ruleset_id)
+        with self.__lock:
+            self.fetches += 1
+            self.__rulesets[key] = ruleset
+        return ruleset
+
+    def stats(self) -> Dict[str, float]:
+        """`dedup_ratio` is the share of lookups that did not need their own call."""
+        return {
+            "lookups": self.lookups,
+            "prefetches": self.prefetches,
+            "fetches": self.fetches,
+            "dedup_ratio": round(1 - self.fetches / self.lookups, 3)
+            if self.lookups
+            else 0.0,
+        }
+
+
+class AsyncRulesetCache:
+    """
+    `RulesetCache` for `AsyncGitHubClient`. Lookups for a ruleset that is already
+    being fetched wait for that fetch rather than starting another. A fetch that
+    fails is forgotten, so the next lookup tries again rather than getting the
+    same error for the rest of the crawl.
+    """
+
+    def __init__(self, github_client: AsyncGitHubClient):
+        self.github_client = github_client
+        self.lookups = 0
+        self.prefetches = 0
+        self.fetches = 0
+        self.__rulesets: Dict[tuple[str, int], asyncio.Future] = {}
+
+    async def prefetch_organisation_rulesets(self) -> None:
+        try:
+            summaries = await self.github_client.get_organisation_rulesets()
+        except ASYNC_PREFETCH_ERRORS as e:
+            logger.warning(f"Unable to prefetch organisation rulesets: {e}")
+            return
+
+        rulesets = await asyncio.gather(
+            *(
+                self.github_client.get_organisation_ruleset(summary["id"])
+                for summary in summaries
+            ),
+            return_exceptions=True,
+        )
+        for summary, ruleset in zip(summaries, rulesets):
+            if isinstance(ruleset, ASYNC_PREFETCH_ERRORS):
+                logger.warning(
+                    f"Unable to prefetch organisation ruleset [ {summary['id']} ]: {ruleset}"
+                )
+                continue
+            if isinstance(ruleset, BaseException):
+                raise ruleset
+            self.prefetches += 1
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(ruleset)
+            self.__rulesets[("organisation", ruleset["id"])] = future
+        logger.info(
+            f"Prefetched [ {self.prefetches} ] of [ {len(summaries)} ] organisation rulesets"
+        )
+
+    async def get_ruleset(self, repo: str, rule: Dict[str, Any]) -> Dict[str, Any]:
+        """Get the ruleset a rule returned by `get_branch_rulesets` belongs to."""
+        key = ruleset_key(repo, rule)
+        self.lookups += 1
+        if key not in self.__rulesets:
+            self.fetches += 1
+            future = asyncio.ensure_future(
+                self.github_client.get_repository_ruleset(repo, rule["ruleset_id"])
+            )
+            future.add_done_callback(lambda done: self.__forget_failed(key, done))
+            self.__rulesets[key] = future
+        # shield() stops one cancelled lookup from cancelling the shared fetch
+        return await asyncio.shield(self.__rulesets[key])
+
+    def __forget_failed(self, key: tuple[str, int], future: asyncio.Future) -> None:
+        failed = future.cancelled() or future.exception() is not None
+        if failed and self.__rulesets.get(key) is future:
+            del self.__rulesets[key]
+
+    def stats(self) -> Dict[str, float]:
+        """`dedup_ratio` is the share of lookups that did not need their own call."""
+        return {
+            "lookups": self.lookups,
+            "prefetches": self.prefetches,
+            "fetches": self.fetches,
+            "dedup_ratio": round(1 - self.fetches / self.lookups, 3)
+            if self.lookups
+            else 0.0,
+        }
+
+
+def ruleset_key(repo: str, rule: Dict[str, Any]) -> tuple[str, int]:
+    source = (
+        "organisation"
+        if rule.get("ruleset_source_type") == ORGANISATION_SOURCE_TYPE
+        else f"repository:{repo}"
+    )
+    return (source, rule["ruleset_id"])
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional, Set, Tuple
 from app.projects.repository_standards.models.repository_compliance import (
     RepositoryComplianceCheck,
 )
@@ -13,7 +13,24 @@ BASELINE = 1
 STANDARD = 2
 EXEMPLAR = 3
 
+# The `RepositoryInfo` fields each check reads, by check
+COMPLIANCE_CHECK_FIELDS: Dict[str, Tuple[str, ...]] = {}
 
+
+def reads(*repository_fields: str) -> Callable[[Callable], Callable]:
+    """
+    Declares the `RepositoryInfo` fields a check reads, by path, so the crawl only
+    makes the API calls the checks need.
+    """
+
+    def declare(check: Callable) -> Callable:
+        COMPLIANCE_CHECK_FIELDS[check.__name__] = repository_fields
+        return check
+
+    return declare
+
+
+@reads("security_and_analysis.secret_scanning_status")
 def get_secret_scanning_enabled_check(
     repository: RepositoryView, required: bool = True
 ) -> RepositoryComplianceCheck:
@@ -29,6 +46,7 @@ def get_secret_scanning_enabled_check(
     )
 
 
+@reads("security_and_analysis.push_protection_status")
 def get_secret_scanning_push_protection_enabled_check(
     repository: RepositoryView, required: bool = True
 ) -> RepositoryComplianceCheck:
@@ -44,6 +62,12 @@ def get_secret_scanning_push_protection_enabled_check(
     )
 
 
+@reads(
+    "default_branch_protection.enforce_admins",
+    "default_branch_ruleset.enabled",
+    "default_branch_ruleset.pull_request_bypass_actors_length",
+    "default_branch_ruleset.required_signatures_ruleset_bypass_actors_length",
+)
 def get_branch_protection_enforced_for_admins_check(
     repository: RepositoryView, required: bool = False
 ) -> RepositoryComplianceCheck:
@@ -64,6 +88,12 @@ def get_branch_protection_enforced_for_admins_check(
     )
 
 
+@reads(
+    "default_branch_protection.required_signatures",
+    "default_branch_ruleset.enabled",
+    "default_branch_ruleset.required_signatures_enforcement",
+    "default_branch_ruleset.required_signatures_ruleset_bypass_actors_length",
+)
 def get_default_branch_protection_requires_signed_commits_check(
     repository: RepositoryView, required: bool = False
 ) -> RepositoryComplianceCheck:
@@ -85,6 +115,13 @@ def get_default_branch_protection_requires_signed_commits_check(
     )
 
 
+@reads(
+    "default_branch_protection.require_code_owner_reviews",
+    "default_branch_ruleset.enabled",
+    "default_branch_ruleset.pull_request_enforcement",
+    "default_branch_ruleset.required_signatures_ruleset_bypass_actors_length",
+    "default_branch_ruleset.pull_request_require_code_owner_review",
+)
 def get_default_branch_protection_requires_code_owner_reviews_check(
     repository: RepositoryView, required: bool = False
 ) -> RepositoryComplianceCheck:
@@ -107,6 +144,13 @@ def get_default_branch_protection_requires_code_owner_reviews_check(
     )
 
 
+@reads(
+    "default_branch_protection.dismiss_stale_reviews",
+    "default_branch_ruleset.enabled",
+    "default_branch_ruleset.pull_request_enforcement",
+    "default_branch_ruleset.required_signatures_ruleset_bypass_actors_length",
+    "default_branch_ruleset.pull_request_dismiss_stale_reviews_on_push",
+)
 def get_default_branch_pull_requests_dismiss_stale_reviews_check(
     repository: RepositoryView, required: bool = False
 ) -> RepositoryComplianceCheck:
@@ -129,6 +173,13 @@ def get_default_branch_pull_requests_dismiss_stale_reviews_check(
     )
 
 
+@reads(
+    "default_branch_protection.required_approving_review_count",
+    "default_branch_ruleset.enabled",
+    "default_branch_ruleset.pull_request_enforcement",
+    "default_branch_ruleset.pull_request_bypass_actors_length",
+    "default_branch_ruleset.pull_request_required_approving_review_count",
+)
 def get_default_branch_protection_requires_atleast_one_review_check(
     repository: RepositoryView, required: bool = False
 ) -> RepositoryComplianceCheck:
@@ -151,6 +202,7 @@ def get_default_branch_protection_requires_atleast_one_review_check(
     )
 
 
+@reads()
 def get_has_authoritative_owner_check(
     authoritative_owner: Optional[List[str]], required: bool = False
 ) -> RepositoryComplianceCheck:
@@ -164,6 +216,7 @@ def get_has_authoritative_owner_check(
     )
 
 
+@reads("basic.license")
 def get_licence_is_mit_check(
     repository: RepositoryView, required: bool = False
 ) -> RepositoryComplianceCheck:
@@ -177,6 +230,7 @@ def get_licence_is_mit_check(
     )
 
 
+@reads("basic.default_branch_name")
 def get_default_branch_is_main_check(
     repository: RepositoryView, required: bool = False
 ) -> RepositoryComplianceCheck:
@@ -205,3 +259,11 @@ def get_all_compliance_checks(
         get_licence_is_mit_check(repository),
         get_default_branch_is_main_check(repository),
     ]
+
+
+def get_compliance_check_fields() -> Set[str]:
+    return {
+        repository_field
+        for repository_fields in COMPLIANCE_CHECK_FIELDS.values()
+        for repository_field in repository_fields
+    }
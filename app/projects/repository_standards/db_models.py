@@ -28,12 +28,18 @@ class Asset(db.Model):
     __tablename__ = "assets"
 
     id: Mapped[int] = mapped_column(db.Integer, primary_key=True)
-    name: Mapped[str] = mapped_column(db.String)
+    name: Mapped[str] = mapped_column(db.String, unique=True, index=True)
     type: Mapped[str] = mapped_column(db.String)
     last_updated: Mapped[datetime] = mapped_column(
         db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
     )
-    data: Mapped[dict] = mapped_column(JSON)
+    # JSONB on Postgres so the teams and security settings can be indexed and
+    # queried, see `AssetRepository.find_all_by_teams`
+    data: Mapped[dict] = mapped_column(JSON().with_variant(JSONB(), "postgresql"))
+    # The last sync run to see the asset, those an earlier run saw are stale
+    sync_run_id: Mapped[int | None] = mapped_column(
+        db.ForeignKey("sync_runs.id", ondelete="SET NULL"), nullable=True, index=True
+    )
 
     relationships: Mapped[List["Relationship"]] = relationship(
         "Relationship", back_populates="asset"
@@ -53,6 +59,10 @@ class Relationship(db.Model):
     last_updated: Mapped[datetime] = mapped_column(
         db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
     )
+    # The last sync run to see the relationship, as for assets
+    sync_run_id: Mapped[int | None] = mapped_column(
+        db.ForeignKey("sync_runs.id", ondelete="SET NULL"), nullable=True, index=True
+    )
 
     asset: Mapped["Asset"] = relationship("Asset", back_populates="relationships")
     owner: Mapped["Owner"] = relationship("Owner", back_populates="relationships")
@@ -69,3 +79,88 @@ class OwnerTypes(db.Model):
 
     def __repr__(self):
         return f"<OwnerTypes id={self.id}, name={self.name}>"
+
+
+class GithubResponseCache(db.Model):
+    __tablename__ = "github_response_cache"
+
+    key: Mapped[str] = mapped_column(db.String, primary_key=True)
+    url: Mapped[str] = mapped_column(db.String)
+    etag: Mapped[str | None] = mapped_column(db.String, nullable=True)
+    last_modified: Mapped[str | None] = mapped_column(db.String, nullable=True)
+    next_url: Mapped[str | None] = mapped_column(db.String, nullable=True)
+    body: Mapped[str] = mapped_column(db.Text)
+    status_code: Mapped[int] = mapped_column(db.Integer, server_default="200")
+    last_used: Mapped[datetime] = mapped_column(db.DateTime, index=True)
+
+    def __repr__(self):
+        return f"<GithubResponseCache key={self.key}, url={self.url}>"
+
+
+class SyncRun(db.Model):
+    __tablename__ = "sync_runs"
+
+    id: Mapped[int] = mapped_column(db.Integer, primary_key=True)
+    started_at: Mapped[datetime] = mapped_column(db.DateTime(timezone=True))
+    completed_at: Mapped[datetime | None] = mapped_column(
+        db.DateTime(timezone=True), nullable=True
+    )
+    is_full_sync: Mapped[bool] = mapped_column(db.Boolean, default=False)
+    # Shared by every shard of a sharded run, such as the name of the Kubernetes job
+    key: Mapped[str | None] = mapped_column(
+        db.String, nullable=True, unique=True, index=True
+    )
+    shard_count: Mapped[int] = mapped_column(db.Integer, default=1)
+
+    def __repr__(self):
+        return f"<SyncRun id={self.id}, started_at={self.started_at}, completed_at={self.completed_at}, is_full_sync={self.is_full_sync}, key={self.key}, shard_count={self.shard_count}>"
+
+
+class SyncRunShard(db.Model):
+    __tablename__ = "sync_run_shards"
+
+    sync_run_id: Mapped[int] = mapped_column(
+        db.ForeignKey("sync_runs.id", ondelete="CASCADE"), primary_key=True
+    )
+    shard_index: Mapped[int] = mapped_column(db.Integer, primary_key=True)
+    completed_at: Mapped[datetime] = mapped_column(db.DateTime(timezone=True))
+
+    def __repr__(self):
+        return f"<SyncRunShard sync_run_id={self.sync_run_id}, shard_index={self.shard_index}, completed_at={self.completed_at}>"
+
+
+class SyncCheckpoint(db.Model):
+    __tablename__ = "sync_checkpoints"
+
+    id: Mapped[int] = mapped_column(db.Integer, primary_key=True)
+    sync_run_id: Mapped[int] = mapped_column(
+        db.ForeignKey("sync_runs.id", ondelete="CASCADE"), index=True
+    )
+    repository_name: Mapped[str] = mapped_column(db.String)
+    data: Mapped[dict] = mapped_column(JSON)
+
+    def __repr__(self):
+        return f"<SyncCheckpoint id={self.id}, sync_run_id={self.sync_run_id}, repository_name={self.repository_name}>"
+
+
+class WebhookDelivery(db.Model):
+    __tablename__ = "webhook_deliveries"
+
+    delivery_id: Mapped[str] = mapped_column(db.String, primary_key=True)
+    event: Mapped[str] = mapped_column(db.String)
+    received_at: Mapped[datetime] = mapped_column(db.DateTime(timezone=True))
+
+    def __repr__(self):
+        return f"<WebhookDelivery delivery_id={self.delivery_id}, event={self.event}>"
+
+
+class WebhookPendingRepository(db.Model):
+    __tablename__ = "webhook_pending_repositories"
+
+    repository_name: Mapped[str] = mapped_column(db.String, primary_key=True)
+    requested_at: Mapped[datetime] = mapped_column(
+        db.DateTime(timezone=True), index=True
+    )
+
+    def __repr__(self):
+        return f"<WebhookPendingRepository repository_name={self.repository_name}>"
@@ -0,0 +1,149 @@
+import argparse
+import json
+import logging
+from collections import Counter
+from copy import copy
+from dataclasses import asdict
+from typing import Dict, Iterator
+
+from app.app import create_app
+from app.projects.repository_standards.clients.github_snapshot_archive import (
+    GitHubSnapshotArchive,
+)
+from app.projects.repository_standards.models.repository_compliance import (
+    RepositoryComplianceReportView,
+)
+from app.projects.repository_standards.repositories.asset_repository import (
+    AssetRepository,
+    RepositoryView,
+)
+from app.projects.repository_standards.services.asset_service import AssetService
+from app.projects.repository_standards.services.repository_compliance_service import (
+    RepositoryComplianceService,
+)
+from app.shared.config.app_config import app_config
+from app.shared.config.logging_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+
+def evaluate_snapshot(
+    archive: GitHubSnapshotArchive,
+    run_id: str,
+    repository_compliance_service: RepositoryComplianceService,
+    repository_views: Dict[str, RepositoryView],
+) -> Iterator[RepositoryComplianceReportView]:
+    """
+    Evaluates the current checks against the repositories of an archived run, with
+    owners as they are in the database now. Nothing is fetched from GitHub.
+    """
+    for repository in archive.load_repositories(run_id):
+        name = repository.basic.name
+        view = copy(
+            repository_views.get(name)
+            or RepositoryView(None, name, [], [], [], [], [], [], repository)
+        )
+        view.data = repository
+        yield repository_compliance_service.get_repository_compliance_report(view)
+
+
+def summarise(reports: Dict[str, RepositoryComplianceReportView]) -> dict:
+    failures = Counter(
+        check.name
+        for report in reports.values()
+        for check in report.checks
+        if check.status != "pass"
+    )
+    return {
+        "repositories": len(reports),
+        "compliant": len(
+            [report for report in reports.values() if report.compliance_status == "pass"]
+        ),
+        "maturity_levels": dict(
+            sorted(Counter(report.maturity_level for report in reports.values()).items())
+        ),
+        "failures_by_check": dict(failures.most_common()),
+    }
+
+
+def main(
+    run_id: str | None = None,
+    compare_run_id: str | None = None,
+    output: str | None = None,
+) -> dict:
+    configure_logging(app_config.logging_level)
+    if not app_config.sync.snapshot_path:
+        raise ValueError("SYNC_SNAPSHOT_PATH is not set")
+
+    archive = GitHubSnapshotArchive(app_config.sync.snapshot_path)
+    if not run_id:
+        runs = archive.list_runs()
+        if not runs:
+            raise ValueError("No archived runs in SYNC_SNAPSHOT_PATH")
+        run_id = runs[-1]
+    asset_service = AssetService(AssetRepository())
+    repository_compliance_service = RepositoryComplianceService(asset_service)
+    repository_views = {
+        view.name: view for view in asset_service.get_all_repositories()
+    }
+
+    def evaluate(evaluated_run_id: str) -> Dict[str, RepositoryComplianceReportView]:
+        return {
+            report.name: report
+            for report in evaluate_snapshot(
+                archive,
+                evaluated_run_id,
+                repository_compliance_service,
+                repository_views,
+            )
+        }
+
+    reports = evaluate(run_id)
+    summary = summarise(reports)
+    logger.info(f"Run [ {run_id} ]: {json.dumps(summary)}")
+    result = {"run_id": run_id, **summary}
+
+    if compare_run_id:
+        compared_reports = evaluate(compare_run_id)
+        result["compare_run_id"] = compare_run_id
+        result["snapshot_diff"] = asdict(archive.diff(compare_run_id, run_id))
+        result["compliance_changes"] = {
+            name: {
+                "maturity_level": [
+                    compared_reports[name].maturity_level,
+                    report.maturity_level,
+                ],
+                "compliance_status": [
+                    compared_reports[name].compliance_status,
+                    report.compliance_status,
+                ],
+            }
+            for name, report in sorted(reports.items())
+            if name in compared_reports
+            and (
+                compared_reports[name].maturity_level != report.maturity_level
+                or compared_reports[name].compliance_status != report.compliance_status
+            )
+        }
+        logger.info(
+            f"Compared to run [ {compare_run_id} ]: [ {len(result['compliance_changes'])} ] repositories changed compliance"
+        )
+
+    if output:
+        with open(output, "w") as output_file:
+            json.dump(result, output_file, indent=2)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Evaluate the compliance checks against an archived run's GitHub payloads"
+    )
+    parser.add_argument("--run", help="The run to evaluate, the latest by default")
+    parser.add_argument("--compare-run", help="A run to diff the evaluated run against")
+    parser.add_argument("--output", help="Write the result as JSON to this file")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        main(args.run, args.compare_run, args.output)
@@ -1,19 +1,45 @@
+import argparse
 import logging
-from typing import List
+from collections import Counter
+from datetime import timedelta
+from itertools import batched
+from typing import Iterable, List, Tuple
 
 from app.app import create_app
+from app.projects.repository_standards.db_models import SyncRun
+from app.projects.repository_standards.clients.github_response_cache import (
+    GitHubResponseCache,
+)
+from app.projects.repository_standards.clients.github_snapshot_archive import (
+    GitHubSnapshotArchive,
+    GitHubSnapshotWriter,
+)
+from app.projects.repository_standards.config.repository_compliance_config import (
+    get_compliance_check_fields,
+)
+from app.projects.repository_standards.models.fetch_plan import FetchPlan
 from app.projects.repository_standards.models.repository_info import RepositoryInfo
+from app.projects.repository_standards.models.repository_shard import RepositoryShard
 from app.projects.repository_standards.repositories.asset_repository import (
     AssetRepository,
+    AssetUpsertResult,
+    RelationshipChanges,
 )
 from app.projects.repository_standards.repositories.owner_repository import (
     OwnerRepository,
+    OwnerView,
+)
+from app.projects.repository_standards.repositories.sync_run_repository import (
+    SyncRunRepository,
 )
 from app.projects.repository_standards.services.owner_service import (
     OwnerService,
 )
 from app.projects.repository_standards.services.asset_service import AssetService
 from app.projects.repository_standards.services.github_service import GithubService
+from app.projects.repository_standards.services.sync_run_service import (
+    SyncRunService,
+)
 from app.shared.config.app_config import app_config
 from app.shared.config.logging_config import configure_logging
 
@@ -31,41 +57,64 @@ def contains_one_or_more(values: list[str], lists_to_check: list[list[str]]) ->
     return found
 
 
-def main():
-    configure_logging(app_config.logging_level)
-    logger.info("Running...")
-
-    asset_service = AssetService(AssetRepository())
-    owner_service = OwnerService(OwnerRepository())
-    github_service = GithubService(
-        app_config.github.app.client_id,
-        app_config.github.app.private_key,
-        app_config.github.app.installation_id,
+def get_github_response_cache() -> GitHubResponseCache | None:
+    if not app_config.github.response_cache.enabled:
+        return None
+    return GitHubResponseCache(
+        app_config.github.response_cache.database_url
+        or app_config.postgres.sql_alchemy_database_url,
+        auth_scope=str(app_config.github.app.installation_id),
+        max_entries=app_config.github.response_cache.max_entries,
     )
 
-    owners_config = owner_service.find_all()
-    if not owners_config:
-        logger.info("No owners found, exiting early")
-        return
 
-    repositories: List[RepositoryInfo] = github_service.get_repositories()
+def get_github_snapshot_writer(
+    sync_run: SyncRun, shard: RepositoryShard
+) -> GitHubSnapshotWriter | None:
+    if not app_config.sync.snapshot_path:
+        return None
+    archive = GitHubSnapshotArchive(app_config.sync.snapshot_path)
+    run_id = str(sync_run.id)
+    # Repositories carried forward unchanged take their payloads from the last run
+    base_run_id = next(
+        (run for run in reversed(archive.list_runs()) if run != run_id), None
+    )
+    return GitHubSnapshotWriter(
+        archive, run_id, f"shard-{shard.index + 1}-of-{shard.count}", base_run_id
+    )
 
-    for owner_config in owners_config:
-        logger.info(f"Mapping Repositories for Owner [ {owner_config.name} ]")
 
-        owners = owner_service.find_by_name(owner_config.name)
-        if not owners or len(owners) == 0:
-            logger.error(f"Owner [ {owner_config.name} ] not found")
-            continue
-        owner = owners[0]
+def get_fetch_plan() -> FetchPlan:
+    fetch_plan = FetchPlan.from_fields(
+        get_compliance_check_fields(),
+        {
+            group: timedelta(hours=hours)
+            for group, hours in vars(app_config.sync.fetch_ttl_hours).items()
+        },
+    )
+    logger.info(
+        f"Fetching [ {', '.join(sorted(fetch_plan.groups))} ] for each repository"
+    )
+    return fetch_plan
 
-        for repository in repositories:
-            logger.debug(f"Mapping Repository [ {repository.basic.name} ]")
 
-            asset = asset_service.update_asset_by_name(
-                repository.basic.name, repository.to_dict()
-            )
+def map_repositories_to_owners(
+    asset_service: AssetService,
+    owners: List[Tuple[OwnerView, OwnerView]],
+    repositories: Iterable[RepositoryInfo],
+    sync_run_id: int | None = None,
+) -> Tuple[AssetUpsertResult, RelationshipChanges]:
+    repositories = list(repositories)
+    result = asset_service.update_assets_by_name(
+        {repository.basic.name: repository.to_dict() for repository in repositories},
+        sync_run_id,
+    )
+    desired = {}
+    for repository in repositories:
+        logger.debug(f"Mapping Repository [ {repository.basic.name} ]")
+        asset = result.assets[repository.basic.name]
 
+        for owner_config, owner in owners:
             repository_name_starts_with_prefix = (
                 repository.basic.name.startswith(owner_config.config.prefix)
                 if owner_config.config.prefix
@@ -79,9 +128,7 @@ def main():
                     repository.access.teams_with_admin_parents,
                 ],
             ):
-                asset_service.update_relationships_with_owner(
-                    asset, owner, "ADMIN_ACCESS"
-                )
+                desired[(asset.id, owner.id)] = "ADMIN_ACCESS"
             elif (
                 contains_one_or_more(
                     owner_config.config.teams,
@@ -92,15 +139,168 @@ def main():
                 )
                 or repository_name_starts_with_prefix
             ):
-                asset_service.update_relationships_with_owner(asset, owner, "OTHER")
+                desired[(asset.id, owner.id)] = "OTHER"
+
+    # Only the batch's own relationships are reconciled, the other batches' and
+    # shards' are left as they are
+    return result, asset_service.reconcile_relationships(
+        desired,
+        [asset.id for asset in result.assets.values()],
+        sync_run_id=sync_run_id,
+    )
+
 
-    asset_service.remove_stale_assets()
-    asset_service.remove_stale_relationships()
+def main(
+    full_sync: bool = False,
+    shard: RepositoryShard = RepositoryShard(),
+    sync_run_key: str | None = None,
+):
+    configure_logging(app_config.logging_level)
+    logger.info(f"Running shard [ {shard} ]...")
+    if shard.count > 1 and not sync_run_key:
+        raise ValueError("Sharded runs need a sync run key shared by every shard")
+
+    asset_service = AssetService(AssetRepository())
+    owner_service = OwnerService(OwnerRepository())
+    sync_run_service = SyncRunService(SyncRunRepository())
+    github_service = GithubService(
+        app_config.github.app.client_id,
+        app_config.github.app.private_key,
+        app_config.github.app.installation_id,
+        app_config.github.ingestion_mode,
+        app_config.github.crawl_workers,
+        get_github_response_cache(),
+    )
+
+    owners_config = owner_service.find_all()
+    if not owners_config:
+        logger.info("No owners found, exiting early")
+        return
+
+    is_full_sync = full_sync or sync_run_service.is_full_sync_due(
+        app_config.sync.full_sync_interval_hours
+    )
+    # An unsharded run instead resumes whichever run was last left incomplete
+    if shard.count > 1:
+        sync_run = sync_run_service.join_or_start_sync_run(
+            sync_run_key, is_full_sync=is_full_sync, shard_count=shard.count
+        )
+    else:
+        sync_run = sync_run_service.resume_or_start_sync_run(
+            is_full_sync=is_full_sync,
+            resume_window_hours=app_config.sync.resume_window_hours,
+        )
+    watermark = None if sync_run.is_full_sync else sync_run_service.get_watermark()
+
+    completed_repositories = sync_run_service.get_checkpointed_repositories(sync_run)
+    snapshot = get_github_snapshot_writer(sync_run, shard)
+    # Known repositories are passed on full syncs too, so data still within its TTL
+    # is reused rather than fetched again
+    repositories = github_service.iter_repositories(
+        known_repositories=asset_service.get_all_repository_data(),
+        changed_since=watermark,
+        completed_repositories=completed_repositories,
+        shard=shard,
+        snapshot=snapshot,
+        fetch_plan=get_fetch_plan(),
+    )
+
+    owners = []
+    for owner_config in owners_config:
+        found_owners = owner_service.find_by_name(owner_config.name)
+        if not found_owners or len(found_owners) == 0:
+            logger.error(f"Owner [ {owner_config.name} ] not found")
+            continue
+        owners.append((owner_config, found_owners[0]))
+
+    # Each batch is written while the crawl's workers fetch the next repositories
+    written = Counter()
+    reconciled = Counter()
+    for batch in batched(repositories, app_config.sync.write_batch_size):
+        result, changes = map_repositories_to_owners(
+            asset_service, owners, batch, sync_run.id
+        )
+        written.update(
+            inserted=result.inserted,
+            updated=result.updated,
+            unchanged=result.unchanged,
+        )
+        reconciled.update(
+            inserted=changes.inserted,
+            updated=changes.updated,
+            deleted=changes.deleted,
+        )
+        sync_run_service.checkpoint(
+            sync_run,
+            [
+                repository
+                for repository in batch
+                if repository.basic.name not in completed_repositories
+            ],
+        )
+
+    logger.info(
+        f"Assets inserted: [ {written['inserted']} ], updated: [ {written['updated']} ], unchanged: [ {written['unchanged']} ]"
+    )
+    logger.info(
+        f"Relationships inserted: [ {reconciled['inserted']} ], updated: [ {reconciled['updated']} ], deleted: [ {reconciled['deleted']} ]"
+    )
+
+    if snapshot:
+        snapshot.close()
+
+    github_service.api_metrics.log_summary()
+    github_service.api_metrics.publish(
+        app_config.github.api_metrics.textfile_path,
+        app_config.github.api_metrics.pushgateway_url,
+        job=f"map_github_repositories_to_owners/shard/{shard.index}",
+    )
+
+    # Stale data can only be told apart once every shard has written its share, so
+    # whichever shard finishes last cleans up and completes the run
+    if not sync_run_service.complete_shard(sync_run, shard.index):
+        logger.info(f"Shard [ {shard} ] complete, waiting on the other shards")
+        return
+
+    # Everything this run wrote is stamped with it, so whatever it did not see is
+    # stale however long it took
+    asset_service.remove_stale_assets(sync_run)
+    asset_service.remove_stale_relationships(sync_run)
+    sync_run_service.complete_sync_run(sync_run)
 
     logger.info("Complete!")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--full-sync",
+        action="store_true",
+        help="Re-enrich every repository instead of only those changed since the last run",
+    )
+    parser.add_argument(
+        "--shard-index",
+        type=int,
+        default=app_config.sync.shard_index,
+        help="The shard of the organisation's repositories to crawl, from 0",
+    )
+    parser.add_argument(
+        "--shard-count",
+        type=int,
+        default=app_config.sync.shard_count,
+        help="How many shards the crawl is split across",
+    )
+    parser.add_argument(
+        "--sync-run-key",
+        default=app_config.sync.run_key,
+        help="Identifies the sync run shared by every shard, such as the job name",
+    )
+    args = parser.parse_args()
+
     app = create_app()
     with app.app_context():
-        main()
+        main(
+            full_sync=args.full_sync,
+            shard=RepositoryShard(args.shard_index, args.shard_count),
+            sync_run_key=args.sync_run_key,
+        )
@@ -0,0 +1,43 @@
+import argparse
+import logging
+
+from app.app import create_app
+from app.projects.repository_standards.services.webhook_service import (
+    get_webhook_service,
+)
+from app.shared.config.app_config import app_config
+from app.shared.config.logging_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+
+def main(batch_size: int = 100, max_batches: int = 20) -> int:
+    """
+    Refreshes the repositories webhooks have queued, a batch at a time, until the
+    queue is empty or `max_batches` have been refreshed. Anything left is picked up
+    by the next run.
+    """
+    configure_logging(app_config.logging_level)
+    webhook_service = get_webhook_service()
+
+    refreshed = 0
+    for _ in range(max_batches):
+        count = webhook_service.refresh_pending_repositories(batch_size)
+        refreshed += count
+        if count < batch_size:
+            break
+    logger.info(f"Refreshed [ {refreshed} ] repositories queued by webhooks")
+    return refreshed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Refresh the repositories queued by GitHub webhooks"
+    )
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--max-batches", type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        main(args.batch_size, args.max_batches)
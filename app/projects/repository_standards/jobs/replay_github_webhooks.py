@@ -0,0 +1,65 @@
+import argparse
+import hashlib
+import hmac
+import json
+import logging
+import uuid
+
+import requests
+
+from app.shared.config.app_config import app_config
+from app.shared.config.logging_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+
+def replay(url: str, secret: str, recording_path: str) -> int:
+    """
+    Signs a recorded delivery like GitHub would and posts it to the receiver, for
+    testing the receiver locally without exposing it to GitHub.
+
+    A recording is a JSON file of { "event": str, "payload": dict } with an optional
+    "delivery_id"; a fresh one is generated when it is left out.
+    """
+    with open(recording_path) as recording_file:
+        recording = json.load(recording_file)
+
+    body = json.dumps(recording["payload"]).encode()
+    signature = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    response = requests.post(
+        url,
+        data=body,
+        headers={
+            "Content-Type": "application/json",
+            "X-GitHub-Delivery": recording.get("delivery_id") or str(uuid.uuid4()),
+            "X-GitHub-Event": recording["event"],
+            "X-Hub-Signature-256": f"sha256={signature}",
+        },
+        timeout=30,
+    )
+    logger.info(
+        f"Replayed [ {recording_path} ]: [ {response.status_code} ] {response.text}"
+    )
+    return response.status_code
+
+
+def main(url: str, recording_paths: list[str]):
+    configure_logging(app_config.logging_level)
+
+    for recording_path in recording_paths:
+        replay(url, app_config.github.webhook_secret, recording_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "recordings", nargs="+", help="Recorded webhook deliveries to replay"
+    )
+    parser.add_argument(
+        "--url",
+        default="http://localhost:4567/repository-standards/webhooks/github",
+        help="Webhook receiver to replay the deliveries against",
+    )
+    args = parser.parse_args()
+
+    main(args.url, args.recordings)
@@ -0,0 +1,76 @@
+from typing import Dict, List
+
+from app.projects.repository_standards.models.repository_info import RepositoryAccess
+from app.projects.repository_standards.models.team_graph import TeamGraph
+
+ADMIN_PERMISSIONS = ["admin"]
+ANY_PERMISSIONS = ["admin", "maintain", "write", "triage", "read"]
+
+# REST permission names, highest first, mapped to their role names
+REST_PERMISSIONS = {
+    "admin": "admin",
+    "maintain": "maintain",
+    "push": "write",
+    "triage": "triage",
+    "pull": "read",
+}
+
+
+def normalise_permission(permission: str | None, permissions: dict | None = None) -> str | None:
+    """
+    Convert the permission a team has on a repository to a role name. REST returns
+    a `permissions` map of booleans with a `permission`/`role_name` (`push`,
+    `write`...), and GraphQL returns the role name in upper case.
+
+    The booleans come first: for a custom role, such as `security-manager`, they
+    are those of the base role it extends, while `role_name` is the custom name.
+    Listing by team and listing by repository then agree on the role.
+    """
+    for rest_permission, role_name in REST_PERMISSIONS.items():
+        if (permissions or {}).get(rest_permission):
+            return role_name
+    if permission:
+        permission = permission.lower()
+        role_name = REST_PERMISSIONS.get(permission, permission)
+        if role_name in ANY_PERMISSIONS:
+            return role_name
+    return None
+
+
+class AccessMatrix:
+    """
+    Which teams have access to which repositories, with each team's parents resolved
+    from the `TeamGraph`. It can be filled in either per repository or per team.
+    """
+
+    def __init__(self, team_graph: TeamGraph, teams_to_ignore: List[str]):
+        self.team_graph = team_graph
+        self.teams_to_ignore = teams_to_ignore
+        self.__permissions: Dict[str, Dict[str, str]] = {}
+
+    def add(self, repository_name: str, team_slug: str, permission: str | None) -> None:
+        if team_slug in self.teams_to_ignore or permission is None:
+            return
+        self.__permissions.setdefault(repository_name, {})[team_slug] = permission
+
+    def get_repository_access(self, repository_name: str) -> RepositoryAccess:
+        teams_with_admin = []
+        teams_with_admin_parents = []
+        teams = []
+        teams_parents = []
+        for team_slug, permission in self.__permissions.get(
+            repository_name, {}
+        ).items():
+            parents = self.team_graph.get_ancestors(team_slug)
+            if permission in ADMIN_PERMISSIONS:
+                teams_with_admin.append(team_slug)
+                teams_with_admin_parents.extend(parents)
+            if permission in ANY_PERMISSIONS:
+                teams.append(team_slug)
+                teams_parents.extend(parents)
+        return RepositoryAccess(
+            teams_with_admin=teams_with_admin,
+            teams_with_admin_parents=teams_with_admin_parents,
+            teams=teams,
+            teams_parents=teams_parents,
+        )
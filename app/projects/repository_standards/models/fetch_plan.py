@@ -0,0 +1,112 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, FrozenSet, Iterable, Set, Tuple
+
+from app.projects.repository_standards.models.repository_info import RepositoryInfo
+
+# The `RepositoryInfo` fields each group of API calls fills in. Fields in no group,
+# such as the licence and default branch, come with the organisation listing the
+# crawl makes anyway, and the team access is always needed to map owners.
+FETCH_GROUP_FIELDS = {
+    "repository_settings": ["basic.delete_branch_on_merge"],
+    "branch_protection": ["default_branch_protection"],
+    "branch_rules": ["default_branch_ruleset"],
+}
+
+
+def get_fetch_group(repository_field: str) -> str | None:
+    for group, group_fields in FETCH_GROUP_FIELDS.items():
+        for group_field in group_fields:
+            if repository_field == group_field or repository_field.startswith(
+                f"{group_field}."
+            ):
+                return group
+    return None
+
+
+def get_field_value(data: dict, path: str) -> Any:
+    for key in path.split("."):
+        data = (data or {}).get(key)
+    return data
+
+
+def set_field_value(data: dict, path: str, value: Any) -> None:
+    *parents, key = path.split(".")
+    for parent in parents:
+        data = data.setdefault(parent, {})
+    data[key] = value
+
+
+@dataclass(frozen=True)
+class FetchPlan:
+    """
+    Which groups of API calls a crawl makes for each repository, derived from the
+    fields the active compliance checks read, and how long each group's data stays
+    fresh. A group still fresh from an earlier run is not fetched again; a group no
+    check reads is not fetched at all.
+    """
+
+    groups: FrozenSet[str] = frozenset(FETCH_GROUP_FIELDS)
+    ttls: Dict[str, timedelta] = field(default_factory=dict)
+
+    @classmethod
+    def from_fields(
+        cls, repository_fields: Iterable[str], ttls: Dict[str, timedelta] | None = None
+    ) -> "FetchPlan":
+        groups = {
+            get_fetch_group(repository_field) for repository_field in repository_fields
+        }
+        return cls(frozenset(groups - {None}), ttls or {})
+
+    def get_groups_to_fetch(
+        self, known: RepositoryInfo | None, now: datetime
+    ) -> Set[str]:
+        return {
+            group
+            for group in self.groups
+            if not known
+            or not self.__is_fresh(known.fetched_at.get(group), group, now)
+        }
+
+    def __is_fresh(self, fetched_at: str | None, group: str, now: datetime) -> bool:
+        ttl = self.ttls.get(group, timedelta(0))
+        return bool(fetched_at) and now - datetime.fromisoformat(fetched_at) < ttl
+
+    def apply(
+        self,
+        repository: RepositoryInfo,
+        known: RepositoryInfo | None,
+        fetched_groups: Set[str],
+        now: datetime,
+    ) -> Tuple[RepositoryInfo, Dict[str, Any]]:
+        """
+        Stamps the groups fetched with `now` and carries the other groups' fields
+        forward from `known`. Also returns the fields carried forward by path, as
+        they were not built from this run's payloads.
+        """
+        known_data = known.to_dict() if known else {}
+        reused = {}
+        fetched_at = {}
+        for group, group_fields in FETCH_GROUP_FIELDS.items():
+            if group in fetched_groups:
+                fetched_at[group] = now.isoformat()
+            elif known:
+                for group_field in group_fields:
+                    reused[group_field] = get_field_value(known_data, group_field)
+                if group in known.fetched_at:
+                    fetched_at[group] = known.fetched_at[group]
+        return replace_fields(repository, reused, fetched_at), reused
+
+
+def replace_fields(
+    repository: RepositoryInfo,
+    fields: Dict[str, Any],
+    fetched_at: Dict[str, str] | None = None,
+) -> RepositoryInfo:
+    """A copy of `repository` with the fields given by path replaced."""
+    data = repository.to_dict()
+    for path, value in fields.items():
+        set_field_value(data, path, value)
+    if fetched_at is not None:
+        data["fetched_at"] = fetched_at
+    return RepositoryInfo.from_dict(data)
@@ -1,150 +1,151 @@
 import json
 import logging
+from fnmatch import fnmatchcase
 from dataclasses import dataclass, field
-from typing import List, Optional
-
-from app.projects.repository_standards.clients.github_client import GitHubClient
+from typing import Callable, Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
 
 class RepositoryInfoFactory:
     @staticmethod
-    def from_github_repo(
-        repo,
+    def from_rest_payloads(
+        repo: dict,
+        branch_protection: dict | None,
+        branch_rules: List[dict] | None,
+        rulesets: Dict[int, dict],
         teams_with_admin,
         teams_with_admin_parents,
         teams_with_any,
         teams_with_any_parents,
-        github_client: GitHubClient,
     ):
+        """
+        Build a `RepositoryInfo` from REST payloads that have already been fetched:
+        the repository as listed, its default branch protection and rules, and the
+        rulesets those rules belong to by id. A payload that could not be fetched is
+        passed as `None` and leaves its section empty.
+        """
+        license = repo.get("license") or {}
         basic_info = BasicRepositoryInfo(
-            name=repo.name,
-            visibility=repo.visibility,
-            description=repo.description,
-            default_branch_name=repo.default_branch,
-            license=repo.license.key if repo.license else None,
-            delete_branch_on_merge=repo.delete_branch_on_merge,
+            name=repo["name"],
+            visibility=repo["visibility"],
+            description=repo.get("description"),
+            default_branch_name=repo["default_branch"],
+            license=license.get("key"),
+            delete_branch_on_merge=repo.get("delete_branch_on_merge"),
         )
 
-        security_and_analysis = repo.security_and_analysis
-        security_analysis = SecurityAndAnalysisInfo(
-            secret_scanning_status=getattr(
-                security_and_analysis.secret_scanning, "status", None
-            ),
-            secret_scanning_validity_checks=getattr(
-                security_and_analysis.secret_scanning_validity_checks, "status", None
-            ),
-            push_protection_status=getattr(
-                security_and_analysis.secret_scanning_push_protection, "status", None
-            ),
-            advanced_security=getattr(
-                security_and_analysis.advanced_security, "status", None
+        return RepositoryInfo(
+            basic=basic_info,
+            access=RepositoryAccess(
+                teams_with_admin=teams_with_admin,
+                teams_with_admin_parents=teams_with_admin_parents,
+                teams=teams_with_any,
+                teams_parents=teams_with_any_parents,
             ),
-            non_provider_patterns=getattr(
-                security_and_analysis.secret_scanning_non_provider_patterns,
-                "status",
-                None,
+            security_and_analysis=_security_and_analysis_info(
+                repo.get("security_and_analysis")
             ),
+            default_branch_protection=_branch_protection_info(branch_protection)
+            if branch_protection is not None
+            else BranchProtectionInfo(),
+            default_branch_ruleset=_branch_ruleset_info(
+                branch_rules, lambda rule: rulesets.get(rule["ruleset_id"], {})
+            )
+            if branch_rules is not None
+            else BranchRulesetInfo(),
         )
 
-        try:
-            default_branch_protection = repo.get_branch(
-                repo.default_branch
-            ).get_protection()
-            pr = (
-                default_branch_protection.required_pull_request_reviews
-                if default_branch_protection
-                else None
-            )
-            default_branch_protection = BranchProtectionInfo(
-                enabled=getattr(default_branch_protection, "enabled", False),
-                allow_force_pushes=getattr(
-                    default_branch_protection, "allow_force_pushes", False
-                ),
-                enforce_admins=getattr(
-                    default_branch_protection, "enforce_admins", False
-                ),
-                required_signatures=getattr(
-                    default_branch_protection, "required_signatures", False
-                ),
-                dismiss_stale_reviews=getattr(pr, "dismiss_stale_reviews", False),
-                require_code_owner_reviews=getattr(
-                    pr, "require_code_owner_reviews", False
-                ),
-                require_last_push_approval=getattr(
-                    pr, "require_last_push_approval", False
-                ),
-                required_approving_review_count=getattr(
-                    pr, "required_approving_review_count", 0
-                ),
-            )
-        except Exception as e:
-            default_branch_protection = None
-            logger.debug("Error getting default branch protection: %s", e)
-
-        try:
-            response = github_client.get_branch_rulesets(repo.name, repo.default_branch)
-            rules_by_type = {r["type"]: r for r in response if "type" in r}
-
-            pull_request = rules_by_type.get("pull_request", {})
-            pull_request_parameters = pull_request.get("parameters", {})
-            pull_request_ruleset_id = pull_request.get("ruleset_id", None)
-            pull_request_ruleset = (
-                github_client.get_repository_ruleset(repo.name, pull_request_ruleset_id)
-                if pull_request_ruleset_id
-                else {}
-            )
-            pull_request_rulset_enforcenment = pull_request_ruleset.get(
-                "enforcement", None
-            )
-            pull_request_rulseset_bypass_actors = pull_request_ruleset.get(
-                "bypass_actors", None
-            )
+    @staticmethod
+    def from_graphql_repo(
+        repo: dict,
+        security_and_analysis: dict | None,
+        teams_with_admin,
+        teams_with_admin_parents,
+        teams_with_any,
+        teams_with_any_parents,
+    ):
+        """
+        Build a `RepositoryInfo` from a node returned by
+        `GitHubClient.get_repositories_graphql`. The security and analysis settings
+        are not available over GraphQL so are taken from the REST repository listing.
+        """
+        default_branch = repo.get("defaultBranchRef") or {}
+        default_branch_name = default_branch.get("name")
 
-            required_signatures = rules_by_type.get("required_signatures", {})
-            required_signatures_ruleset_id = required_signatures.get("ruleset_id", None)
-            required_signatures_ruleset = (
-                github_client.get_repository_ruleset(
-                    repo.name, required_signatures_ruleset_id
-                )
-                if required_signatures_ruleset_id
-                else {}
-            )
-            required_signatures_ruleset_enforcement = required_signatures_ruleset.get(
-                "enforcement", None
-            )
-            required_signatures_ruleset_bypass_actors = required_signatures_ruleset.get(
-                "bypass_actors"
-            )
+        basic_info = BasicRepositoryInfo(
+            name=repo["name"],
+            visibility=repo["visibility"].lower(),
+            description=repo.get("description"),
+            default_branch_name=default_branch_name,
+            license=(repo.get("licenseInfo") or {}).get("key"),
+            delete_branch_on_merge=repo.get("deleteBranchOnMerge"),
+        )
+
+        security_analysis = _security_and_analysis_info(security_and_analysis)
 
-            default_branch_ruleset = BranchRulesetInfo(
-                enabled=True if response and len(response) > 0 else False,
-                pull_request_enforcement=pull_request_rulset_enforcenment,
-                pull_request_bypass_actors_length=len(
-                    pull_request_rulseset_bypass_actors
-                )
-                if pull_request_rulseset_bypass_actors
-                else None,
-                pull_request_required_approving_review_count=pull_request_parameters.get(
-                    "required_approving_review_count", None
-                ),
-                pull_request_dismiss_stale_reviews_on_push=pull_request_parameters.get(
-                    "dismiss_stale_reviews_on_push", None
-                ),
-                pull_request_require_code_owner_review=pull_request_parameters.get(
-                    "require_code_owner_review", None
-                ),
-                required_signatures_enforcement=required_signatures_ruleset_enforcement,
-                required_signatures_ruleset_bypass_actors_length=len(
-                    required_signatures_ruleset_bypass_actors
-                )
-                if required_signatures_ruleset_bypass_actors
-                else None,
+        protection_rule = default_branch.get("branchProtectionRule")
+        default_branch_protection = (
+            BranchProtectionInfo(
+                enabled=True,
+                allow_force_pushes=protection_rule["allowsForcePushes"],
+                enforce_admins=protection_rule["isAdminEnforced"],
+                required_signatures=protection_rule["requiresCommitSignatures"],
+                dismiss_stale_reviews=protection_rule["dismissesStaleReviews"],
+                require_code_owner_reviews=protection_rule["requiresCodeOwnerReviews"],
+                require_last_push_approval=protection_rule["requireLastPushApproval"],
+                required_approving_review_count=protection_rule[
+                    "requiredApprovingReviewCount"
+                ]
+                or 0,
             )
-        except Exception as e:
-            default_branch_ruleset = None
-            logger.debug("Error getting default branch rules: %s", e)
+            if protection_rule
+            else BranchProtectionInfo()
+        )
+
+        # Mirrors the REST "get rules for a branch" endpoint, which only returns
+        # rules from active rulesets that target the branch.
+        rules_by_type = {}
+        for ruleset in (repo.get("rulesets") or {}).get("nodes", []):
+            if (
+                ruleset["target"] != "BRANCH"
+                or ruleset["enforcement"] != "ACTIVE"
+                or not _ruleset_targets_branch(ruleset, default_branch_name)
+            ):
+                continue
+            for rule in ruleset["rules"]["nodes"]:
+                rules_by_type[rule["type"].lower()] = (rule, ruleset)
+
+        pull_request_rule, pull_request_ruleset = rules_by_type.get(
+            "pull_request", ({}, {})
+        )
+        pull_request_parameters = pull_request_rule.get("parameters") or {}
+        _, required_signatures_ruleset = rules_by_type.get(
+            "required_signatures", ({}, {})
+        )
+
+        default_branch_ruleset = BranchRulesetInfo(
+            enabled=len(rules_by_type) > 0,
+            pull_request_enforcement=_ruleset_enforcement(pull_request_ruleset),
+            pull_request_bypass_actors_length=_ruleset_bypass_actors_length(
+                pull_request_ruleset
+            ),
+            pull_request_required_approving_review_count=pull_request_parameters.get(
+                "requiredApprovingReviewCount"
+            ),
+            pull_request_dismiss_stale_reviews_on_push=pull_request_parameters.get(
+                "dismissStaleReviewsOnPush"
+            ),
+            pull_request_require_code_owner_review=pull_request_parameters.get(
+                "requireCodeOwnerReview"
+            ),
+            required_signatures_enforcement=_ruleset_enforcement(
+                required_signatures_ruleset
+            ),
+            required_signatures_ruleset_bypass_actors_length=_ruleset_bypass_actors_length(
+                required_signatures_ruleset
+            ),
+        )
 
         repository_access = RepositoryAccess(
             teams_with_admin=teams_with_admin,
@@ -157,12 +158,126 @@ class RepositoryInfoFactory:
             basic=basic_info,
             access=repository_access,
             security_and_analysis=security_analysis,
-            default_branch_protection=default_branch_protection
-            or BranchProtectionInfo(),
-            default_branch_ruleset=default_branch_ruleset or BranchRulesetInfo(),
+            default_branch_protection=default_branch_protection,
+            default_branch_ruleset=default_branch_ruleset,
         )
 
 
+def _security_and_analysis_info(
+    security_and_analysis: dict | None,
+) -> "SecurityAndAnalysisInfo":
+    security_and_analysis = security_and_analysis or {}
+    return SecurityAndAnalysisInfo(
+        secret_scanning_status=security_and_analysis.get("secret_scanning", {}).get(
+            "status"
+        ),
+        secret_scanning_validity_checks=security_and_analysis.get(
+            "secret_scanning_validity_checks", {}
+        ).get("status"),
+        push_protection_status=security_and_analysis.get(
+            "secret_scanning_push_protection", {}
+        ).get("status"),
+        advanced_security=security_and_analysis.get("advanced_security", {}).get(
+            "status"
+        ),
+        non_provider_patterns=security_and_analysis.get(
+            "secret_scanning_non_provider_patterns", {}
+        ).get("status"),
+    )
+
+
+def _branch_protection_info(branch_protection: dict) -> "BranchProtectionInfo":
+    pr = branch_protection.get("required_pull_request_reviews", {})
+    return BranchProtectionInfo(
+        enabled=True,
+        allow_force_pushes=branch_protection.get("allow_force_pushes", {}).get(
+            "enabled", False
+        ),
+        enforce_admins=branch_protection.get("enforce_admins", {}).get(
+            "enabled", False
+        ),
+        required_signatures=branch_protection.get("required_signatures", {}).get(
+            "enabled", False
+        ),
+        dismiss_stale_reviews=pr.get("dismiss_stale_reviews", False),
+        require_code_owner_reviews=pr.get("require_code_owner_reviews", False),
+        require_last_push_approval=pr.get("require_last_push_approval", False),
+        required_approving_review_count=pr.get("required_approving_review_count", 0),
+    )
+
+
+def _branch_ruleset_info(
+    branch_rules: List[dict], get_ruleset: Callable[[dict], dict]
+) -> "BranchRulesetInfo":
+    rules_by_type = {r["type"]: r for r in branch_rules if "type" in r}
+
+    pull_request = rules_by_type.get("pull_request", {})
+    pull_request_parameters = pull_request.get("parameters", {})
+    pull_request_ruleset = (
+        get_ruleset(pull_request) if pull_request.get("ruleset_id") else {}
+    )
+    pull_request_ruleset_bypass_actors = pull_request_ruleset.get("bypass_actors")
+
+    required_signatures = rules_by_type.get("required_signatures", {})
+    required_signatures_ruleset = (
+        get_ruleset(required_signatures)
+        if required_signatures.get("ruleset_id")
+        else {}
+    )
+    required_signatures_ruleset_bypass_actors = required_signatures_ruleset.get(
+        "bypass_actors"
+    )
+
+    return BranchRulesetInfo(
+        enabled=True if branch_rules and len(branch_rules) > 0 else False,
+        pull_request_enforcement=pull_request_ruleset.get("enforcement"),
+        pull_request_bypass_actors_length=len(pull_request_ruleset_bypass_actors)
+        if pull_request_ruleset_bypass_actors
+        else None,
+        pull_request_required_approving_review_count=pull_request_parameters.get(
+            "required_approving_review_count"
+        ),
+        pull_request_dismiss_stale_reviews_on_push=pull_request_parameters.get(
+            "dismiss_stale_reviews_on_push"
+        ),
+        pull_request_require_code_owner_review=pull_request_parameters.get(
+            "require_code_owner_review"
+        ),
+        required_signatures_enforcement=required_signatures_ruleset.get(
+            "enforcement"
+        ),
+        required_signatures_ruleset_bypass_actors_length=len(
+            required_signatures_ruleset_bypass_actors
+        )
+        if required_signatures_ruleset_bypass_actors
+        else None,
+    )
+
+
+def _ruleset_targets_branch(ruleset: dict, branch_name: str | None) -> bool:
+    ref_name = (ruleset.get("conditions") or {}).get("refName") or {}
+    ref = f"refs/heads/{branch_name}"
+
+    def matches(pattern: str) -> bool:
+        return (
+            pattern in ("~ALL", "~DEFAULT_BRANCH")
+            or fnmatchcase(ref, pattern)
+            or fnmatchcase(ref, f"refs/heads/{pattern}")
+        )
+
+    return any(matches(pattern) for pattern in ref_name.get("include", [])) and not any(
+        matches(pattern) for pattern in ref_name.get("exclude", [])
+    )
+
+
+def _ruleset_enforcement(ruleset: dict) -> Optional[str]:
+    return ruleset["enforcement"].lower() if ruleset else None
+
+
+def _ruleset_bypass_actors_length(ruleset: dict) -> Optional[int]:
+    return (ruleset.get("bypassActors") or {}).get("totalCount") or None
+
+
 @dataclass
 class BasicRepositoryInfo:
     name: str
@@ -225,6 +340,8 @@ class RepositoryInfo:
         default_factory=BranchProtectionInfo
     )
     default_branch_ruleset: BranchRulesetInfo = field(default_factory=BranchRulesetInfo)
+    # When each group of API calls was last made for the repository, by group
+    fetched_at: Dict[str, str] = field(default_factory=dict)
 
     def to_dict(self):
         return json.loads(json.dumps(self, default=lambda o: o.__dict__))
@@ -243,4 +360,5 @@ class RepositoryInfo:
             default_branch_ruleset=BranchRulesetInfo(
                 **data.get("default_branch_ruleset", {})
             ),
+            fetched_at=data.get("fetched_at", {}),
         )
@@ -0,0 +1,27 @@
+import zlib
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class RepositoryShard:
+    """
+    One of `count` disjoint partitions of the organisation's repositories. A name
+    always hashes to the same shard, so pods crawling different shards never
+    process the same repository.
+    """
+
+    index: int = 0
+    count: int = 1
+
+    def __post_init__(self):
+        if self.count < 1 or not 0 <= self.index < self.count:
+            raise ValueError(
+                f"Invalid shard [ {self.index} ] of [ {self.count} ] shards"
+            )
+
+    def contains(self, repository_name: str) -> bool:
+        # crc32 rather than hash() as str hashes are salted per process
+        return zlib.crc32(repository_name.encode()) % self.count == self.index
+
+    def __str__(self) -> str:
+        return f"{self.index + 1}/{self.count}"
@@ -0,0 +1,36 @@
+from typing import Dict, Iterable, List
+
+
+class TeamGraph:
+    """
+    The organisation's team hierarchy, loaded once per crawl so that the parents of
+    any team can be resolved without further API calls.
+    """
+
+    def __init__(self, parents: Dict[str, str | None]):
+        self.parents = parents
+        self.ancestors: Dict[str, List[str]] = {
+            slug: self.__walk_ancestors(slug) for slug in parents
+        }
+
+    @classmethod
+    def from_github_teams(cls, teams: Iterable[dict]) -> "TeamGraph":
+        """Build from REST team objects, where `parent` is a team object or `None`."""
+        return cls(
+            {team["slug"]: (team.get("parent") or {}).get("slug") for team in teams}
+        )
+
+    def __walk_ancestors(self, slug: str) -> List[str]:
+        ancestors = []
+        parent = self.parents.get(slug)
+        # Guards against a cycle rather than looping forever
+        while parent and parent not in ancestors and parent != slug:
+            ancestors.append(parent)
+            parent = self.parents.get(parent)
+        return ancestors
+
+    def get_ancestors(self, slug: str) -> List[str]:
+        return list(self.ancestors.get(slug, []))
+
+    def __len__(self) -> int:
+        return len(self.parents)
@@ -1,16 +1,36 @@
 import json
 import logging
-from datetime import datetime, timedelta
-from typing import List
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from itertools import batched
+from typing import Collection, List, Tuple
 
 from flask import g
+from sqlalchemy import (
+    and_,
+    delete,
+    exists,
+    false,
+    func,
+    insert,
+    or_,
+    select,
+    type_coerce,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import scoped_session
 
-from app.projects.repository_standards.db_models import Asset, Owner, Relationship, db
-from app.projects.repository_standards.models.repository_info import RepositoryInfo
-from app.projects.repository_standards.repositories.owner_repository import (
-    OwnerView,
+from app.projects.repository_standards.db_models import (
+    Asset,
+    Owner,
+    OwnerTypes,
+    Relationship,
+    SyncRun,
+    db,
 )
+from app.projects.repository_standards.models.repository_info import RepositoryInfo
 
 
 class RepositoryView:
@@ -37,66 +57,188 @@ class RepositoryView:
         self.data = data
 
     @classmethod
-    def from_asset(cls, asset: Asset):
-        owners = [relationship.owner for relationship in asset.relationships]
+    def from_owners(
+        cls,
+        id: int,
+        name: str,
+        data: dict,
+        owners: List[Tuple[str, str, str]],
+    ):
+        """`owners` are the (relationship type, owner name, owner type) of the asset."""
         admin_owners = [
-            relationship.owner
-            for relationship in asset.relationships
-            if "ADMIN_ACCESS" in relationship.type
+            (owner_name, owner_type)
+            for relationship_type, owner_name, owner_type in owners
+            if "ADMIN_ACCESS" in relationship_type
         ]
+        owners = [(owner_name, owner_type) for _, owner_name, owner_type in owners]
 
         return cls(
-            id=asset.id,
-            name=asset.name,
-            owner_names=[owner.name for owner in owners],
-            admin_owner_names=[owner.name for owner in admin_owners],
+            id=id,
+            name=name,
+            owner_names=[owner_name for owner_name, _ in owners],
+            admin_owner_names=[owner_name for owner_name, _ in admin_owners],
             business_unit_owner_names=[
-                owner.name for owner in owners if owner.type.name == "BUSINESS_UNIT"
+                owner_name
+                for owner_name, owner_type in owners
+                if owner_type == "BUSINESS_UNIT"
             ],
             business_unit_admin_owner_names=[
-                owner.name
-                for owner in admin_owners
-                if owner.type.name == "BUSINESS_UNIT"
+                owner_name
+                for owner_name, owner_type in admin_owners
+                if owner_type == "BUSINESS_UNIT"
             ],
             team_owner_names=[
-                owner.name for owner in owners if owner.type.name == "TEAM"
+                owner_name for owner_name, owner_type in owners if owner_type == "TEAM"
             ],
             team_admin_owner_names=[
-                owner.name for owner in admin_owners if owner.type.name == "TEAM"
+                owner_name
+                for owner_name, owner_type in admin_owners
+                if owner_type == "TEAM"
             ],
-            data=RepositoryInfo.from_dict(asset.data),
+            data=RepositoryInfo.from_dict(data),
         )
 
 
+@dataclass
+class AssetUpsertResult:
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    assets: dict[str, Asset] = field(default_factory=dict)
+
+
+@dataclass
+class RelationshipChanges:
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+
+
 class AssetRepository:
     def __init__(self, db_session: scoped_session = db.session):
         self.db_session = db_session
 
     def find_all(self) -> list[RepositoryView]:
-        assets = self.db_session.query(Asset).all()
-
-        return [RepositoryView.from_asset(asset) for asset in assets]
+        return self.__find_views()
 
     def find_all_by_owners(self, owner_names: list[str]) -> list[RepositoryView]:
-        assets = (
-            self.db_session.query(Asset)
-            .join(Asset.relationships.owners)
-            .filter(Owner.name.in_(owner_names))
-            .distinct()
-            .all()
+        return self.__find_views(
+            Asset.id.in_(
+                select(Relationship.assets_id)
+                .join(Owner, Relationship.owners_id == Owner.id)
+                .where(Owner.name.in_(owner_names))
+            )
         )
 
-        return [RepositoryView.from_asset(asset) for asset in assets]
-
     def find_all_by_owner(self, owner_name: str) -> list[RepositoryView]:
+        return self.find_all_by_owners([owner_name])
+
+    def find_all_by_admin_teams(self, teams: List[str]) -> list[RepositoryView]:
+        """The repositories any of `teams`, or teams under them, administer."""
+        return self.__find_views(
+            self.__has_any_team(["teams_with_admin", "teams_with_admin_parents"], teams)
+        )
+
+    def find_all_by_teams(
+        self, teams: List[str], name_prefix: str | None = None
+    ) -> list[RepositoryView]:
+        """
+        The repositories any of `teams`, or teams under them, have other access to,
+        or whose name starts with `name_prefix`.
+        """
+        criteria = self.__has_any_team(["teams", "teams_parents"], teams)
+        if name_prefix:
+            criteria = or_(
+                criteria, Asset.name.startswith(name_prefix, autoescape=True)
+            )
+        return self.__find_views(criteria)
+
+    def find_all_by_security_and_analysis(
+        self, **settings: str
+    ) -> list[RepositoryView]:
+        """
+        The repositories with all of the given security settings, such as
+        `secret_scanning_status="disabled"`.
+        """
+        if self.__dialect() == "postgresql":
+            criteria = type_coerce(
+                Asset.data["security_and_analysis"], JSONB
+            ).contains(settings)
+        else:
+            criteria = and_(
+                *(
+                    func.json_extract(Asset.data, f"$.security_and_analysis.{key}")
+                    == value
+                    for key, value in settings.items()
+                )
+            )
+        return self.__find_views(criteria)
+
+    def __has_any_team(self, team_fields: List[str], teams: List[str]):
+        if not teams:
+            return false()
+        if self.__dialect() == "postgresql":
+            # `?|` on the expressions the GIN indexes are built on
+            return or_(
+                *(
+                    type_coerce(Asset.data["access"][team_field], JSONB).has_any(
+                        postgresql.array(teams)
+                    )
+                    for team_field in team_fields
+                )
+            )
+        criteria = []
+        for team_field in team_fields:
+            team = func.json_each(Asset.data, f"$.access.{team_field}").table_valued(
+                "value"
+            )
+            criteria.append(
+                exists(select(1).select_from(team).where(team.c.value.in_(teams)))
+            )
+        return or_(*criteria)
+
+    def __dialect(self) -> str:
+        return self.db_session.get_bind().dialect.name
+
+    def find_view_by_name(self, name: str) -> RepositoryView | None:
+        views = self.__find_views(Asset.name == name)
+        return views[0] if views else None
+
+    def __find_views(self, *criteria) -> list[RepositoryView]:
+        """
+        Builds the views of the assets matching `criteria` with two queries, one for
+        the assets and one for all of their owners, however many there are.
+        """
         assets = (
-            self.db_session.query(Asset)
-            .join(Asset.relationships.owners)
-            .filter(Asset.relationships.owners.any(name=owner_name))
+            self.db_session.query(Asset.id, Asset.name, Asset.data)
+            .filter(*criteria)
+            .order_by(Asset.id)
             .all()
         )
+        owners_by_asset: dict[int, list[Tuple[str, str, str]]] = {}
+        for assets_id, relationship_type, owner_name, owner_type in (
+            self.db_session.query(
+                Relationship.assets_id,
+                Relationship.type,
+                Owner.name,
+                OwnerTypes.name,
+            )
+            .join(Owner, Relationship.owners_id == Owner.id)
+            .join(OwnerTypes, Owner.type_id == OwnerTypes.id)
+            .filter(Relationship.assets_id.in_(select(Asset.id).where(*criteria)))
+            .order_by(Relationship.id)
+        ):
+            owners_by_asset.setdefault(assets_id, []).append(
+                (relationship_type, owner_name, owner_type)
+            )
 
-        return [RepositoryView.from_asset(asset) for asset in assets]
+        return [
+            RepositoryView.from_owners(
+                asset_id, name, data, owners_by_asset.get(asset_id, [])
+            )
+            for asset_id, name, data in assets
+        ]
 
     def add_asset(self, name: str, type: str, data: dict) -> Asset:
         asset = Asset()
@@ -108,17 +250,11 @@ class AssetRepository:
         self.db_session.commit()
         return asset
 
-    def create_relationship(
-        self, asset: Asset, owner: OwnerView, relationship_type: str
-    ) -> Relationship:
-        relationship = Relationship()
-        relationship.owners_id = owner.id
-        relationship.assets_id = asset.id
-        relationship.type = relationship_type
-        relationship.last_updated = datetime.now()
-        self.db_session.add(relationship)
-        self.db_session.commit()
-        return relationship
+    def find_all_data(self) -> dict[str, dict]:
+        return {
+            name: data
+            for name, data in self.db_session.query(Asset.name, Asset.data).all()
+        }
 
     def find_by_name(self, name: str) -> List[Asset]:
         assets = self.db_session.query(Asset).filter(Asset.name == name).all()
@@ -128,45 +264,6 @@ class AssetRepository:
         asset = self.db_session.query(Asset).filter(Asset.id == asset_id).first()
         return asset
 
-    def update_relationship_with_owner(
-        self, asset: Asset, owner: OwnerView, relationship_type: str
-    ) -> Relationship:
-        relationships = (
-            self.db_session.query(Relationship)
-            .filter_by(assets_id=asset.id, owners_id=owner.id)
-            .all()
-        )
-
-        if len(relationships) > 1:
-            raise ValueError(
-                f"Asset [ {asset.name} ] has multiple relationships with Owner [ {owner.name} ]"
-            )
-
-        if len(relationships) == 0:
-            logging.debug(
-                f"Asset [ {asset.name} ] has no relationships with [ {owner.name} ] - creating new relationship [ {relationship_type} ] "
-            )
-            return self.create_relationship(asset, owner, relationship_type)
-
-        relationship = relationships[0]
-
-        if relationship.type == relationship_type:
-            logging.debug(
-                f"No relationship change between Asset [ {asset.name} ] and Owner [ {owner.name} ] - only updating last_updated date"
-            )
-            relationship.last_updated = datetime.now()
-            self.db_session.commit()
-            return relationship
-
-        logging.debug(
-            f"Asset [ {asset.name} ] has one relationships with [ {owner.name} ] - updating relationship from [ {relationship.type} ] to new relationship [ {relationship_type} ] "
-        )
-        relationship.type = relationship_type
-        relationship.last_updated = datetime.now()
-        self.db_session.commit()
-
-        return relationship
-
     def update_by_name(self, name: str, data: dict) -> Asset:
         assets = self.find_by_name(name)
 
@@ -189,26 +286,215 @@ class AssetRepository:
 
         return assets[0]
 
-    def remove_stale_assets(self):
-        stale_assets = self.db_session.query(Asset).filter(
-            Asset.last_updated < datetime.today() - timedelta(days=1)
+    def upsert_by_name(
+        self,
+        data_by_name: dict[str, dict],
+        type: str = "REPOSITORY",
+        sync_run_id: int | None = None,
+        batch_size: int = 500,
+    ) -> AssetUpsertResult:
+        """
+        Inserts or updates the assets with one `INSERT ... ON CONFLICT (name)` per
+        `batch_size` assets, all committed at once. Unchanged assets are written too,
+        so every asset is stamped with the `sync_run_id` that saw it.
+        """
+        result = AssetUpsertResult()
+        insert = (
+            postgresql.insert if self.__dialect() == "postgresql" else sqlite.insert
         )
-        for asset in stale_assets:
-            logging.info(f"Removing stale asset: {asset.name}")
+        now = datetime.now()
+        for names in batched(data_by_name, batch_size):
+            existing = dict(
+                self.db_session.query(Asset.name, Asset.data)
+                .filter(Asset.name.in_(names))
+                .all()
+            )
+            for name in names:
+                if name not in existing:
+                    result.inserted += 1
+                elif existing[name] != data_by_name[name]:
+                    result.updated += 1
+                else:
+                    result.unchanged += 1
+
+            statement = insert(Asset).values(
+                [
+                    {
+                        "name": name,
+                        "type": type,
+                        "data": data_by_name[name],
+                        "last_updated": now,
+                        "sync_run_id": sync_run_id,
+                    }
+                    for name in names
+                ]
+            )
+            set_ = {
+                "data": statement.excluded.data,
+                "last_updated": statement.excluded.last_updated,
+            }
+            if sync_run_id is not None:
+                set_["sync_run_id"] = statement.excluded.sync_run_id
+            self.db_session.execute(
+                statement.on_conflict_do_update(index_elements=["name"], set_=set_)
+            )
+        self.db_session.commit()
+
+        for names in batched(data_by_name, batch_size):
+            result.assets.update(
+                (asset.name, asset)
+                for asset in self.db_session.query(Asset).filter(Asset.name.in_(names))
+            )
+        return result
+
+    def reconcile_relationships(
+        self,
+        desired: dict[tuple[int, int], str],
+        asset_ids: Collection[int] | None = None,
+        owner_ids: Collection[int] | None = None,
+        sync_run_id: int | None = None,
+        batch_size: int = 500,
+    ) -> RelationshipChanges:
+        """
+        Brings the relationships of the given assets and owners in line with
+        `desired`, the relationship type by (asset id, owner id), in one transaction.
+        The current relationships are read with one query, then only the ones to
+        insert, change type or delete are written, `batch_size` at a time.
+
+        Relationships outside of `asset_ids` and `owner_ids` are left alone, so a
+        caller only reconciling some assets does not remove the others'.
+
+        Every desired relationship is stamped with `sync_run_id` when given, which
+        for unchanged relationships is one more UPDATE.
+        """
+        query = self.db_session.query(
+            Relationship.id,
+            Relationship.assets_id,
+            Relationship.owners_id,
+            Relationship.type,
+            Relationship.sync_run_id,
+        )
+        if asset_ids is not None:
+            query = query.filter(Relationship.assets_id.in_(asset_ids))
+        if owner_ids is not None:
+            query = query.filter(Relationship.owners_id.in_(owner_ids))
+
+        changes = RelationshipChanges()
+        current = {}
+        ids_by_type: dict[str, list[int]] = {}
+        ids_to_delete = []
+        ids_to_stamp = []
+        for relationship_id, assets_id, owners_id, type, stamped in query.all():
+            key = (assets_id, owners_id)
+            # A pair related twice keeps whichever relationship was read first
+            if key in current or key not in desired:
+                ids_to_delete.append(relationship_id)
+                continue
+            current[key] = type
+            if type != desired[key]:
+                ids_by_type.setdefault(desired[key], []).append(relationship_id)
+                continue
+            changes.unchanged += 1
+            if sync_run_id is not None and stamped != sync_run_id:
+                ids_to_stamp.append(relationship_id)
+
+        now = datetime.now()
+        stamp = {"sync_run_id": sync_run_id} if sync_run_id is not None else {}
+        to_insert = [
+            {
+                "assets_id": assets_id,
+                "owners_id": owners_id,
+                "type": type,
+                "last_updated": now,
+                "sync_run_id": sync_run_id,
+            }
+            for (assets_id, owners_id), type in desired.items()
+            if (assets_id, owners_id) not in current
+        ]
+        for rows in batched(to_insert, batch_size):
+            self.db_session.execute(insert(Relationship), list(rows))
+        for type, ids in ids_by_type.items():
+            for ids_batch in batched(ids, batch_size):
+                self.db_session.execute(
+                    update(Relationship)
+                    .where(Relationship.id.in_(ids_batch))
+                    .values(type=type, last_updated=now, **stamp)
+                    .execution_options(synchronize_session=False)
+                )
+        for ids_batch in batched(ids_to_stamp, batch_size):
+            self.db_session.execute(
+                update(Relationship)
+                .where(Relationship.id.in_(ids_batch))
+                .values(**stamp)
+                .execution_options(synchronize_session=False)
+            )
+        for ids_batch in batched(ids_to_delete, batch_size):
+            self.db_session.execute(
+                delete(Relationship)
+                .where(Relationship.id.in_(ids_batch))
+                .execution_options(synchronize_session=False)
+            )
+        self.db_session.commit()
+
+        changes.inserted = len(to_insert)
+        changes.updated = sum(len(ids) for ids in ids_by_type.values())
+        changes.deleted = len(ids_to_delete)
+        return changes
+
+    def remove_by_name(self, name: str) -> None:
+        for asset in self.find_by_name(name):
+            logging.info(f"Removing asset: {asset.name}")
             self.db_session.query(Relationship).filter_by(assets_id=asset.id).delete()
             self.db_session.delete(asset)
-
         self.db_session.commit()
 
-    def remove_stale_relationships(self):
-        stale_relationships = self.db_session.query(Relationship).filter(
-            Relationship.last_updated < datetime.today() - timedelta(days=1)
+    def remove_stale_assets(self, sync_run: SyncRun) -> int:
+        """
+        Removes the assets `sync_run` did not see, and their relationships, with
+        one DELETE each. Returns how many assets were removed.
+        """
+        stale_asset_ids = select(Asset.id).where(_is_stale(Asset, sync_run))
+        self.db_session.execute(
+            delete(Relationship)
+            .where(Relationship.assets_id.in_(stale_asset_ids))
+            .execution_options(synchronize_session=False)
         )
-        for relationship in stale_relationships:
-            logging.info(f"Removing stale relationship: {relationship.id}")
-            self.db_session.delete(relationship)
-
+        removed = self.db_session.execute(
+            delete(Asset)
+            .where(_is_stale(Asset, sync_run))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        self.db_session.commit()
+        logging.info(f"Removed [ {removed} ] stale assets")
+        return removed
+
+    def remove_stale_relationships(self, sync_run: SyncRun) -> int:
+        """Removes the relationships `sync_run` did not see with one DELETE."""
+        removed = self.db_session.execute(
+            delete(Relationship)
+            .where(_is_stale(Relationship, sync_run))
+            .execution_options(synchronize_session=False)
+        ).rowcount
         self.db_session.commit()
+        logging.info(f"Removed [ {removed} ] stale relationships")
+        return removed
+
+
+def _is_stale(model: type[Asset] | type[Relationship], sync_run: SyncRun):
+    """
+    Rows stamped by an earlier run are stale. Rows no run has stamped, written
+    before runs stamped them or by a webhook, are only stale if they were written
+    before `sync_run` started, so a webhook's write during the run is kept.
+    """
+    started_at = sync_run.started_at
+    if started_at.tzinfo is None:
+        started_at = started_at.replace(tzinfo=timezone.utc)
+    # `last_updated` is naive local time, unlike the sync run's timestamps
+    started_at = started_at.astimezone().replace(tzinfo=None)
+    return or_(
+        model.sync_run_id < sync_run.id,
+        and_(model.sync_run_id.is_(None), model.last_updated < started_at),
+    )
 
 
 def get_asset_repository() -> AssetRepository:
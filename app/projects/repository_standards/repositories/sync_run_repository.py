@@ -0,0 +1,100 @@
+from datetime import datetime, timezone
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import scoped_session
+
+from app.projects.repository_standards.db_models import (
+    SyncCheckpoint,
+    SyncRun,
+    SyncRunShard,
+    db,
+)
+
+
+class SyncRunRepository:
+    def __init__(self, db_session: scoped_session = db.session):
+        self.db_session = db_session
+
+    def add_sync_run(
+        self, is_full_sync: bool, key: str | None = None, shard_count: int = 1
+    ) -> SyncRun | None:
+        """Returns `None` if a run with the same key was added first."""
+        sync_run = SyncRun()
+        sync_run.started_at = datetime.now(timezone.utc)
+        sync_run.is_full_sync = is_full_sync
+        sync_run.key = key
+        sync_run.shard_count = shard_count
+        self.db_session.add(sync_run)
+        try:
+            self.db_session.commit()
+        except IntegrityError:
+            self.db_session.rollback()
+            return None
+        return sync_run
+
+    def complete(self, sync_run: SyncRun) -> SyncRun:
+        sync_run.completed_at = datetime.now(timezone.utc)
+        self.db_session.commit()
+        return sync_run
+
+    def find_by_key(self, key: str) -> SyncRun | None:
+        return self.db_session.query(SyncRun).filter(SyncRun.key == key).first()
+
+    def complete_shard(self, sync_run: SyncRun, shard_index: int) -> int:
+        """Records the shard as complete, returning how many shards now are."""
+        self.db_session.add(
+            SyncRunShard(
+                sync_run_id=sync_run.id,
+                shard_index=shard_index,
+                completed_at=datetime.now(timezone.utc),
+            )
+        )
+        try:
+            self.db_session.commit()
+        except IntegrityError:
+            # A retried shard completing a second time
+            self.db_session.rollback()
+        return (
+            self.db_session.query(SyncRunShard)
+            .filter(SyncRunShard.sync_run_id == sync_run.id)
+            .count()
+        )
+
+    def find_last_completed(self, is_full_sync: bool | None = None) -> SyncRun | None:
+        query = self.db_session.query(SyncRun).filter(
+            SyncRun.completed_at.is_not(None)
+        )
+        if is_full_sync is not None:
+            query = query.filter(SyncRun.is_full_sync == is_full_sync)
+        return query.order_by(SyncRun.started_at.desc()).first()
+
+    def find_last_incomplete(self, started_after: datetime) -> SyncRun | None:
+        return (
+            self.db_session.query(SyncRun)
+            .filter(SyncRun.completed_at.is_(None))
+            .filter(SyncRun.key.is_(None))
+            .filter(SyncRun.started_at >= started_after)
+            .order_by(SyncRun.started_at.desc())
+            .first()
+        )
+
+    def add_checkpoints(self, sync_run: SyncRun, data_by_name: dict[str, dict]) -> None:
+        self.db_session.add_all(
+            SyncCheckpoint(sync_run_id=sync_run.id, repository_name=name, data=data)
+            for name, data in data_by_name.items()
+        )
+        self.db_session.commit()
+
+    def find_checkpoints(self, sync_run: SyncRun) -> dict[str, dict]:
+        return {
+            checkpoint.repository_name: checkpoint.data
+            for checkpoint in self.db_session.query(SyncCheckpoint).filter(
+                SyncCheckpoint.sync_run_id == sync_run.id
+            )
+        }
+
+    def delete_checkpoints(self, sync_run: SyncRun) -> None:
+        self.db_session.query(SyncCheckpoint).filter(
+            SyncCheckpoint.sync_run_id == sync_run.id
+        ).delete()
+        self.db_session.commit()
@@ -0,0 +1,100 @@
+from datetime import datetime, timezone
+from typing import List, Tuple
+
+from flask import g
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import scoped_session
+
+from app.projects.repository_standards.db_models import (
+    WebhookDelivery,
+    WebhookPendingRepository,
+    db,
+)
+
+
+class WebhookDeliveryRepository:
+    def __init__(self, db_session: scoped_session = db.session):
+        self.db_session = db_session
+
+    def add_delivery(self, delivery_id: str, event: str) -> bool:
+        """Record a delivery, returning `False` if it had already been recorded."""
+        delivery = WebhookDelivery()
+        delivery.delivery_id = delivery_id
+        delivery.event = event
+        delivery.received_at = datetime.now(timezone.utc)
+        self.db_session.add(delivery)
+        try:
+            self.db_session.commit()
+        except IntegrityError:
+            self.db_session.rollback()
+            return False
+        return True
+
+    def delete_delivery(self, delivery_id: str) -> None:
+        self.db_session.query(WebhookDelivery).filter(
+            WebhookDelivery.delivery_id == delivery_id
+        ).delete()
+        self.db_session.commit()
+
+    def add_pending_repositories(self, repository_names: List[str]) -> None:
+        """
+        Queue repositories to be refreshed. A repository already queued is queued
+        again from now, so a refresh already under way does not dequeue it.
+        """
+        if not repository_names:
+            return
+        insert = (
+            postgresql.insert
+            if self.db_session.get_bind().dialect.name == "postgresql"
+            else sqlite.insert
+        )
+        statement = insert(WebhookPendingRepository).values(
+            [
+                {
+                    "repository_name": repository_name,
+                    "requested_at": datetime.now(timezone.utc),
+                }
+                for repository_name in sorted(set(repository_names))
+            ]
+        )
+        self.db_session.execute(
+            statement.on_conflict_do_update(
+                index_elements=["repository_name"],
+                set_={"requested_at": statement.excluded.requested_at},
+            )
+        )
+        self.db_session.commit()
+
+    def find_pending_repositories(self, limit: int) -> List[Tuple[str, datetime]]:
+        """The longest queued repositories, with when they were queued."""
+        return [
+            (repository_name, requested_at)
+            for repository_name, requested_at in self.db_session.execute(
+                select(
+                    WebhookPendingRepository.repository_name,
+                    WebhookPendingRepository.requested_at,
+                )
+                .order_by(WebhookPendingRepository.requested_at)
+                .limit(limit)
+            )
+        ]
+
+    def remove_pending_repository(
+        self, repository_name: str, requested_at: datetime
+    ) -> None:
+        """Dequeue a repository, unless it was queued again after `requested_at`."""
+        self.db_session.execute(
+            delete(WebhookPendingRepository).where(
+                WebhookPendingRepository.repository_name == repository_name,
+                WebhookPendingRepository.requested_at <= requested_at,
+            )
+        )
+        self.db_session.commit()
+
+
+def get_webhook_delivery_repository() -> WebhookDeliveryRepository:
+    if "webhook_delivery_repository" not in g:
+        g.webhook_delivery_repository = WebhookDeliveryRepository()
+    return g.webhook_delivery_repository
@@ -1,9 +1,14 @@
+import logging
+
 import requests
 from flask import Blueprint, Response, request
 
 from app.projects.repository_standards.services.repository_compliance_service import (
     get_repository_compliance_service,
 )
+from app.shared.services.http_transport import get_http_transport
+
+logger = logging.getLogger(__name__)
 
 repository_standards_api = Blueprint("repository_standards_api", __name__)
 
@@ -22,7 +27,15 @@ def get_repository_badge(repository_name: str):
     shields_url = repository_compliance_service.get_repository_compliance_badge_shield_url_by_name(
         repository_name, style
     )
-    shields_response = requests.get(shields_url, stream=True)
+    # The worker is held for the whole call, so a slow badge is given up on quickly
+    try:
+        shields_response = get_http_transport("shields").request(
+            "GET", shields_url, deadline_seconds=5
+        )
+        shields_response.raise_for_status()
+    except requests.RequestException as e:
+        logger.warning(f"Unable to fetch badge for [ {repository_name} ]: {e}")
+        return "Badge unavailable", 502
     return Response(
         shields_response.content, content_type=shields_response.headers["content-type"]
     )
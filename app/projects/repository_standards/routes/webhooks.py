@@ -0,0 +1,45 @@
+import json
+import logging
+from urllib.parse import parse_qs
+
+from flask import Blueprint, request
+
+from app.projects.repository_standards.services.webhook_service import (
+    get_webhook_service,
+    is_valid_signature,
+)
+from app.shared.config.app_config import app_config
+
+logger = logging.getLogger(__name__)
+
+repository_standards_webhooks = Blueprint("repository_standards_webhooks", __name__)
+
+
+@repository_standards_webhooks.route("/github", methods=["POST"])
+def github_webhook():
+    body = request.get_data()
+    if not is_valid_signature(
+        app_config.github.webhook_secret,
+        body,
+        request.headers.get("X-Hub-Signature-256"),
+    ):
+        logger.warning("Rejecting Webhook With Invalid Signature")
+        return "Invalid signature", 401
+
+    delivery_id = request.headers.get("X-GitHub-Delivery")
+    event = request.headers.get("X-GitHub-Event")
+    if not delivery_id or not event:
+        return "Missing delivery headers", 400
+
+    # Webhooks set to application/x-www-form-urlencoded send the JSON as the
+    # `payload` field, so the body that was signed is parsed either way
+    if request.mimetype == "application/x-www-form-urlencoded":
+        body = parse_qs(body.decode()).get("payload", [""])[0]
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return "Invalid payload, expected JSON", 400
+    if not isinstance(payload, dict):
+        return "Invalid payload, expected a JSON object", 400
+
+    return get_webhook_service().handle(delivery_id, event, payload), 200
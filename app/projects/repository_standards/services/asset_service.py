@@ -1,16 +1,16 @@
-from typing import List
+from typing import Collection, List
 
 from flask import g
 
-from app.projects.repository_standards.db_models import Asset
+from app.projects.repository_standards.db_models import Asset, SyncRun
+from app.projects.repository_standards.models.repository_info import RepositoryInfo
 from app.projects.repository_standards.repositories.asset_repository import (
     AssetRepository,
+    AssetUpsertResult,
+    RelationshipChanges,
     RepositoryView,
     get_asset_repository,
 )
-from app.projects.repository_standards.repositories.owner_repository import (
-    OwnerView,
-)
 
 
 class AssetService:
@@ -21,6 +21,25 @@ class AssetService:
         repositories = self.__asset_repository.find_all()
         return repositories
 
+    def get_repositories_by_admin_teams(self, teams: List[str]) -> List[RepositoryView]:
+        return self.__asset_repository.find_all_by_admin_teams(teams)
+
+    def get_repositories_by_teams(
+        self, teams: List[str], name_prefix: str | None = None
+    ) -> List[RepositoryView]:
+        return self.__asset_repository.find_all_by_teams(teams, name_prefix)
+
+    def get_repositories_by_security_and_analysis(
+        self, **settings: str
+    ) -> List[RepositoryView]:
+        return self.__asset_repository.find_all_by_security_and_analysis(**settings)
+
+    def get_all_repository_data(self) -> dict[str, RepositoryInfo]:
+        return {
+            name: RepositoryInfo.from_dict(data)
+            for name, data in self.__asset_repository.find_all_data().items()
+        }
+
     def is_owner_authoritative_for_repository(
         self, repository: RepositoryView, owner_to_filter_by: str
     ) -> bool:
@@ -36,11 +55,15 @@ class AssetService:
 
         return has_authoritative_ownership
 
-    def update_relationships_with_owner(
-        self, asset: Asset, owner: OwnerView, relationship_type: str
-    ):
-        self.__asset_repository.update_relationship_with_owner(
-            asset, owner, relationship_type
+    def reconcile_relationships(
+        self,
+        desired: dict[tuple[int, int], str],
+        asset_ids: Collection[int] | None = None,
+        owner_ids: Collection[int] | None = None,
+        sync_run_id: int | None = None,
+    ) -> RelationshipChanges:
+        return self.__asset_repository.reconcile_relationships(
+            desired, asset_ids, owner_ids, sync_run_id
         )
 
     def find_asset_by_id(self, asset_id: int) -> Asset | None:
@@ -49,15 +72,24 @@ class AssetService:
     def update_asset_by_name(self, name: str, data: dict) -> Asset:
         return self.__asset_repository.update_by_name(name, data)
 
+    def update_assets_by_name(
+        self, data_by_name: dict[str, dict], sync_run_id: int | None = None
+    ) -> AssetUpsertResult:
+        return self.__asset_repository.upsert_by_name(
+            data_by_name, sync_run_id=sync_run_id
+        )
+
     def get_repository_by_name(self, name: str) -> RepositoryView | None:
-        asset = self.__asset_repository.find_by_name(name)
-        return RepositoryView.from_asset(asset[0]) if len(asset) > 0 else None
+        return self.__asset_repository.find_view_by_name(name)
+
+    def remove_asset_by_name(self, name: str) -> None:
+        self.__asset_repository.remove_by_name(name)
 
-    def remove_stale_assets(self):
-        self.__asset_repository.remove_stale_assets()
+    def remove_stale_assets(self, sync_run: SyncRun) -> int:
+        return self.__asset_repository.remove_stale_assets(sync_run)
 
-    def remove_stale_relationships(self):
-        self.__asset_repository.remove_stale_assets()
+    def remove_stale_relationships(self, sync_run: SyncRun) -> int:
+        return self.__asset_repository.remove_stale_relationships(sync_run)
 
 
 def get_asset_service() -> AssetService:
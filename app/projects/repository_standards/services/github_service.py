@@ -1,21 +1,71 @@
+import asyncio
 import logging
-from typing import List
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Iterator, List
 
-from github import Auth, Github
-from github.Repository import Repository
-from github.Team import Team
+from flask import g
 
-from app.projects.repository_standards.clients.github_client import (
-    retries_github_rate_limit_exception_at_next_reset_once,
-    GitHubClient,
+from app.projects.repository_standards.clients.async_github_client import (
+    AsyncGitHubClient,
 )
+from app.projects.repository_standards.clients.github_api_metrics import (
+    GitHubApiMetrics,
+    get_github_api_metrics,
+)
+from app.projects.repository_standards.clients.github_client import GitHubClient
+from app.projects.repository_standards.clients.github_snapshot_archive import (
+    GitHubSnapshotWriter,
+    graphql_snapshot_record,
+    repository_info_snapshot_record,
+    rest_snapshot_record,
+)
+from app.projects.repository_standards.clients.github_rate_limit_governor import (
+    RateLimitGovernor,
+)
+from app.projects.repository_standards.clients.github_response_cache import (
+    GitHubResponseCache,
+)
+from app.projects.repository_standards.clients.ruleset_cache import (
+    AsyncRulesetCache,
+    RulesetCache,
+)
+from app.projects.repository_standards.models.access_matrix import (
+    AccessMatrix,
+    normalise_permission,
+)
+from app.projects.repository_standards.models.fetch_plan import (
+    FETCH_GROUP_FIELDS,
+    FetchPlan,
+    replace_fields,
+)
+from app.projects.repository_standards.models.repository_shard import RepositoryShard
+from app.projects.repository_standards.models.team_graph import TeamGraph
 from app.projects.repository_standards.models.repository_info import (
+    RepositoryAccess,
     RepositoryInfo,
     RepositoryInfoFactory,
 )
+from app.shared.config.app_config import app_config
+from app.shared.services.github_app_auth_service import get_installation_token_broker
+from app.shared.services.http_transport import RetryPolicy
 
 logger = logging.getLogger(__name__)
 
+INGESTION_MODES = ["rest", "graphql", "async"]
+
+RULESET_RULE_TYPES = ["pull_request", "required_signatures"]
+
+TEAMS_TO_IGNORE = [
+    "organisation-security-auditor",
+    "organisation-security-auditor-external",
+    "organisation-security-auditor-architects",
+]
+
 
 class GithubService:
     def __init__(
@@ -23,133 +73,785 @@ class GithubService:
         app_client_id: str,
         app_private_key: str,
         app_installation_id: int,
+        ingestion_mode: str = "rest",
+        crawl_workers: int = 1,
+        response_cache: GitHubResponseCache | None = None,
+        base_url: str = "https://api.github.com",
+        api_metrics: GitHubApiMetrics | None = None,
     ) -> None:
+        if ingestion_mode not in INGESTION_MODES:
+            raise ValueError(
+                f"Unknown ingestion mode [ {ingestion_mode} ], expected one of {INGESTION_MODES}"
+            )
         self.organisation_name: str = "ministryofjustice"
-        app_auth = Auth.AppAuth(app_client_id, app_private_key)
-        app_installation_auth = app_auth.get_installation_auth(app_installation_id)
-        self.github_client_core_api: Github = Github(auth=app_installation_auth)
+        self.ingestion_mode = ingestion_mode
+        self.crawl_workers = max(1, crawl_workers)
+        self.api_metrics = api_metrics or get_github_api_metrics()
+        # Both clients authenticate as the same installation so share its rate limit
+        self.rate_limit_governor = RateLimitGovernor()
+        # ...and retry budget and circuit, as an outage affects both alike
+        self.retry_policy = RetryPolicy("github")
+        # Every client uses the same installation token rather than minting its own
+        self.token_broker = get_installation_token_broker(
+            app_client_id, app_private_key, app_installation_id, base_url
+        )
         self.github_client = GitHubClient(
             app_client_id=app_client_id,
             app_private_key=app_private_key,
             app_installation_id=app_installation_id,
             org=self.organisation_name,
+            base_url=base_url,
+            rate_limit_governor=self.rate_limit_governor,
+            pool_size=self.crawl_workers,
+            response_cache=response_cache,
+            token_broker=self.token_broker,
+            api_metrics=self.api_metrics,
+            retry_policy=self.retry_policy,
+        )
+        self.async_github_client = AsyncGitHubClient(
+            app_client_id=app_client_id,
+            app_private_key=app_private_key,
+            app_installation_id=app_installation_id,
+            org=self.organisation_name,
+            base_url=base_url,
+            max_connections=self.crawl_workers,
+            rate_limit_governor=self.rate_limit_governor,
+            token_broker=self.token_broker,
+            api_metrics=self.api_metrics,
+            retry_policy=self.retry_policy,
         )
+        self.response_cache = response_cache
 
-    @retries_github_rate_limit_exception_at_next_reset_once
-    def __get_all_parents_team_names_of_team(
-        self, team: Team, team_parent_cache: dict[str, List[str]]
-    ) -> list[str]:
-        if team.slug in team_parent_cache:
-            logging.debug("Teams parents cache hit!")
-            return team_parent_cache[team.slug]
+    def get_team_graph(self) -> TeamGraph:
+        team_graph = TeamGraph.from_github_teams(
+            self.github_client.get_organisation_teams()
+        )
+        logger.info(f"Loaded Team Hierarchy: [ {len(team_graph)} ] teams")
+        return team_graph
 
-        parents = []
-        team_to_check = team
+    def get_access_matrix(
+        self, repository_names: List[str], teams_to_ignore: List[str]
+    ) -> AccessMatrix:
+        """
+        Listing the teams of every repository costs at least one call per repository,
+        listing the repositories of every team at least one call per team, so the
+        matrix is built from whichever side is smaller.
+        """
+        team_graph = self.get_team_graph()
+        access_matrix = AccessMatrix(team_graph, teams_to_ignore)
+        team_slugs = [slug for slug in team_graph.parents if slug not in teams_to_ignore]
 
-        while team_to_check and team_to_check.parent:
-            parent_slug = team_to_check.parent.slug
-            parents.append(parent_slug)
-            team_to_check = team_to_check.parent
+        with ThreadPoolExecutor(
+            max_workers=self.crawl_workers, thread_name_prefix="github-crawl"
+        ) as executor:
+            if len(team_slugs) < len(repository_names):
+                logger.info(
+                    f"Building Access Matrix From [ {len(team_slugs)} ] Teams"
+                )
+                names = set(repository_names)
+                for team_slug, repositories in zip(
+                    team_slugs,
+                    executor.map(self.github_client.get_team_repositories, team_slugs),
+                ):
+                    for repository in repositories:
+                        if repository["name"] in names:
+                            access_matrix.add(
+                                repository["name"],
+                                team_slug,
+                                normalise_permission(
+                                    repository.get("role_name"),
+                                    repository.get("permissions"),
+                                ),
+                            )
+            else:
+                logger.info(
+                    f"Building Access Matrix From [ {len(repository_names)} ] Repositories"
+                )
+                for repository_name, teams in zip(
+                    repository_names,
+                    executor.map(
+                        self.github_client.get_repository_teams, repository_names
+                    ),
+                ):
+                    for team in teams:
+                        access_matrix.add(
+                            repository_name,
+                            team["slug"],
+                            normalise_permission(
+                                team.get("permission"), team.get("permissions")
+                            ),
+                        )
+        return access_matrix
 
-        team_parent_cache[team.slug] = parents
-        return parents
+    def get_repository(
+        self, repo_name: str, teams_to_ignore: List[str] = TEAMS_TO_IGNORE
+    ) -> RepositoryInfo | None:
+        """
+        Enriches one repository, for a webhook, with a handful of calls. The crawl's
+        organisation wide preloads, every team and every organisation ruleset, would
+        cost far more than the repository itself, so the access is built from the
+        repository's own teams and their ancestors, and only the rulesets its default
+        branch uses are fetched. Archived repositories and forks are not tracked, so
+        give `None`.
+        """
+        repo = self.github_client.get_repository(repo_name)
+        if repo["archived"] or repo["fork"]:
+            return None
 
-    @retries_github_rate_limit_exception_at_next_reset_once
-    def __get_teams_with_access(
-        self,
-        repository: Repository,
-        teams_to_ignore: List[str],
-        team_parent_cache: dict[str, List[str]],
-    ) -> tuple[list[str], list[str], list[str], list[str]]:
-        teams_with_admin_access = []
-        teams_with_admin_access_parents = []
-        teams_with_any_access = []
-        teams_with_any_access_parents = []
-
-        for team in list(repository.get_teams()):
-            logger.debug(f"Processing Team: [ {team.slug} ]")
-            if team.slug in teams_to_ignore:
-                logging.debug("Team specified to ignore, skipping...")
-                continue
-            permissions = team.permissions
-            team_parents = self.__get_all_parents_team_names_of_team(
-                team, team_parent_cache
-            )
-            if permissions and permissions.admin:
-                teams_with_admin_access.append(team.slug)
-                teams_with_admin_access_parents.extend(team_parents)
-            if permissions and (
-                permissions.admin
-                or permissions.maintain
-                or permissions.push
-                or permissions.pull
-                or permissions.triage
-            ):
-                teams_with_any_access.append(team.slug)
-                teams_with_any_access_parents.extend(team_parents)
-        return (
-            teams_with_admin_access,
-            teams_with_admin_access_parents,
-            teams_with_any_access,
-            teams_with_any_access_parents,
+        teams = self.github_client.get_repository_teams(repo_name)
+        access_matrix = AccessMatrix(self.__get_team_ancestry(teams), teams_to_ignore)
+        for team in teams:
+            access_matrix.add(
+                repo_name,
+                team["slug"],
+                normalise_permission(team.get("permission"), team.get("permissions")),
+            )
+
+        branch = repo["default_branch"]
+        branch_protection = None
+        try:
+            branch_protection = self.github_client.get_branch_protection(
+                repo_name, branch
+            )
+        except Exception as e:
+            logger.debug("Error getting default branch protection: %s", e)
+        branch_rules, rulesets = self.__get_branch_rules(
+            repo_name, branch, RulesetCache(self.github_client)
+        )
+
+        return _build_rest_repository(
+            repo,
+            branch_protection,
+            branch_rules,
+            rulesets,
+            access_matrix.get_repository_access(repo_name),
+            None,
+            FetchPlan(),
+            set(FETCH_GROUP_FIELDS),
+            datetime.now(timezone.utc),
+            None,
         )
 
-    @retries_github_rate_limit_exception_at_next_reset_once
-    def get_repositories(
+    def __get_team_ancestry(self, teams: List[dict]) -> TeamGraph:
+        """The hierarchy above `teams`, fetching only the ancestors not listed."""
+        parents = {
+            team["slug"]: (team.get("parent") or {}).get("slug") for team in teams
+        }
+        to_fetch = {parent for parent in parents.values() if parent} - parents.keys()
+        while to_fetch:
+            slug = to_fetch.pop()
+            parent = (self.github_client.get_team(slug).get("parent") or {}).get("slug")
+            parents[slug] = parent
+            if parent and parent not in parents:
+                to_fetch.add(parent)
+        return TeamGraph(parents)
+
+    def __get_branch_rules(
+        self, name: str, branch: str, ruleset_cache: RulesetCache
+    ) -> tuple[List[dict] | None, dict[int, dict]]:
+        rulesets = {}
+        try:
+            branch_rules = self.github_client.get_branch_rulesets(name, branch)
+            for rule in branch_rules:
+                if rule.get("type") in RULESET_RULE_TYPES and rule.get("ruleset_id"):
+                    rulesets[rule["ruleset_id"]] = ruleset_cache.get_ruleset(name, rule)
+        except Exception as e:
+            logger.debug("Error getting default branch rules: %s", e)
+            return None, {}
+        return branch_rules, rulesets
+
+    def get_repositories(self, *args, **kwargs) -> List[RepositoryInfo]:
+        return list(self.iter_repositories(*args, **kwargs))
+
+    def iter_repositories(
         self,
         repo_name: str | None = None,
         limit: int = 1500,
-        teams_to_ignore: List[str] = [
-            "organisation-security-auditor",
-            "organisation-security-auditor-external",
-            "organisation-security-auditor-architects",
-        ],
-    ) -> List[RepositoryInfo]:
-        response = []
-        team_parent_cache = {}
-        repositories: list
-        if not repo_name:
-            repositories = list(
-                self.github_client_core_api.get_organization(
-                    self.organisation_name
-                ).get_repos(type="public")
+        teams_to_ignore: List[str] = TEAMS_TO_IGNORE,
+        known_repositories: dict[str, RepositoryInfo] | None = None,
+        changed_since: datetime | None = None,
+        completed_repositories: dict[str, RepositoryInfo] | None = None,
+        shard: RepositoryShard = RepositoryShard(),
+        snapshot: GitHubSnapshotWriter | None = None,
+        fetch_plan: FetchPlan = FetchPlan(),
+    ) -> Iterator[RepositoryInfo]:
+        """
+        Yields repositories in listing order as soon as they are enriched, so the
+        caller can write them while the rest are still being fetched. At most two
+        repositories per worker are enriched ahead of the caller, which keeps memory
+        flat however large the organisation is.
+
+        When `changed_since` is given, repositories in `known_repositories` that have
+        not been pushed to or updated since then are carried forward instead of being
+        enriched again. Their team access is still taken from this run's access
+        matrix, as granting or revoking a team's access moves neither timestamp. The
+        GraphQL mode already fetches everything in bulk so always returns fresh data.
+
+        Repositories in `completed_repositories` were already enriched by an earlier
+        attempt at the same sync run and are carried forward too.
+
+        Only repositories in `shard` are yielded, so the crawl can be split across
+        several pods.
+
+        The payloads each repository was built from are added to `snapshot`, so the
+        run can be evaluated again later without crawling.
+
+        Only the API calls in `fetch_plan` are made for each repository; the fields
+        of a group it leaves out, or that is still fresh, are taken from
+        `known_repositories`. The GraphQL mode fetches every field in bulk anyway.
+        """
+        if self.ingestion_mode == "graphql":
+            yield from self.__iter_repositories_graphql(
+                repo_name, limit, teams_to_ignore, shard, snapshot
+            )
+            return
+        if self.ingestion_mode == "async":
+            yield from self.__iter_repositories_async(
+                repo_name,
+                limit,
+                teams_to_ignore,
+                known_repositories or {},
+                changed_since,
+                completed_repositories or {},
+                shard,
+                snapshot,
+                fetch_plan,
             )
+            return
+
+        if not repo_name:
+            repositories = self.github_client.get_organisation_repositories()
         else:
-            repositories = [
-                self.github_client_core_api.get_organization(
-                    self.organisation_name
-                ).get_repo(name=repo_name)
-            ]
+            repositories = [self.github_client.get_repository(repo_name)]
         repositories_to_check = [
             repository
             for repository in repositories
-            if not (repository.archived or repository.fork)
+            if not (repository["archived"] or repository["fork"])
+            and shard.contains(repository["name"])
         ]
-        logger.info(f"Total Repositories: [ {len(repositories_to_check)} ]")
-        counter = 1
-        for repo in repositories_to_check:
-            if counter > limit:
+        logger.info(
+            f"Total Repositories In Shard [ {shard} ]: [ {len(repositories_to_check)} ]"
+        )
+        if len(repositories_to_check) > limit:
+            logger.info("Limit Reached, exiting early")
+            repositories_to_check = repositories_to_check[:limit]
+
+        known_repositories = known_repositories or {}
+        completed_repositories = completed_repositories or {}
+        repositories_to_enrich = [
+            repo
+            for repo in repositories_to_check
+            if repo["name"] not in completed_repositories
+            and not self.__is_unchanged(
+                repo["name"],
+                _parse_timestamp(repo.get("pushed_at")),
+                _parse_timestamp(repo["updated_at"]),
+                known_repositories,
+                changed_since,
+            )
+        ]
+        logger.info(f"Repositories To Enrich: [ {len(repositories_to_enrich)} ]")
+        now = datetime.now(timezone.utc)
+        groups_to_fetch = self.__get_groups_to_fetch(
+            repositories_to_enrich, known_repositories, fetch_plan, now
+        )
+        access_matrix = self.get_access_matrix(
+            [repo["name"] for repo in repositories_to_check], teams_to_ignore
+        )
+        delete_branch_on_merge = self.get_delete_branch_on_merge(
+            [
+                repo
+                for repo in repositories_to_enrich
+                if "repository_settings" in groups_to_fetch[repo["name"]]
+            ]
+        )
+        ruleset_cache = RulesetCache(self.github_client)
+        if any("branch_rules" in groups for groups in groups_to_fetch.values()):
+            ruleset_cache.prefetch_organisation_rulesets()
+
+        def enrich(counter: int, repo: dict) -> RepositoryInfo:
+            name = repo["name"]
+            if name in completed_repositories:
+                logger.debug(f"Repository already enriched: [ {name} ]")
+                return _carry_forward(completed_repositories[name], snapshot)
+            if name not in groups_to_fetch:
+                logger.debug(f"Repository unchanged: [ {name} ]")
+                return _carry_forward(
+                    known_repositories[name],
+                    snapshot,
+                    access_matrix.get_repository_access(name),
+                )
+
+            logger.info(
+                f"Processing Repository: [ {name} ] {counter}/{len(repositories_to_check)}"
+            )
+            groups = groups_to_fetch[name]
+            branch = repo["default_branch"]
+            branch_protection = None
+            if "branch_protection" in groups:
+                try:
+                    branch_protection = self.github_client.get_branch_protection(
+                        name, branch
+                    )
+                except Exception as e:
+                    logger.debug("Error getting default branch protection: %s", e)
+
+            branch_rules = None
+            rulesets = {}
+            if "branch_rules" in groups:
+                branch_rules, rulesets = self.__get_branch_rules(
+                    name, branch, ruleset_cache
+                )
+
+            return _build_rest_repository(
+                _with_delete_branch_on_merge(repo, delete_branch_on_merge),
+                branch_protection,
+                branch_rules,
+                rulesets,
+                access_matrix.get_repository_access(name),
+                known_repositories.get(name),
+                fetch_plan,
+                groups,
+                now,
+                snapshot,
+            )
+
+        # Results are yielded in submission order, so the output order matches the
+        # listing regardless of which worker finishes first
+        with ThreadPoolExecutor(
+            max_workers=self.crawl_workers, thread_name_prefix="github-crawl"
+        ) as executor:
+            in_flight = deque()
+            for counter, repo in enumerate(repositories_to_check, start=1):
+                in_flight.append(executor.submit(enrich, counter, repo))
+                if len(in_flight) >= self.crawl_workers * 2:
+                    yield in_flight.popleft().result()
+            while in_flight:
+                yield in_flight.popleft().result()
+
+        self.__log_response_cache_stats()
+        ruleset_stats = ruleset_cache.stats()
+        logger.info(
+            f"Ruleset lookups: [ {ruleset_stats['lookups']} ], prefetched: [ {ruleset_stats['prefetches']} ], fetched: [ {ruleset_stats['fetches']} ], dedup ratio: [ {ruleset_stats['dedup_ratio']} ]"
+        )
+
+    def get_delete_branch_on_merge(self, repositories: List[dict]) -> dict[str, bool]:
+        """
+        The organisation listing leaves out `delete_branch_on_merge`, so it is
+        fetched for every repository at once rather than with a GET per repository,
+        unless the payloads already have it.
+        """
+        if all("delete_branch_on_merge" in repo for repo in repositories):
+            return {}
+        return self.github_client.get_delete_branch_on_merge_graphql()
+
+    def __get_groups_to_fetch(
+        self,
+        repositories: List[dict],
+        known_repositories: dict[str, RepositoryInfo],
+        fetch_plan: FetchPlan,
+        now: datetime,
+    ) -> dict[str, set[str]]:
+        """The groups of API calls to make for each repository to enrich, by name."""
+        groups_to_fetch = {
+            repo["name"]: fetch_plan.get_groups_to_fetch(
+                known_repositories.get(repo["name"]), now
+            )
+            for repo in repositories
+        }
+        for group in sorted(FETCH_GROUP_FIELDS):
+            if group not in fetch_plan.groups:
+                logger.info(f"No check reads [ {group} ], not fetching it")
+                continue
+            reused = [
+                groups for groups in groups_to_fetch.values() if group not in groups
+            ]
+            logger.info(f"Reusing fresh [ {group} ] for [ {len(reused)} ] repositories")
+        return groups_to_fetch
+
+    def __is_unchanged(
+        self,
+        name: str,
+        pushed_at: datetime | None,
+        updated_at: datetime,
+        known_repositories: dict[str, RepositoryInfo],
+        changed_since: datetime | None,
+    ) -> bool:
+        if not changed_since or name not in known_repositories:
+            return False
+        last_changed_at = max(pushed_at or updated_at, updated_at)
+        return last_changed_at < changed_since
+
+    def __log_response_cache_stats(self) -> None:
+        if not self.response_cache:
+            return
+        self.response_cache.evict()
+        stats = self.response_cache.stats()
+        logger.info(
+            f"GitHub response cache hits: [ {stats['hits']} ], misses: [ {stats['misses']} ], hit ratio: [ {stats['hit_ratio']} ], evictions: [ {stats['evictions']} ]"
+        )
+
+    def __iter_repositories_graphql(
+        self,
+        repo_name: str | None,
+        limit: int,
+        teams_to_ignore: List[str],
+        shard: RepositoryShard,
+        snapshot: GitHubSnapshotWriter | None,
+    ) -> Iterator[RepositoryInfo]:
+        if not repo_name:
+            repositories = self.github_client.get_repositories_graphql()
+            security_and_analysis_by_repository = {
+                repository["name"]: repository.get("security_and_analysis")
+                for repository in self.github_client.get_organisation_repositories()
+            }
+            access_matrix = self.__get_access_matrix_graphql(teams_to_ignore)
+        else:
+            # Paging the whole estate for one repository would cost a full crawl
+            repositories = [self.github_client.get_repository_graphql(repo_name)]
+            repository = self.github_client.get_repository(repo_name)
+            security_and_analysis_by_repository = {
+                repository["name"]: repository.get("security_and_analysis")
+            }
+            access_matrix = self.get_access_matrix(
+                [repository["name"]], teams_to_ignore
+            )
+
+        count = 0
+        for repo in repositories:
+            if (
+                repo["isArchived"]
+                or repo["isFork"]
+                or not shard.contains(repo["name"])
+            ):
+                continue
+            if count >= limit:
                 logger.info("Limit Reached, exiting early")
                 break
+            count += 1
+            logger.info(f"Processing Repository: [ {repo['name']} ] {count}")
+
+            access = access_matrix.get_repository_access(repo["name"])
+            security_and_analysis = security_and_analysis_by_repository.get(
+                repo["name"]
+            )
+            if snapshot:
+                snapshot.add(
+                    graphql_snapshot_record(repo, security_and_analysis, access)
+                )
+
+            yield RepositoryInfoFactory.from_graphql_repo(
+                repo,
+                security_and_analysis,
+                access.teams_with_admin,
+                access.teams_with_admin_parents,
+                access.teams,
+                access.teams_parents,
+            )
+        logger.info(f"Total Repositories In Shard [ {shard} ]: [ {count} ]")
+        self.__log_response_cache_stats()
+
+    def __get_access_matrix_graphql(self, teams_to_ignore: List[str]) -> AccessMatrix:
+        teams = self.github_client.get_team_repository_permissions_graphql()
+        access_matrix = AccessMatrix(
+            TeamGraph({team["slug"]: team["parent"] for team in teams}),
+            teams_to_ignore,
+        )
+        for team in teams:
+            for repository_name, permission in team["repositories"]:
+                access_matrix.add(
+                    repository_name, team["slug"], normalise_permission(permission)
+                )
+        return access_matrix
+
+    def __iter_repositories_async(
+        self,
+        repo_name: str | None,
+        limit: int,
+        teams_to_ignore: List[str],
+        known_repositories: dict[str, RepositoryInfo],
+        changed_since: datetime | None,
+        completed_repositories: dict[str, RepositoryInfo],
+        shard: RepositoryShard,
+        snapshot: GitHubSnapshotWriter | None,
+        fetch_plan: FetchPlan,
+    ) -> Iterator[RepositoryInfo]:
+        """
+        Runs the crawl on an event loop in a background thread and hands repositories
+        over through a bounded queue, so the caller keeps writing while the loop keeps
+        requests in flight.
+        """
+        results = queue.Queue(maxsize=self.crawl_workers * 2)
+        finished = object()
+        stopped = threading.Event()
+
+        async def emit(item) -> None:
+            while not stopped.is_set():
+                try:
+                    results.put_nowait(item)
+                    return
+                except queue.Full:
+                    await asyncio.sleep(0.05)
+            raise asyncio.CancelledError()
+
+        def hand_over(item) -> None:
+            while not stopped.is_set():
+                try:
+                    results.put(item, timeout=0.05)
+                    return
+                except queue.Full:
+                    pass
+
+        def crawl() -> None:
+            try:
+                asyncio.run(
+                    self.__crawl_async(
+                        emit,
+                        repo_name,
+                        limit,
+                        teams_to_ignore,
+                        known_repositories,
+                        changed_since,
+                        completed_repositories,
+                        shard,
+                        snapshot,
+                        fetch_plan,
+                    )
+                )
+                hand_over(finished)
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                hand_over(e)
+
+        thread = threading.Thread(target=crawl, name="github-crawl-async", daemon=True)
+        thread.start()
+        try:
+            while (item := results.get()) is not finished:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stopped.set()
+            thread.join()
+
+    async def __crawl_async(
+        self,
+        emit: Callable[[RepositoryInfo], Awaitable[None]],
+        repo_name: str | None,
+        limit: int,
+        teams_to_ignore: List[str],
+        known_repositories: dict[str, RepositoryInfo],
+        changed_since: datetime | None,
+        completed_repositories: dict[str, RepositoryInfo],
+        shard: RepositoryShard,
+        snapshot: GitHubSnapshotWriter | None,
+        fetch_plan: FetchPlan,
+    ) -> None:
+        async with self.async_github_client as github_client:
+            if not repo_name:
+                repositories = await github_client.get_organisation_repositories()
+            else:
+                repositories = [await github_client.get_repository(repo_name)]
+            repositories_to_check = [
+                repository
+                for repository in repositories
+                if not (repository["archived"] or repository["fork"])
+                and shard.contains(repository["name"])
+            ]
             logger.info(
-                f"Processing Repository: [ {repo.name} ] {counter}/{len(repositories_to_check)}"
-            )
-            (
-                teams_with_admin_access,
-                teams_with_admin_access_parents,
-                teams_with_any_access,
-                teams_with_any_access_parents,
-            ) = self.__get_teams_with_access(repo, teams_to_ignore, team_parent_cache)
-
-            response.append(
-                RepositoryInfoFactory.from_github_repo(
-                    repo,
-                    teams_with_admin_access,
-                    teams_with_admin_access_parents,
-                    teams_with_any_access,
-                    teams_with_any_access_parents,
-                    self.github_client,
+                f"Total Repositories In Shard [ {shard} ]: [ {len(repositories_to_check)} ]"
+            )
+            if len(repositories_to_check) > limit:
+                logger.info("Limit Reached, exiting early")
+                repositories_to_check = repositories_to_check[:limit]
+
+            repositories_to_enrich = [
+                repo
+                for repo in repositories_to_check
+                if repo["name"] not in completed_repositories
+                and not self.__is_unchanged(
+                    repo["name"],
+                    _parse_timestamp(repo.get("pushed_at")),
+                    _parse_timestamp(repo["updated_at"]),
+                    known_repositories,
+                    changed_since,
                 )
+            ]
+            logger.info(f"Repositories To Enrich: [ {len(repositories_to_enrich)} ]")
+            now = datetime.now(timezone.utc)
+            groups_to_fetch = self.__get_groups_to_fetch(
+                repositories_to_enrich, known_repositories, fetch_plan, now
             )
-            counter += 1
-        return response
+            access_matrix = await asyncio.to_thread(
+                self.get_access_matrix,
+                [repo["name"] for repo in repositories_to_check],
+                teams_to_ignore,
+            )
+            delete_branch_on_merge = await asyncio.to_thread(
+                self.get_delete_branch_on_merge,
+                [
+                    repo
+                    for repo in repositories_to_enrich
+                    if "repository_settings" in groups_to_fetch[repo["name"]]
+                ],
+            )
+            ruleset_cache = AsyncRulesetCache(github_client)
+            if any("branch_rules" in groups for groups in groups_to_fetch.values()):
+                await ruleset_cache.prefetch_organisation_rulesets()
+
+            async def enrich(counter: int, repo: dict) -> RepositoryInfo:
+                name = repo["name"]
+                if name in completed_repositories:
+                    return _carry_forward(completed_repositories[name], snapshot)
+                if name not in groups_to_fetch:
+                    return _carry_forward(
+                        known_repositories[name],
+                        snapshot,
+                        access_matrix.get_repository_access(name),
+                    )
+
+                logger.info(
+                    f"Processing Repository: [ {name} ] {counter}/{len(repositories_to_check)}"
+                )
+                groups = groups_to_fetch[name]
+                branch = repo["default_branch"]
+                branch_protection, branch_rules = await asyncio.gather(
+                    github_client.get_branch_protection(name, branch)
+                    if "branch_protection" in groups
+                    else _nothing(),
+                    github_client.get_branch_rulesets(name, branch)
+                    if "branch_rules" in groups
+                    else _nothing(),
+                    return_exceptions=True,
+                )
+                if isinstance(branch_protection, Exception):
+                    logger.debug(
+                        "Error getting default branch protection: %s", branch_protection
+                    )
+                    branch_protection = None
+
+                rulesets = {}
+                try:
+                    if isinstance(branch_rules, Exception):
+                        raise branch_rules
+                    for rule in branch_rules or []:
+                        if rule.get("type") in RULESET_RULE_TYPES and rule.get(
+                            "ruleset_id"
+                        ):
+                            rulesets[rule["ruleset_id"]] = (
+                                await ruleset_cache.get_ruleset(name, rule)
+                            )
+                except Exception as e:
+                    logger.debug("Error getting default branch rules: %s", e)
+                    branch_rules = None
+
+                return _build_rest_repository(
+                    _with_delete_branch_on_merge(repo, delete_branch_on_merge),
+                    branch_protection,
+                    branch_rules,
+                    rulesets,
+                    access_matrix.get_repository_access(name),
+                    known_repositories.get(name),
+                    fetch_plan,
+                    groups,
+                    now,
+                    snapshot,
+                )
+
+            # Many repositories are in flight at once as they wait on the pool, not on
+            # a thread each; results are still emitted in listing order
+            in_flight = deque()
+            for counter, repo in enumerate(repositories_to_check, start=1):
+                in_flight.append(asyncio.ensure_future(enrich(counter, repo)))
+                if len(in_flight) >= self.crawl_workers * 4:
+                    await emit(await in_flight.popleft())
+            while in_flight:
+                await emit(await in_flight.popleft())
+
+            ruleset_stats = ruleset_cache.stats()
+            logger.info(
+                f"Ruleset lookups: [ {ruleset_stats['lookups']} ], prefetched: [ {ruleset_stats['prefetches']} ], fetched: [ {ruleset_stats['fetches']} ], dedup ratio: [ {ruleset_stats['dedup_ratio']} ]"
+            )
+
+
+def _parse_timestamp(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _with_delete_branch_on_merge(repo: dict, delete_branch_on_merge: dict) -> dict:
+    if "delete_branch_on_merge" in repo or repo["name"] not in delete_branch_on_merge:
+        return repo
+    return {**repo, "delete_branch_on_merge": delete_branch_on_merge[repo["name"]]}
+
+
+async def _nothing() -> None:
+    return None
+
+
+def _build_rest_repository(
+    repo: dict,
+    branch_protection: dict | None,
+    branch_rules: List[dict] | None,
+    rulesets: dict[int, dict],
+    access: RepositoryAccess,
+    known: RepositoryInfo | None,
+    fetch_plan: FetchPlan,
+    fetched_groups: set[str],
+    now: datetime,
+    snapshot: GitHubSnapshotWriter | None,
+) -> RepositoryInfo:
+    repository, reused = fetch_plan.apply(
+        RepositoryInfoFactory.from_rest_payloads(
+            repo,
+            branch_protection,
+            branch_rules,
+            rulesets,
+            access.teams_with_admin,
+            access.teams_with_admin_parents,
+            access.teams,
+            access.teams_parents,
+        ),
+        known,
+        fetched_groups,
+        now,
+    )
+    if snapshot:
+        snapshot.add(
+            rest_snapshot_record(
+                repo,
+                branch_protection,
+                branch_rules,
+                rulesets,
+                access,
+                reused,
+                repository.fetched_at,
+            )
+        )
+    return repository
+
+
+def _carry_forward(
+    repository: RepositoryInfo,
+    snapshot: GitHubSnapshotWriter | None,
+    access: RepositoryAccess | None = None,
+) -> RepositoryInfo:
+    if access is not None and access != repository.access:
+        repository = replace_fields(repository, {"access": asdict(access)})
+        # The earlier run's record has the old access, so is not reused
+        if snapshot:
+            snapshot.add(repository_info_snapshot_record(repository))
+        return repository
+    if snapshot:
+        snapshot.carry_forward(repository)
+    return repository
+
+
+def get_github_service() -> GithubService:
+    if "github_service" not in g:
+        g.github_service = GithubService(
+            app_config.github.app.client_id,
+            app_config.github.app.private_key,
+            app_config.github.app.installation_id,
+        )
+    return g.github_service
@@ -3,6 +3,11 @@ from typing import List
 
 from flask import g
 
+from app.projects.repository_standards.db_models import Asset
+from app.projects.repository_standards.models.repository_info import (
+    RepositoryAccess,
+    RepositoryInfo,
+)
 from app.projects.repository_standards.repositories.owner_repository import OwnerView
 from app.projects.repository_standards.services.asset_service import (
     AssetService,
@@ -27,46 +32,72 @@ class RelationshipsService:
         return False
 
     def update_relationship_for_owner(self, owner: OwnerView) -> None:
+        """
+        Bring the relationships of one owner up to date with every repository,
+        removing those it no longer qualifies for.
+        """
         logger.info(f"Mapping Repositories for Owner [ {owner.name} ]")
 
-        repositories = self.__asset_service.get_all_repositories()
-        for repository in repositories:
-            logger.debug(f"Mapping Repository [ {repository.name} ]")
+        # Matched in SQL, as `get_relationship_type` would match them
+        desired = {
+            (repository.id, owner.id): "OTHER"
+            for repository in self.__asset_service.get_repositories_by_teams(
+                owner.config.teams, owner.config.prefix
+            )
+        }
+        desired.update(
+            ((repository.id, owner.id), "ADMIN_ACCESS")
+            for repository in self.__asset_service.get_repositories_by_admin_teams(
+                owner.config.teams
+            )
+        )
 
-            asset = self.__asset_service.find_asset_by_id(repository.id)
-            if asset is None:
-                logger.error(f"Missing Asset ID [ {repository.id} ]")
-                continue
+        changes = self.__asset_service.reconcile_relationships(
+            desired, owner_ids=[owner.id]
+        )
+        logger.info(
+            f"Owner [ {owner.name} ] relationships inserted: [ {changes.inserted} ], updated: [ {changes.updated} ], deleted: [ {changes.deleted} ]"
+        )
 
-            repository_name_starts_with_prefix = (
-                repository.name.startswith(owner.config.prefix)
-                if owner.config.prefix
-                else False
+    def update_relationships_for_repository(
+        self, asset: Asset, repository: RepositoryInfo, owners: List[OwnerView]
+    ) -> None:
+        """
+        Bring the relationships of one repository up to date with every owner,
+        removing those the repository no longer qualifies for.
+        """
+        desired = {}
+        for owner in owners:
+            relationship_type = self.get_relationship_type(
+                owner, repository.basic.name, repository.access
             )
+            if relationship_type:
+                desired[(asset.id, owner.id)] = relationship_type
 
-            if self.__contains_one_or_more(
-                owner.config.teams,
-                [
-                    repository.data.access.teams_with_admin,
-                    repository.data.access.teams_with_admin_parents,
-                ],
-            ):
-                self.__asset_service.update_relationships_with_owner(
-                    asset, owner, "ADMIN_ACCESS"
-                )
-            elif (
-                self.__contains_one_or_more(
-                    owner.config.teams,
-                    [
-                        repository.data.access.teams,
-                        repository.data.access.teams_parents,
-                    ],
-                )
-                or repository_name_starts_with_prefix
-            ):
-                self.__asset_service.update_relationships_with_owner(
-                    asset, owner, "OTHER"
-                )
+        self.__asset_service.reconcile_relationships(desired, asset_ids=[asset.id])
+
+    def get_relationship_type(
+        self, owner: OwnerView, repository_name: str, access: RepositoryAccess
+    ) -> str | None:
+        repository_name_starts_with_prefix = (
+            repository_name.startswith(owner.config.prefix)
+            if owner.config.prefix
+            else False
+        )
+
+        if self.__contains_one_or_more(
+            owner.config.teams,
+            [access.teams_with_admin, access.teams_with_admin_parents],
+        ):
+            return "ADMIN_ACCESS"
+        if (
+            self.__contains_one_or_more(
+                owner.config.teams, [access.teams, access.teams_parents]
+            )
+            or repository_name_starts_with_prefix
+        ):
+            return "OTHER"
+        return None
 
 
 def get_relationships_service() -> RelationshipsService:
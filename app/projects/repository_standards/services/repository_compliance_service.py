@@ -43,7 +43,7 @@ class RepositoryComplianceService:
 
         return authoritative_owners
 
-    def __get_repository_compliance_report(
+    def get_repository_compliance_report(
         self,
         repository: RepositoryView,
     ) -> RepositoryComplianceReportView:
@@ -137,7 +137,7 @@ class RepositoryComplianceService:
         repositories_compliance_reports = []
         repositories = self.__asset_service.get_all_repositories()
         for repository in repositories:
-            repository_compliance_report = self.__get_repository_compliance_report(
+            repository_compliance_report = self.get_repository_compliance_report(
                 repository
             )
             repositories_compliance_reports.append(repository_compliance_report)
@@ -150,7 +150,7 @@ class RepositoryComplianceService:
         if not repository:
             return None
 
-        repository_compliance_report = self.__get_repository_compliance_report(
+        repository_compliance_report = self.get_repository_compliance_report(
             repository
         )
 
@@ -0,0 +1,130 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from app.projects.repository_standards.db_models import SyncRun
+from app.projects.repository_standards.models.repository_info import RepositoryInfo
+from app.projects.repository_standards.repositories.sync_run_repository import (
+    SyncRunRepository,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class SyncRunService:
+    def __init__(self, sync_run_repository: SyncRunRepository):
+        self.__sync_run_repository = sync_run_repository
+
+    def is_full_sync_due(self, full_sync_interval_hours: int) -> bool:
+        last_full_sync = self.__sync_run_repository.find_last_completed(
+            is_full_sync=True
+        )
+        if last_full_sync is None:
+            return True
+        return as_utc(last_full_sync.started_at) <= datetime.now(
+            timezone.utc
+        ) - timedelta(hours=full_sync_interval_hours)
+
+    def get_watermark(self) -> datetime | None:
+        """
+        The start time of the last completed run. Anything changed after it may not
+        have been seen, so it is the point from which the next run must re-enrich.
+        """
+        last_sync_run = self.__sync_run_repository.find_last_completed()
+        return as_utc(last_sync_run.started_at) if last_sync_run else None
+
+    def start_sync_run(self, is_full_sync: bool) -> SyncRun:
+        sync_run = self.__sync_run_repository.add_sync_run(is_full_sync)
+        logger.info(
+            f"Started {'full' if is_full_sync else 'incremental'} sync run [ {sync_run.id} ]"
+        )
+        return sync_run
+
+    def resume_or_start_sync_run(
+        self, is_full_sync: bool, resume_window_hours: int
+    ) -> SyncRun:
+        """
+        Carries on with the last run that did not complete, such as one killed at
+        its deadline, as long as it started within the resume window. Older runs are
+        abandoned as their checkpoints are too stale to trust.
+        """
+        sync_run = self.__sync_run_repository.find_last_incomplete(
+            started_after=datetime.now(timezone.utc)
+            - timedelta(hours=resume_window_hours)
+        )
+        if sync_run is None:
+            return self.start_sync_run(is_full_sync)
+        logger.info(
+            f"Resuming {'full' if sync_run.is_full_sync else 'incremental'} sync run [ {sync_run.id} ]"
+        )
+        return sync_run
+
+    def join_or_start_sync_run(
+        self, key: str, is_full_sync: bool, shard_count: int
+    ) -> SyncRun:
+        """
+        Every shard of a sharded crawl shares the run with the same key, whichever
+        of them starts it. Shards that join take the full or incremental decision of
+        the one that started it, so they all crawl against the same watermark.
+        """
+        sync_run = self.__sync_run_repository.find_by_key(
+            key
+        ) or self.__sync_run_repository.add_sync_run(is_full_sync, key, shard_count)
+        if sync_run is None:
+            # Another shard added the run between looking it up and adding it
+            sync_run = self.__sync_run_repository.find_by_key(key)
+        logger.info(
+            f"Joined {'full' if sync_run.is_full_sync else 'incremental'} sync run [ {sync_run.id} ] with key [ {key} ]"
+        )
+        return sync_run
+
+    def complete_shard(self, sync_run: SyncRun, shard_index: int) -> bool:
+        """
+        Records the shard as complete, returning whether every shard of the run now
+        is, in which case the caller should finish the run.
+        """
+        completed_shards = self.__sync_run_repository.complete_shard(
+            sync_run, shard_index
+        )
+        logger.info(
+            f"Sync run [ {sync_run.id} ] has [ {completed_shards} ] of [ {sync_run.shard_count} ] shards complete"
+        )
+        return completed_shards >= sync_run.shard_count
+
+    def get_checkpointed_repositories(
+        self, sync_run: SyncRun
+    ) -> dict[str, RepositoryInfo]:
+        checkpointed_repositories = {
+            name: RepositoryInfo.from_dict(data)
+            for name, data in self.__sync_run_repository.find_checkpoints(
+                sync_run
+            ).items()
+        }
+        if checkpointed_repositories:
+            logger.info(
+                f"Sync run [ {sync_run.id} ] already enriched [ {len(checkpointed_repositories)} ] repositories"
+            )
+        return checkpointed_repositories
+
+    def checkpoint(
+        self, sync_run: SyncRun, repositories: List[RepositoryInfo]
+    ) -> None:
+        if not repositories:
+            return
+        self.__sync_run_repository.add_checkpoints(
+            sync_run,
+            {repository.basic.name: repository.to_dict() for repository in repositories},
+        )
+        logger.debug(
+            f"Checkpointed [ {len(repositories)} ] repositories for sync run [ {sync_run.id} ]"
+        )
+
+    def complete_sync_run(self, sync_run: SyncRun) -> None:
+        self.__sync_run_repository.complete(sync_run)
+        self.__sync_run_repository.delete_checkpoints(sync_run)
+        logger.info(f"Completed sync run [ {sync_run.id} ]")
+
+
+def as_utc(value: datetime) -> datetime:
+    # SQLite drops the timezone of stored datetimes
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
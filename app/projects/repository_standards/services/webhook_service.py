@@ -0,0 +1,184 @@
+import hashlib
+import hmac
+import logging
+from typing import List
+
+from flask import g
+
+from app.projects.repository_standards.clients.github_client import GitHubApiError
+from app.projects.repository_standards.repositories.owner_repository import OwnerView
+from app.projects.repository_standards.repositories.webhook_delivery_repository import (
+    WebhookDeliveryRepository,
+    get_webhook_delivery_repository,
+)
+from app.projects.repository_standards.services.asset_service import (
+    AssetService,
+    get_asset_service,
+)
+from app.projects.repository_standards.services.github_service import (
+    GithubService,
+    get_github_service,
+)
+from app.projects.repository_standards.services.owner_service import (
+    OwnerService,
+    get_owner_service,
+)
+from app.projects.repository_standards.services.relationships_service import (
+    RelationshipsService,
+    get_relationships_service,
+)
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_EVENTS = [
+    "repository",
+    "team",
+    "team_add",
+    "member",
+    "branch_protection_rule",
+    "repository_ruleset",
+]
+
+REMOVED_REPOSITORY_ACTIONS = ["deleted", "archived", "transferred", "privatized"]
+
+
+def is_valid_signature(secret: str | None, body: bytes, signature: str | None) -> bool:
+    """Checks the `X-Hub-Signature-256` header GitHub signs each delivery with."""
+    if not secret or not signature:
+        return False
+    expected = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+class WebhookService:
+    """
+    Refreshes only the repositories a webhook delivery affects, so changes show up
+    without waiting for the next scheduled sync. The scheduled sync still runs and
+    catches anything a missed delivery left behind.
+
+    GitHub gives up on a delivery after 10 seconds, and a team event can affect
+    hundreds of repositories, so `handle` only queues them. They are refreshed by
+    `refresh_pending_repositories`, from the `refresh_webhook_repositories` job.
+    """
+
+    def __init__(
+        self,
+        webhook_delivery_repository: WebhookDeliveryRepository,
+        asset_service: AssetService,
+        owner_service: OwnerService,
+        relationships_service: RelationshipsService,
+        github_service: GithubService,
+    ):
+        self.__webhook_delivery_repository = webhook_delivery_repository
+        self.__asset_service = asset_service
+        self.__owner_service = owner_service
+        self.__relationships_service = relationships_service
+        self.__github_service = github_service
+
+    def handle(self, delivery_id: str, event: str, payload: dict) -> str:
+        if event not in WEBHOOK_EVENTS:
+            logger.debug(f"Ignoring Webhook Event [ {event} ]")
+            return "ignored"
+
+        # GitHub redelivers on timeouts, so each delivery is only processed once
+        if not self.__webhook_delivery_repository.add_delivery(delivery_id, event):
+            logger.info(f"Skipping Duplicate Webhook Delivery [ {delivery_id} ]")
+            return "duplicate"
+
+        try:
+            action = payload.get("action")
+            if event == "repository" and action == "renamed":
+                old_name = payload["changes"]["repository"]["name"]["from"]
+                self.__asset_service.remove_asset_by_name(old_name)
+            if event == "repository" and action in REMOVED_REPOSITORY_ACTIONS:
+                self.__asset_service.remove_asset_by_name(payload["repository"]["name"])
+                return "processed"
+
+            repository_names = self.get_affected_repository_names(event, payload)
+            logger.info(
+                f"Webhook [ {event}.{action} ] Affects [ {len(repository_names)} ] Repositories"
+            )
+            self.__webhook_delivery_repository.add_pending_repositories(
+                repository_names
+            )
+        except Exception:
+            # Forget the delivery so GitHub's redelivery is processed again
+            self.__webhook_delivery_repository.delete_delivery(delivery_id)
+            raise
+
+        return "queued" if repository_names else "processed"
+
+    def get_affected_repository_names(self, event: str, payload: dict) -> List[str]:
+        if "repository" in payload:
+            return [payload["repository"]["name"]]
+
+        if event == "team":
+            # Adding a team to a repository is sent with the repository, so any other
+            # change only affects those the team, or a team below it, has access to
+            return sorted(
+                repository.name
+                for repository in self.__asset_service.get_repositories_by_teams(
+                    [payload["team"]["slug"]]
+                )
+            )
+
+        # Organisation rulesets can target any repository, leave them to the scheduled sync
+        logger.info(f"Leaving Organisation Level [ {event} ] To The Scheduled Sync")
+        return []
+
+    def refresh_pending_repositories(self, limit: int = 100) -> int:
+        """
+        Refreshes up to `limit` queued repositories, longest queued first, and
+        returns how many were refreshed. One that fails is left queued for the next
+        run.
+        """
+        pending = self.__webhook_delivery_repository.find_pending_repositories(limit)
+        owners = self.__owner_service.find_all()
+        refreshed = 0
+        for repository_name, requested_at in pending:
+            try:
+                self.refresh_repository(repository_name, owners)
+            except Exception as e:
+                logger.warning(f"Unable to refresh [ {repository_name} ]: {e}")
+                continue
+            self.__webhook_delivery_repository.remove_pending_repository(
+                repository_name, requested_at
+            )
+            refreshed += 1
+        return refreshed
+
+    def refresh_repository(
+        self, repository_name: str, owners: List[OwnerView] | None = None
+    ) -> None:
+        try:
+            repository = self.__github_service.get_repository(repository_name)
+        except GitHubApiError as e:
+            if e.status_code != 404:
+                raise
+            repository = None
+
+        if not repository:
+            logger.info(f"Repository [ {repository_name} ] No Longer Tracked")
+            self.__asset_service.remove_asset_by_name(repository_name)
+            return
+
+        asset = self.__asset_service.update_asset_by_name(
+            repository.basic.name, repository.to_dict()
+        )
+        self.__relationships_service.update_relationships_for_repository(
+            asset,
+            repository,
+            owners if owners is not None else self.__owner_service.find_all(),
+        )
+
+
+def get_webhook_service() -> WebhookService:
+    if "webhook_service" not in g:
+        g.webhook_service = WebhookService(
+            get_webhook_delivery_repository(),
+            get_asset_service(),
+            get_owner_service(),
+            get_relationships_service(),
+            get_github_service(),
+        )
+    return g.webhook_service
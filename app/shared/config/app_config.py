@@ -61,7 +61,49 @@ app_config = SimpleNamespace(
             installation_id=int(__get_env_var("GITHUB_APP_INSTALLATION_ID") or 0),
             private_key=__get_env_var("GITHUB_APP_PRIVATE_KEY"),
         ),
+        ingestion_mode=__get_env_var("GITHUB_INGESTION_MODE") or "rest",
+        crawl_workers=int(__get_env_var("GITHUB_CRAWL_WORKERS") or 8),
+        response_cache=SimpleNamespace(
+            enabled=__get_env_var_as_boolean(
+                "GITHUB_RESPONSE_CACHE_ENABLED", default=True
+            ),
+            database_url=__get_env_var("GITHUB_RESPONSE_CACHE_DATABASE_URL"),
+            max_entries=int(
+                __get_env_var("GITHUB_RESPONSE_CACHE_MAX_ENTRIES") or 50000
+            ),
+        ),
         token=__get_env_var("ADMIN_GITHUB_TOKEN"),
+        webhook_secret=__get_env_var("GITHUB_WEBHOOK_SECRET"),
+        api_metrics=SimpleNamespace(
+            textfile_path=__get_env_var("GITHUB_API_METRICS_TEXTFILE_PATH"),
+            pushgateway_url=__get_env_var("GITHUB_API_METRICS_PUSHGATEWAY_URL"),
+        ),
+    ),
+    sync=SimpleNamespace(
+        full_sync_interval_hours=int(
+            __get_env_var("SYNC_FULL_INTERVAL_HOURS") or 24
+        ),
+        resume_window_hours=int(__get_env_var("SYNC_RESUME_WINDOW_HOURS") or 12),
+        write_batch_size=int(__get_env_var("SYNC_WRITE_BATCH_SIZE") or 50),
+        run_key=__get_env_var("SYNC_RUN_KEY"),
+        shard_count=int(__get_env_var("SYNC_SHARD_COUNT") or 1),
+        # Set by Kubernetes for each pod of an indexed job
+        shard_index=int(
+            __get_env_var("SYNC_SHARD_INDEX") or __get_env_var("JOB_COMPLETION_INDEX") or 0
+        ),
+        # Where the raw payloads of each run are archived, not archived when unset
+        snapshot_path=__get_env_var("SYNC_SNAPSHOT_PATH"),
+        # How long each group of per-repository API calls is reused before it is
+        # fetched again, so 0 fetches it on every run
+        fetch_ttl_hours=SimpleNamespace(
+            repository_settings=int(
+                __get_env_var("SYNC_REPOSITORY_SETTINGS_TTL_HOURS") or 168
+            ),
+            branch_protection=int(
+                __get_env_var("SYNC_BRANCH_PROTECTION_TTL_HOURS") or 0
+            ),
+            branch_rules=int(__get_env_var("SYNC_BRANCH_RULES_TTL_HOURS") or 0),
+        ),
     ),
     sentry=SimpleNamespace(
         dsn_key=__get_env_var("SENTRY_DSN_KEY"), environment=__get_env_var("SENTRY_ENV")
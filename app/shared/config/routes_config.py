@@ -5,6 +5,9 @@ from app.projects.repository_standards.routes.deprecated import (
     repository_standards_deprecated,
 )
 from app.projects.repository_standards.routes.main import repository_standards_main
+from app.projects.repository_standards.routes.webhooks import (
+    repository_standards_webhooks,
+)
 from app.projects.acronyms.routes.main import acronyms_main
 from app.shared.routes.auth import auth_route
 from app.shared.routes.main import main
@@ -22,6 +25,9 @@ def configure_routes(app: Flask) -> None:
     app.register_blueprint(
         repository_standards_api, url_prefix="/repository-standards/api"
     )
+    app.register_blueprint(
+        repository_standards_webhooks, url_prefix="/repository-standards/webhooks"
+    )
     app.register_blueprint(repository_standards_deprecated, url_prefix="/")
 
     app.register_blueprint(
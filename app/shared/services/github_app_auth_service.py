@@ -1,16 +1,211 @@
 import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from time import time
 
-from github import Auth, GithubIntegration
+import jwt
+
+from app.shared.services.http_transport import get_http_transport
 
 logger = logging.getLogger(__name__)
 
 
+def create_installation_token(
+    app_id: str,
+    private_key: str,
+    installation_id: int,
+    base_url: str = "https://api.github.com",
+    timeout: float = 10,
+) -> dict:
+    """
+    Create a GitHub App installation token.
+
+    Returns:
+        dict: { "token": str, "expires_at": datetime }
+    """
+    now_ts = int(time())
+    payload = {
+        "iat": now_ts,
+        "exp": now_ts + 600,  # max 10 minutes
+        "iss": app_id,
+    }
+    encoded_jwt = jwt.encode(payload, private_key, algorithm="RS256")
+
+    url = f"{base_url.rstrip('/')}/app/installations/{installation_id}/access_tokens"
+    headers = {
+        "Authorization": f"Bearer {encoded_jwt}",
+        "Accept": "application/vnd.github+json",
+    }
+    response = get_http_transport("github-app-auth").request(
+        "POST", url, deadline_seconds=timeout, headers=headers
+    )
+    response.raise_for_status()
+    data = response.json()
+
+    return {
+        "token": data["token"],
+        "expires_at": datetime.strptime(
+            data["expires_at"], "%Y-%m-%dT%H:%M:%SZ"
+        ).replace(tzinfo=timezone.utc),
+    }
+
+
+class InstallationTokenBroker:
+    """
+    Hands out one installation token to everything that talks to GitHub as the
+    installation, instead of each client signing its own JWT and minting its own
+    token.
+
+    While tokens are being asked for, the token is refreshed on a background timer
+    `refresh_ahead` before it expires, so callers are not held up by a refresh
+    mid-crawl. A process that has not asked for the token since it was minted lets
+    it lapse, and the next caller mints one. A failed background refresh is tried
+    again after `refresh_retry_delay`, doubling each time, until the token is within
+    `minimum_validity` of expiry, when the next caller refreshes it instead.
+
+    Tokens are minted outside the lock, so callers keep getting the current token
+    while a refresh is in flight.
+    """
+
+    def __init__(
+        self,
+        app_id: str,
+        private_key: str,
+        installation_id: int,
+        base_url: str = "https://api.github.com",
+        refresh_ahead: timedelta = timedelta(minutes=5),
+        minimum_validity: timedelta = timedelta(minutes=1),
+        refresh_retry_delay: timedelta = timedelta(seconds=5),
+    ):
+        self.app_id = app_id
+        self.private_key = private_key
+        self.installation_id = installation_id
+        self.base_url = base_url
+        self.refresh_ahead = refresh_ahead
+        self.minimum_validity = minimum_validity
+        self.refresh_retry_delay = refresh_retry_delay
+        self.mints = 0
+        self.__token: str | None = None
+        self.__expires_at = datetime.fromtimestamp(0, tz=timezone.utc)
+        self.__requested = False
+        self.__timer: threading.Timer | None = None
+        self.__closed = False
+        self.__lock = threading.Lock()
+        # Held while minting, so only one caller mints at a time
+        self.__mint_lock = threading.Lock()
+
+    def get_token(self) -> str:
+        with self.__lock:
+            self.__requested = True
+            if self.__is_valid():
+                return self.__token
+
+        with self.__mint_lock:
+            # Another caller may have minted one while this one waited
+            with self.__lock:
+                if self.__is_valid():
+                    return self.__token
+            self.__mint()
+        with self.__lock:
+            return self.__token
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__closed = True
+            if self.__timer:
+                self.__timer.cancel()
+                self.__timer = None
+
+    def __is_valid(self) -> bool:
+        return bool(self.__token) and (
+            datetime.now(timezone.utc) < self.__expires_at - self.minimum_validity
+        )
+
+    def __mint(self) -> None:
+        token_data = create_installation_token(
+            self.app_id, self.private_key, self.installation_id, self.base_url
+        )
+        with self.__lock:
+            self.mints += 1
+            self.__token = token_data["token"]
+            self.__expires_at = token_data["expires_at"]
+            self.__requested = False
+            logger.debug(
+                f"Minted installation token for [ {self.installation_id} ], expires at [ {self.__expires_at} ]"
+            )
+            self.__schedule(
+                self.__expires_at - self.refresh_ahead - datetime.now(timezone.utc),
+                self.refresh_retry_delay,
+            )
+
+    def __schedule(self, refresh_in: timedelta, retry_delay: timedelta) -> None:
+        if self.__timer:
+            self.__timer.cancel()
+        self.__timer = None
+        if self.__closed:
+            return
+        self.__timer = threading.Timer(
+            max(refresh_in.total_seconds(), 0),
+            self.__refresh_in_background,
+            [retry_delay],
+        )
+        self.__timer.daemon = True
+        self.__timer.start()
+
+    def __refresh_in_background(self, retry_delay: timedelta) -> None:
+        with self.__lock:
+            if not self.__requested:
+                logger.debug(
+                    f"Installation token for [ {self.installation_id} ] unused since it was minted, not refreshing it"
+                )
+                self.__timer = None
+                return
+
+        with self.__mint_lock:
+            try:
+                self.__mint()
+                return
+            except Exception as e:
+                logger.warning(
+                    f"Unable to refresh installation token ahead of expiry: {e}"
+                )
+
+        with self.__lock:
+            if (
+                datetime.now(timezone.utc) + retry_delay
+                < self.__expires_at - self.minimum_validity
+            ):
+                self.__schedule(retry_delay, retry_delay * 2)
+            else:
+                self.__timer = None
+
+
+__token_brokers: dict[tuple[str, int, str], InstallationTokenBroker] = {}
+__token_brokers_lock = threading.Lock()
+
+
+def get_installation_token_broker(
+    client_id: str,
+    private_key: str,
+    installation_id: int,
+    base_url: str = "https://api.github.com",
+) -> InstallationTokenBroker:
+    """The broker shared by every caller in this process for the installation."""
+    key = (client_id, int(installation_id), base_url.rstrip("/"))
+    with __token_brokers_lock:
+        if key not in __token_brokers:
+            __token_brokers[key] = InstallationTokenBroker(
+                client_id, private_key, installation_id, base_url
+            )
+        return __token_brokers[key]
+
+
 def get_github_app_auth_headers(client_id: str, private_key: str, installation_id: int) -> dict:
 
     logger.info(f"Authenticating via GitHub App (client_id: {client_id[:10]}..., installation_id: {installation_id})")
 
-    auth = Auth.AppAuth(client_id, private_key)
-    gi = GithubIntegration(auth=auth)
-    token = gi.get_access_token(int(installation_id)).token
+    token = get_installation_token_broker(
+        client_id, private_key, installation_id
+    ).get_token()
 
     return {"Authorization": f"token {token}"}
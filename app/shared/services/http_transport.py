@@ -0,0 +1,307 @@
+import logging
+import random
+import threading
+from time import monotonic, perf_counter, sleep
+from typing import Callable, Mapping
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = ["GET", "HEAD", "OPTIONS", "PUT", "DELETE"]
+
+RETRYABLE_STATUS_CODES = [502, 503, 504]
+
+
+class CircuitOpenError(requests.ConnectionError):
+    pass
+
+
+class RetryBudget:
+    """
+    Limits retries to `ratio` of the requests made, with up to `capacity` retries
+    saved up, so an upstream that is failing for everyone is not also sent several
+    times its usual traffic.
+    """
+
+    def __init__(self, ratio: float = 0.1, capacity: int = 10):
+        self.ratio = ratio
+        self.capacity = capacity
+        self.__balance = float(capacity)
+        self.__lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self.__lock:
+            self.__balance = min(self.__balance + self.ratio, self.capacity)
+
+    def withdraw(self) -> bool:
+        with self.__lock:
+            if self.__balance < 1:
+                return False
+            self.__balance -= 1
+            return True
+
+
+class CircuitBreaker:
+    """
+    Fails requests straight away once `failure_threshold` requests in a row have
+    failed, rather than have every worker wait on an upstream that is down. After
+    `reset_timeout_seconds` one request is let through to probe it; the circuit
+    closes again if that request succeeds.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout_seconds: float = 30,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self.__failures = 0
+        self.__opened_at: float | None = None
+        self.__probing = False
+        self.__lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self.__lock:
+            if self.__opened_at is None:
+                return "closed"
+            if (
+                self.__probing
+                or monotonic() - self.__opened_at >= self.reset_timeout_seconds
+            ):
+                return "half_open"
+            return "open"
+
+    def before_request(self) -> None:
+        with self.__lock:
+            if self.__opened_at is None:
+                return
+            if (
+                self.__probing
+                or monotonic() - self.__opened_at < self.reset_timeout_seconds
+            ):
+                raise CircuitOpenError(f"Circuit [ {self.name} ] is open")
+            self.__probing = True
+
+    def record_success(self) -> None:
+        with self.__lock:
+            if self.__opened_at is not None:
+                logger.info(f"Circuit [ {self.name} ] closed")
+            self.__failures = 0
+            self.__opened_at = None
+            self.__probing = False
+
+    def record_failure(self) -> None:
+        with self.__lock:
+            self.__failures += 1
+            if self.__probing or (
+                self.__opened_at is None and self.__failures >= self.failure_threshold
+            ):
+                logger.warning(
+                    f"Circuit [ {self.name} ] opened after [ {self.__failures} ] failures"
+                )
+                self.__opened_at = monotonic()
+                self.__probing = False
+
+
+class RetryPolicy:
+    """
+    Decides whether a request that failed in transit or with a 502, 503 or 504 is
+    retried, with exponential backoff and jitter. Only idempotent requests are
+    retried, as a request that timed out may still have been applied, and only
+    while the retry budget, the attempts and the caller's deadline allow.
+
+    Shared by every client of an upstream so they see the same budget and circuit.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_attempts: int = 3,
+        backoff_seconds: float = 0.5,
+        max_backoff_seconds: float = 10,
+        retry_budget: RetryBudget | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+    ):
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.retry_budget = retry_budget or RetryBudget()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker(name)
+
+    def before_attempt(self, attempt: int) -> None:
+        """Raises `CircuitOpenError` if the upstream should not be called."""
+        self.circuit_breaker.before_request()
+        if attempt == 1:
+            self.retry_budget.deposit()
+
+    def get_retry_delay(
+        self,
+        method: str,
+        status_code: int | None,
+        attempt: int,
+        headers: Mapping[str, str] | None = None,
+        idempotent: bool | None = None,
+        deadline_at: float | None = None,
+    ) -> float | None:
+        """
+        Records the outcome of an attempt, `status_code` being `None` when it failed
+        in transit, and returns how long to wait before retrying it or `None` if it
+        should not be retried.
+        """
+        if status_code is None or status_code >= 500:
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.record_success()
+
+        if status_code is not None and status_code not in RETRYABLE_STATUS_CODES:
+            return None
+        if not (method in IDEMPOTENT_METHODS if idempotent is None else idempotent):
+            return None
+        if attempt >= self.max_attempts:
+            return None
+
+        retry_after = (headers or {}).get("Retry-After", "")
+        if retry_after.isdigit():
+            delay = float(retry_after)
+        else:
+            delay = random.uniform(
+                0,
+                min(
+                    self.backoff_seconds * 2 ** (attempt - 1), self.max_backoff_seconds
+                ),
+            )
+        if deadline_at is not None and monotonic() + delay >= deadline_at:
+            return None
+        if not self.retry_budget.withdraw():
+            logger.warning(f"Retry budget exhausted, not retrying [ {method} ]")
+            return None
+        return delay
+
+
+class HttpTransport:
+    """
+    A pooled keep-alive `requests` session for calling one upstream. Every attempt
+    has connect and read timeouts and every request a deadline covering all of its
+    attempts, so a hung socket cannot hold a worker indefinitely. Failed attempts
+    go through a `RetryPolicy`.
+
+    `observer` is called after every attempt with the method, url, status code
+    (`None` if it failed in transit), elapsed seconds, response size and headers.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        pool_size: int = 10,
+        connect_timeout_seconds: float = 5,
+        read_timeout_seconds: float = 30,
+        deadline_seconds: float = 60,
+        retry_policy: RetryPolicy | None = None,
+        observer: Callable[..., None] | None = None,
+    ):
+        self.name = name
+        self.connect_timeout_seconds = connect_timeout_seconds
+        self.read_timeout_seconds = read_timeout_seconds
+        self.deadline_seconds = deadline_seconds
+        self.retry_policy = retry_policy or RetryPolicy(name)
+        self.observer = observer
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        deadline_seconds: float | None = None,
+        idempotent: bool | None = None,
+        **kwargs,
+    ) -> requests.Response:
+        """
+        `idempotent` marks requests that are safe to retry whatever their method,
+        such as GraphQL queries.
+        """
+        deadline_at = monotonic() + (deadline_seconds or self.deadline_seconds)
+        attempt = 1
+        while True:
+            self.retry_policy.before_attempt(attempt)
+            remaining = deadline_at - monotonic()
+            if remaining <= 0:
+                raise requests.Timeout(f"Deadline exceeded calling [ {url} ]")
+
+            started_at = perf_counter()
+            response = None
+            try:
+                response = self.session.request(
+                    method,
+                    url,
+                    timeout=(
+                        min(self.connect_timeout_seconds, remaining),
+                        min(self.read_timeout_seconds, remaining),
+                    ),
+                    **kwargs,
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            else:
+                error = None
+            self.__observe(method, url, response, perf_counter() - started_at)
+
+            delay = self.retry_policy.get_retry_delay(
+                method,
+                response.status_code if response is not None else None,
+                attempt,
+                response.headers if response is not None else None,
+                idempotent,
+                deadline_at,
+            )
+            if delay is None:
+                if error:
+                    raise error
+                return response
+            logger.warning(
+                f"[ {method} {url} ] failed (attempt {attempt}/{self.retry_policy.max_attempts}), retrying in [ {delay:.2f} ] seconds"
+            )
+            sleep(delay)
+            attempt += 1
+
+    def __observe(
+        self,
+        method: str,
+        url: str,
+        response: requests.Response | None,
+        elapsed_seconds: float,
+    ) -> None:
+        if not self.observer:
+            return
+        if response is None:
+            self.observer(method, url, None, elapsed_seconds)
+            return
+        self.observer(
+            method,
+            url,
+            response.status_code,
+            elapsed_seconds,
+            len(response.content),
+            response.headers,
+        )
+
+
+__http_transports: dict[str, HttpTransport] = {}
+__http_transports_lock = threading.Lock()
+
+
+def get_http_transport(name: str) -> HttpTransport:
+    """The transport shared by every caller of the upstream `name` in this process."""
+    with __http_transports_lock:
+        if name not in __http_transports:
+            __http_transports[name] = HttpTransport(name)
+        return __http_transports[name]
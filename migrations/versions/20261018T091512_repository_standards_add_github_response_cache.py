@@ -0,0 +1,31 @@
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a3c91e7f2b48"
+down_revision = "64b771c789c0"
+
+
+def upgrade():
+    op.create_table(
+        "github_response_cache",
+        sa.Column("key", sa.String(), nullable=False),
+        sa.Column("url", sa.String(), nullable=False),
+        sa.Column("etag", sa.String(), nullable=True),
+        sa.Column("last_modified", sa.String(), nullable=True),
+        sa.Column("next_url", sa.String(), nullable=True),
+        sa.Column("body", sa.Text(), nullable=False),
+        sa.Column("last_used", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+    )
+    op.create_index(
+        "ix_github_response_cache_last_used",
+        "github_response_cache",
+        ["last_used"],
+    )
+
+
+def downgrade():
+    op.drop_index("ix_github_response_cache_last_used", "github_response_cache")
+    op.drop_table("github_response_cache")
@@ -0,0 +1,29 @@
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c58f0a9d3e17"
+down_revision = "7d2e4b8c1f05"
+
+
+def upgrade():
+    op.create_table(
+        "sync_checkpoints",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("sync_run_id", sa.Integer(), nullable=False),
+        sa.Column("repository_name", sa.String(), nullable=False),
+        sa.Column("data", sa.JSON(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["sync_run_id"], ["sync_runs.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_sync_checkpoints_sync_run_id", "sync_checkpoints", ["sync_run_id"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_sync_checkpoints_sync_run_id", "sync_checkpoints")
+    op.drop_table("sync_checkpoints")
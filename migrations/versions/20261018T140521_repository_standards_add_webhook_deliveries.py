@@ -0,0 +1,21 @@
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e19b7c24d6a3"
+down_revision = "c58f0a9d3e17"
+
+
+def upgrade():
+    op.create_table(
+        "webhook_deliveries",
+        sa.Column("delivery_id", sa.String(), nullable=False),
+        sa.Column("event", sa.String(), nullable=False),
+        sa.Column("received_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("delivery_id"),
+    )
+
+
+def downgrade():
+    op.drop_table("webhook_deliveries")
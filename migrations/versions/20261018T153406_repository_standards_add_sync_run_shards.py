@@ -0,0 +1,33 @@
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "4a7f3c91e2b8"
+down_revision = "e19b7c24d6a3"
+
+
+def upgrade():
+    op.add_column("sync_runs", sa.Column("key", sa.String(), nullable=True))
+    op.add_column(
+        "sync_runs",
+        sa.Column("shard_count", sa.Integer(), nullable=False, server_default="1"),
+    )
+    op.create_index("ix_sync_runs_key", "sync_runs", ["key"], unique=True)
+    op.create_table(
+        "sync_run_shards",
+        sa.Column("sync_run_id", sa.Integer(), nullable=False),
+        sa.Column("shard_index", sa.Integer(), nullable=False),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["sync_run_id"], ["sync_runs.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("sync_run_id", "shard_index"),
+    )
+
+
+def downgrade():
+    op.drop_table("sync_run_shards")
+    op.drop_index("ix_sync_runs_key", "sync_runs")
+    op.drop_column("sync_runs", "shard_count")
+    op.drop_column("sync_runs", "key")
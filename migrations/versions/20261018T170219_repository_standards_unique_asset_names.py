@@ -0,0 +1,36 @@
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "b3d81e6f0a47"
+down_revision = "4a7f3c91e2b8"
+
+
+def upgrade():
+    # Keep the newest of any assets sharing a name; the next sync recreates the
+    # relationships of the ones removed
+    op.execute(
+        """
+        DELETE FROM relationships
+        WHERE assets_id IN (
+            SELECT duplicate.id FROM assets duplicate
+            JOIN assets newer
+                ON newer.name = duplicate.name AND newer.id > duplicate.id
+        )
+        """
+    )
+    op.execute(
+        """
+        DELETE FROM assets
+        WHERE id IN (
+            SELECT duplicate.id FROM assets duplicate
+            JOIN assets newer
+                ON newer.name = duplicate.name AND newer.id > duplicate.id
+        )
+        """
+    )
+    op.create_index("ix_assets_name", "assets", ["name"], unique=True)
+
+
+def downgrade():
+    op.drop_index("ix_assets_name", "assets")
@@ -0,0 +1,28 @@
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "5c9e27a4d1f3"
+down_revision = "b3d81e6f0a47"
+
+
+def upgrade():
+    for table in ["assets", "relationships"]:
+        op.add_column(table, sa.Column("sync_run_id", sa.Integer(), nullable=True))
+        op.create_foreign_key(
+            f"{table}_sync_run_id_fkey",
+            table,
+            "sync_runs",
+            ["sync_run_id"],
+            ["id"],
+            ondelete="SET NULL",
+        )
+        op.create_index(f"ix_{table}_sync_run_id", table, ["sync_run_id"])
+
+
+def downgrade():
+    for table in ["assets", "relationships"]:
+        op.drop_index(f"ix_{table}_sync_run_id", table)
+        op.drop_constraint(f"{table}_sync_run_id_fkey", table, type_="foreignkey")
+        op.drop_column(table, "sync_run_id")
@@ -0,0 +1,30 @@
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "8e4b6d02c9a1"
+down_revision = "5c9e27a4d1f3"
+
+TEAM_FIELDS = ["teams_with_admin", "teams_with_admin_parents", "teams", "teams_parents"]
+
+
+def upgrade():
+    op.execute("ALTER TABLE assets ALTER COLUMN data TYPE JSONB USING data::jsonb")
+    # The expressions match those `AssetRepository` queries with, `?|` for the teams
+    # and `@>` for the security settings
+    for team_field in TEAM_FIELDS:
+        op.execute(
+            f"CREATE INDEX ix_assets_data_access_{team_field} ON assets "
+            f"USING gin ((data -> 'access' -> '{team_field}'))"
+        )
+    op.execute(
+        "CREATE INDEX ix_assets_data_security_and_analysis ON assets "
+        "USING gin ((data -> 'security_and_analysis') jsonb_path_ops)"
+    )
+
+
+def downgrade():
+    op.execute("DROP INDEX ix_assets_data_security_and_analysis")
+    for team_field in TEAM_FIELDS:
+        op.execute(f"DROP INDEX ix_assets_data_access_{team_field}")
+    op.execute("ALTER TABLE assets ALTER COLUMN data TYPE JSON USING data::json")
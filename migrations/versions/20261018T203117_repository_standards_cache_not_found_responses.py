@@ -0,0 +1,18 @@
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "d71f3a9c0e52"
+down_revision = "8e4b6d02c9a1"
+
+
+def upgrade():
+    op.add_column(
+        "github_response_cache",
+        sa.Column("status_code", sa.Integer(), nullable=False, server_default="200"),
+    )
+
+
+def downgrade():
+    op.drop_column("github_response_cache", "status_code")
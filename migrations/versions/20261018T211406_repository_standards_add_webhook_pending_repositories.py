@@ -0,0 +1,28 @@
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "f4a06c8e2b71"
+down_revision = "d71f3a9c0e52"
+
+
+def upgrade():
+    op.create_table(
+        "webhook_pending_repositories",
+        sa.Column("repository_name", sa.String(), nullable=False),
+        sa.Column("requested_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("repository_name"),
+    )
+    op.create_index(
+        "ix_webhook_pending_repositories_requested_at",
+        "webhook_pending_repositories",
+        ["requested_at"],
+    )
+
+
+def downgrade():
+    op.drop_index(
+        "ix_webhook_pending_repositories_requested_at", "webhook_pending_repositories"
+    )
+    op.drop_table("webhook_pending_repositories")
@@ -0,0 +1,165 @@
+import unittest
+
+import requests
+
+from app.projects.repository_standards.benchmarks.crawl_benchmark import (
+    CALL_BUDGET,
+    CallBudgetExceeded,
+    generate_private_key,
+    get_calls_over_budget,
+    run_crawl_benchmark,
+)
+from app.projects.repository_standards.benchmarks.github_replay_server import (
+    GitHubReplayServer,
+    synthetic_routes,
+)
+from app.projects.repository_standards.services.github_service import GithubService
+
+ORG = "ministryofjustice"
+
+
+class TestGitHubReplayServer(unittest.TestCase):
+    def test_lists_are_paginated_with_absolute_next_links(self):
+        with GitHubReplayServer(synthetic_routes(ORG, 45)) as server:
+            response = requests.get(
+                f"{server.base_url}/orgs/{ORG}/repos", params={"per_page": 20}
+            )
+
+        self.assertEqual(len(response.json()), 20)
+        self.assertEqual(
+            response.links["next"]["url"],
+            f"{server.base_url}/orgs/{ORG}/repos?per_page=20&page=2",
+        )
+
+    def test_requests_are_refused_once_the_rate_limit_runs_out(self):
+        with GitHubReplayServer(synthetic_routes(ORG, 1), rate_limit=2) as server:
+            responses = [
+                requests.get(f"{server.base_url}/orgs/{ORG}/teams") for _ in range(3)
+            ]
+
+        self.assertEqual(
+            [response.status_code for response in responses], [200, 200, 403]
+        )
+        self.assertEqual(responses[1].headers["X-RateLimit-Remaining"], "0")
+        self.assertEqual(server.stats()["by_endpoint"], {"GET /orgs/{org}/teams": 3})
+
+    def test_every_ingestion_mode_crawls_the_synthetic_organisation(self):
+        private_key = generate_private_key()
+        with GitHubReplayServer(synthetic_routes(ORG, 30)) as server:
+            results = {
+                ingestion_mode: GithubService(
+                    "client-id",
+                    private_key,
+                    1,
+                    ingestion_mode=ingestion_mode,
+                    crawl_workers=4,
+                    base_url=server.base_url,
+                ).get_repositories()
+                for ingestion_mode in ["graphql", "async"]
+            }
+
+        graphql, asynchronous = results["graphql"], results["async"]
+        # Repository 0 is archived and repository 1 a fork
+        self.assertEqual(len(asynchronous), 28)
+        self.assertEqual(
+            [repository.basic.name for repository in graphql],
+            [repository.basic.name for repository in asynchronous],
+        )
+        self.assertEqual(
+            [repository.access for repository in graphql],
+            [repository.access for repository in asynchronous],
+        )
+
+    def test_graphql_refreshes_one_repository_without_paging_the_estate(self):
+        private_key = generate_private_key()
+        with GitHubReplayServer(synthetic_routes(ORG, 30)) as server:
+            crawled = GithubService(
+                "client-id",
+                private_key,
+                1,
+                ingestion_mode="graphql",
+                base_url=server.base_url,
+            ).get_repositories()
+            server.reset_stats()
+            (refreshed,) = GithubService(
+                "client-id",
+                private_key,
+                1,
+                ingestion_mode="graphql",
+                base_url=server.base_url,
+            ).get_repositories("repository-00005")
+            served = server.stats()["by_endpoint"]
+
+        self.assertEqual(
+            refreshed.access,
+            next(
+                repository.access
+                for repository in crawled
+                if repository.basic.name == "repository-00005"
+            ),
+        )
+        self.assertNotIn("GET /orgs/{org}/repos", served)
+        self.assertEqual(served["GET /repos/{org}/{repo}"], 1)
+        self.assertEqual(served["POST /graphql"], 1)
+
+    def test_crawl_fetches_unlisted_fields_in_bulk(self):
+        with GitHubReplayServer(synthetic_routes(ORG, 20)) as server:
+            github_service = GithubService(
+                "client-id", generate_private_key(), 1, base_url=server.base_url
+            )
+            repositories = github_service.get_repositories()
+            served = server.stats()["by_endpoint"]
+
+        self.assertEqual(
+            {
+                repository.basic.name: repository.basic.delete_branch_on_merge
+                for repository in repositories[:2]
+            },
+            {"repository-00002": True, "repository-00003": False},
+        )
+        self.assertNotIn("GET /repos/{org}/{repo}", served)
+        self.assertEqual(served["POST /graphql"], 1)
+
+
+class TestCrawlBenchmark(unittest.TestCase):
+    def test_reports_wall_time_calls_and_memory(self):
+        result = run_crawl_benchmark(20, ingestion_mode="graphql")
+
+        self.assertEqual(result.repository_count, 20)
+        self.assertGreater(result.wall_time_seconds, 0)
+        self.assertGreater(result.peak_memory_mb, 0)
+        self.assertEqual(result.calls_by_endpoint["POST /graphql"], 2)
+        self.assertEqual(
+            result.api_calls, sum(result.calls_by_endpoint.values())
+        )
+
+    def test_the_rest_crawl_stays_within_the_call_budget(self):
+        result = run_crawl_benchmark(20, ingestion_mode="rest")
+
+        self.assertEqual(
+            result.api_calls_per_repository_by_endpoint[
+                "GET /repos/{org}/{repo}/branches/{branch}/protection"
+            ],
+            1,
+        )
+
+    def test_exceeding_the_call_budget_raises(self):
+        with self.assertRaises(CallBudgetExceeded):
+            run_crawl_benchmark(20, ingestion_mode="rest", call_budget={})
+
+    def test_unbudgeted_per_repository_endpoints_are_over_budget(self):
+        self.assertEqual(
+            get_calls_over_budget(
+                {
+                    "GET /repos/{org}/{repo}": 0.05,
+                    "GET /repos/{org}/{repo}/rules/branches/{branch}": 1,
+                    "GET /orgs/{org}/teams": 0.05,
+                },
+                CALL_BUDGET,
+            ),
+            {"GET /repos/{org}/{repo}": 0.05},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
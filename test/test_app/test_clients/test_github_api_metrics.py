@@ -0,0 +1,122 @@
+import unittest
+
+from app.projects.repository_standards.benchmarks.crawl_benchmark import (
+    generate_private_key,
+)
+from app.projects.repository_standards.benchmarks.github_replay_server import (
+    GitHubReplayServer,
+    synthetic_routes,
+)
+from app.projects.repository_standards.clients.github_api_metrics import (
+    GitHubApiMetrics,
+    get_endpoint_template,
+)
+from app.projects.repository_standards.services.github_service import GithubService
+
+
+class TestGetEndpointTemplate(unittest.TestCase):
+    def test_names_and_ids_are_collapsed(self):
+        self.assertEqual(
+            get_endpoint_template(
+                "GET",
+                "https://api.github.com/repos/ministryofjustice/repo/branches/release/1.0/protection?page=2",
+            ),
+            "GET /repos/{org}/{repo}/branches/{branch}/protection",
+        )
+        self.assertEqual(
+            get_endpoint_template(
+                "GET", "https://api.github.com/orgs/ministryofjustice/rulesets/123"
+            ),
+            "GET /orgs/{org}/rulesets/{id}",
+        )
+        self.assertEqual(
+            get_endpoint_template(
+                "GET", "/orgs/ministryofjustice/teams/team-a/repos"
+            ),
+            "GET /orgs/{org}/teams/{team}/repos",
+        )
+
+
+class TestGitHubApiMetrics(unittest.TestCase):
+    def test_summarises_latency_bytes_and_status_by_endpoint(self):
+        metrics = GitHubApiMetrics()
+        for latency in range(1, 101):
+            metrics.record(
+                "GET",
+                f"/repos/ministryofjustice/repo-{latency}/rules/branches/main",
+                304 if latency % 4 == 0 else 200,
+                latency / 100,
+                10,
+                {"X-RateLimit-Remaining": str(5000 - latency)},
+            )
+        metrics.record("GET", "/repos/ministryofjustice/repo/branches/main/protection", 404, 1)
+        metrics.record("GET", "/repos/ministryofjustice/repo/branches/main/protection", None, 1)
+
+        summary = metrics.summary()
+
+        rules = summary["endpoints"]["GET /repos/{org}/{repo}/rules/branches/{branch}"]
+        self.assertEqual(summary["calls"], 102)
+        self.assertEqual(rules["calls"], 100)
+        self.assertEqual(rules["p50_seconds"], 0.51)
+        self.assertEqual(rules["p99_seconds"], 1)
+        self.assertEqual(rules["response_bytes"], 1000)
+        self.assertEqual(rules["not_modified_rate"], 0.25)
+        protection = summary["endpoints"][
+            "GET /repos/{org}/{repo}/branches/{branch}/protection"
+        ]
+        self.assertEqual(protection["client_error_rate"], 0.5)
+        self.assertEqual(protection["server_error_rate"], 0.5)
+        self.assertEqual(summary["rate_limit_remaining"], {"core": 4900})
+
+    def test_prometheus_exposition(self):
+        metrics = GitHubApiMetrics()
+        metrics.record(
+            "GET",
+            "/orgs/ministryofjustice/teams",
+            200,
+            0.2,
+            100,
+            {"X-RateLimit-Remaining": "10", "X-RateLimit-Resource": "core"},
+        )
+
+        exposition = metrics.to_prometheus()
+
+        self.assertIn(
+            'github_api_requests_total{method="GET",endpoint="/orgs/{org}/teams",status="2xx"} 1',
+            exposition,
+        )
+        self.assertIn(
+            'github_api_request_duration_seconds_bucket{method="GET",endpoint="/orgs/{org}/teams",le="0.1"} 0',
+            exposition,
+        )
+        self.assertIn(
+            'github_api_request_duration_seconds_bucket{method="GET",endpoint="/orgs/{org}/teams",le="0.25"} 1',
+            exposition,
+        )
+        self.assertIn('github_api_rate_limit_remaining{resource="core"} 10', exposition)
+
+    def test_every_crawl_request_is_recorded(self):
+        metrics = GitHubApiMetrics()
+        with GitHubReplayServer(synthetic_routes("ministryofjustice", 3)) as server:
+            GithubService(
+                "client-id",
+                generate_private_key(),
+                1,
+                base_url=server.base_url,
+                api_metrics=metrics,
+            ).get_repositories()
+            served = server.stats()["by_endpoint"]
+
+        recorded = {
+            endpoint: endpoint_metrics["calls"]
+            for endpoint, endpoint_metrics in metrics.summary()["endpoints"].items()
+        }
+        # Only the installation token is minted outside of the clients
+        served.pop("POST /app/installations/{id}/access_tokens")
+        self.assertEqual(recorded, served)
+        self.assertIn("GET /orgs/{org}/repos", recorded)
+        self.assertIn("GET /repos/{org}/{repo}/rules/branches/{branch}", recorded)
+
+
+if __name__ == "__main__":
+    unittest.main()
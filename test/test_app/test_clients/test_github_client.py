@@ -0,0 +1,80 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.projects.repository_standards.clients.github_client import GitHubClient
+
+
+def page(nodes: list, end_cursor: str | None = None) -> dict:
+    return {
+        "pageInfo": {"hasNextPage": end_cursor is not None, "endCursor": end_cursor},
+        "nodes": nodes,
+    }
+
+
+def ruleset(ruleset_id: str, rules: dict) -> dict:
+    return {"id": ruleset_id, "databaseId": 1, "rules": rules}
+
+
+class TestGetRepositoryGraphql(unittest.TestCase):
+    def setUp(self):
+        self.github_client = GitHubClient(
+            "client-id",
+            "private-key",
+            1,
+            "ministryofjustice",
+            token_broker=MagicMock(),
+        )
+
+    def test_follows_the_remaining_pages_of_rulesets_and_rules(self):
+        responses = [
+            {
+                "repository": {
+                    "name": "repository-a",
+                    "rulesets": page(
+                        [ruleset("ruleset-1", page([{"type": "DELETION"}], "r1"))],
+                        "s1",
+                    ),
+                }
+            },
+            {
+                "repository": {
+                    "rulesets": page([ruleset("ruleset-2", page([]))]),
+                }
+            },
+            {"node": {"rules": page([{"type": "PULL_REQUEST"}])}},
+        ]
+
+        with patch.object(
+            self.github_client, "graphql", side_effect=responses
+        ) as mock_graphql:
+            repository = self.github_client.get_repository_graphql("repository-a")
+
+        rulesets = repository["rulesets"]["nodes"]
+        self.assertEqual(
+            [ruleset["id"] for ruleset in rulesets], ["ruleset-1", "ruleset-2"]
+        )
+        self.assertEqual(
+            [rule["type"] for rule in rulesets[0]["rules"]["nodes"]],
+            ["DELETION", "PULL_REQUEST"],
+        )
+        self.assertEqual(
+            mock_graphql.call_args_list[1].args[1],
+            {"org": "ministryofjustice", "name": "repository-a", "cursor": "s1"},
+        )
+        self.assertEqual(
+            mock_graphql.call_args_list[2].args[1], {"id": "ruleset-1", "cursor": "r1"}
+        )
+
+    def test_a_single_page_needs_no_further_requests(self):
+        repository = {"name": "repository-a", "rulesets": page([])}
+
+        with patch.object(
+            self.github_client, "graphql", return_value={"repository": repository}
+        ) as mock_graphql:
+            self.github_client.get_repository_graphql("repository-a")
+
+        mock_graphql.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
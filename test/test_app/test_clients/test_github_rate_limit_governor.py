@@ -0,0 +1,73 @@
+import unittest
+from time import time
+from unittest.mock import patch
+
+from app.projects.repository_standards.clients.github_rate_limit_governor import (
+    RateLimitGovernor,
+)
+
+MODULE = "app.projects.repository_standards.clients.github_rate_limit_governor"
+
+
+class TestRateLimitGovernor(unittest.TestCase):
+    @patch(f"{MODULE}.sleep")
+    def test_requests_are_not_paced_while_budget_is_plentiful(self, mock_sleep):
+        governor = RateLimitGovernor()
+        governor.observe(
+            {
+                "X-RateLimit-Limit": "5000",
+                "X-RateLimit-Remaining": "4000",
+                "X-RateLimit-Reset": str(time() + 3600),
+            }
+        )
+
+        governor.wait()
+        governor.wait()
+
+        mock_sleep.assert_not_called()
+
+    @patch(f"{MODULE}.sleep")
+    def test_requests_are_spread_until_reset_when_budget_is_low(self, mock_sleep):
+        governor = RateLimitGovernor(reserve=0)
+        governor.observe(
+            {
+                "X-RateLimit-Limit": "5000",
+                "X-RateLimit-Remaining": "100",
+                "X-RateLimit-Reset": str(time() + 100),
+            }
+        )
+
+        governor.wait()
+        governor.wait()
+
+        mock_sleep.assert_called_once()
+        self.assertAlmostEqual(mock_sleep.call_args.args[0], 1, delta=0.1)
+
+    @patch(f"{MODULE}.sleep")
+    def test_retry_after_pauses_every_worker(self, mock_sleep):
+        governor = RateLimitGovernor()
+
+        delay = governor.get_retry_delay(403, {"Retry-After": "30"}, "", attempt=1)
+        governor.wait()
+
+        self.assertEqual(delay, 30)
+        self.assertAlmostEqual(mock_sleep.call_args.args[0], 30, delta=0.1)
+
+    def test_secondary_rate_limit_backs_off_exponentially_with_jitter(self):
+        governor = RateLimitGovernor(secondary_backoff_seconds=10)
+        body = "You have exceeded a secondary rate limit"
+
+        first = governor.get_retry_delay(403, {}, body, attempt=1)
+        third = governor.get_retry_delay(403, {}, body, attempt=3)
+
+        self.assertTrue(10 <= first <= 15)
+        self.assertTrue(40 <= third <= 60)
+
+    def test_other_errors_and_exhausted_attempts_are_not_retried(self):
+        governor = RateLimitGovernor(max_attempts=2)
+
+        self.assertIsNone(governor.get_retry_delay(404, {}, "Not Found", attempt=1))
+        self.assertIsNone(governor.get_retry_delay(403, {}, "Forbidden", attempt=1))
+        self.assertIsNone(
+            governor.get_retry_delay(429, {"Retry-After": "1"}, "", attempt=2)
+        )
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, select
+
+from app.projects.repository_standards.clients.github_response_cache import (
+    GitHubResponse,
+    GitHubResponseCache,
+    github_response_cache_table,
+)
+
+
+class TestGitHubResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.database_url = (
+            f"sqlite:///{os.path.join(self.directory.name, 'cache.sqlite3')}"
+        )
+        # The migrations own the table
+        self.engine = create_engine(self.database_url)
+        github_response_cache_table.create(self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    def test_stores_responses_with_validators_and_builds_conditional_headers(self):
+        cache = GitHubResponseCache(self.database_url, auth_scope="1")
+        url = "https://api.github.com/repos/org/repo/teams"
+        cache.put(url, {"per_page": 100}, GitHubResponse(body=[1], etag='"abc"'))
+
+        cached = cache.get(url, {"per_page": 100})
+
+        self.assertEqual(cached.body, [1])
+        self.assertEqual(cache.conditional_headers(cached), {"If-None-Match": '"abc"'})
+        self.assertIsNone(cache.get(url, {"per_page": 50}))
+
+    def test_responses_are_scoped_to_the_auth_scope(self):
+        url = "https://api.github.com/repos/org/repo/teams"
+        GitHubResponseCache(self.database_url, auth_scope="1").put(
+            url, None, GitHubResponse(body=[1], etag='"abc"')
+        )
+
+        self.assertIsNone(
+            GitHubResponseCache(self.database_url, auth_scope="2").get(url, None)
+        )
+
+    def test_responses_without_validators_are_not_stored(self):
+        cache = GitHubResponseCache(self.database_url, auth_scope="1")
+        cache.put("https://api.github.com/a", None, GitHubResponse(body=[1]))
+
+        self.assertIsNone(cache.get("https://api.github.com/a", None))
+
+    def test_not_found_responses_are_stored_with_their_status(self):
+        cache = GitHubResponseCache(self.database_url, auth_scope="1")
+        url = "https://api.github.com/repos/org/repo/branches/main/protection"
+        cache.put(
+            url,
+            None,
+            GitHubResponse(body="Branch not protected", etag='"a"', status_code=404),
+        )
+
+        self.assertEqual(cache.get(url, None).status_code, 404)
+
+    def test_reads_are_only_marked_as_used_when_evicting(self):
+        cache = GitHubResponseCache(self.database_url, auth_scope="1")
+        cache.put("https://api.github.com/a", None, GitHubResponse([], etag="a"))
+
+        def last_used():
+            with self.engine.connect() as connection:
+                return connection.execute(
+                    select(github_response_cache_table.c.last_used)
+                ).scalar_one()
+
+        stored_at = last_used()
+        cache.get("https://api.github.com/a", None)
+        self.assertEqual(last_used(), stored_at)
+
+        cache.evict()
+        self.assertGreater(last_used(), stored_at)
+
+    def test_evicts_least_recently_used_responses_over_max_entries(self):
+        cache = GitHubResponseCache(self.database_url, auth_scope="1", max_entries=2)
+        for name in ["a", "b", "c"]:
+            cache.put(
+                f"https://api.github.com/{name}", None, GitHubResponse([], etag=name)
+            )
+        cache.get("https://api.github.com/a", None)
+
+        self.assertEqual(cache.evict(), 1)
+        self.assertIsNone(cache.get("https://api.github.com/b", None))
+        self.assertIsNotNone(cache.get("https://api.github.com/a", None))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
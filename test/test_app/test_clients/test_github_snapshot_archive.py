@@ -0,0 +1,147 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.projects.repository_standards.benchmarks.crawl_benchmark import (
+    generate_private_key,
+)
+from app.projects.repository_standards.benchmarks.github_replay_server import (
+    GitHubReplayServer,
+    synthetic_routes,
+)
+from app.projects.repository_standards.clients.github_snapshot_archive import (
+    GitHubSnapshotArchive,
+    GitHubSnapshotWriter,
+    rest_snapshot_record,
+)
+from app.projects.repository_standards.jobs.evaluate_github_snapshot import (
+    evaluate_snapshot,
+    main,
+)
+from app.projects.repository_standards.models.repository_info import (
+    BasicRepositoryInfo,
+    RepositoryAccess,
+    RepositoryInfo,
+)
+from app.projects.repository_standards.services.asset_service import AssetService
+from app.projects.repository_standards.services.github_service import GithubService
+from app.projects.repository_standards.services.repository_compliance_service import (
+    RepositoryComplianceService,
+)
+
+EVALUATE_MODULE = "app.projects.repository_standards.jobs.evaluate_github_snapshot"
+
+
+def repository_payload(name: str, description: str = "A repository") -> dict:
+    return {
+        "name": name,
+        "visibility": "public",
+        "default_branch": "main",
+        "description": description,
+    }
+
+
+def record(name: str, description: str = "A repository") -> dict:
+    return rest_snapshot_record(
+        repository_payload(name, description),
+        {"enforce_admins": {"enabled": True}},
+        [{"type": "pull_request", "ruleset_id": 1}],
+        {1: {"enforcement": "active", "bypass_actors": []}},
+        RepositoryAccess(["team-a"], [], ["team-a"], []),
+    )
+
+
+class TestGitHubSnapshotArchive(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.archive = GitHubSnapshotArchive(self.directory.name, segment_count=4)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_crawl_can_be_rebuilt_from_its_snapshot(self):
+        snapshot = GitHubSnapshotWriter(self.archive, "1")
+        with GitHubReplayServer(synthetic_routes("ministryofjustice", 20)) as server:
+            repositories = GithubService(
+                "client-id", generate_private_key(), 1, base_url=server.base_url
+            ).get_repositories(snapshot=snapshot)
+        snapshot.close()
+
+        rebuilt = {
+            repository.basic.name: repository.to_dict()
+            for repository in self.archive.load_repositories("1")
+        }
+
+        self.assertEqual(
+            rebuilt,
+            {repository.basic.name: repository.to_dict() for repository in repositories},
+        )
+        self.assertTrue(rebuilt["repository-00002"]["default_branch_ruleset"]["enabled"])
+
+    def test_carried_forward_repositories_keep_their_payloads_from_the_base_run(self):
+        first = GitHubSnapshotWriter(self.archive, "1")
+        for name in ["repository-a", "repository-b", "repository-c"]:
+            first.add(record(name))
+        first.close()
+
+        second = GitHubSnapshotWriter(self.archive, "2", base_run_id="1")
+        second.add(record("repository-a", "Changed"))
+        second.carry_forward(
+            RepositoryInfo(
+                basic=BasicRepositoryInfo("repository-b", "public", False, "main"),
+                access=RepositoryAccess([], [], [], []),
+            )
+        )
+        second.add(record("repository-d"))
+        second.close()
+
+        records = {record["name"]: record for record in self.archive.read_records("2")}
+        self.assertEqual(records["repository-b"], record("repository-b"))
+
+        diff = self.archive.diff("1", "2")
+        self.assertEqual(diff.added, ["repository-d"])
+        self.assertEqual(diff.removed, ["repository-c"])
+        self.assertEqual(diff.changed, {"repository-a": ["repository"]})
+        self.assertEqual(self.archive.list_runs(), ["1", "2"])
+
+    def test_unchanged_segments_are_stored_once(self):
+        for run_id in ["1", "2"]:
+            snapshot = GitHubSnapshotWriter(self.archive, run_id)
+            for name in ["repository-a", "repository-b", "repository-c"]:
+                snapshot.add(record(name))
+            snapshot.close()
+
+        segments = os.listdir(os.path.join(self.directory.name, "segments"))
+        self.assertEqual(
+            len(segments), len(self.archive.get_segments("1")), segments
+        )
+        self.assertEqual(self.archive.diff("1", "2").changed, {})
+
+    def test_snapshot_is_evaluated_without_crawling(self):
+        snapshot = GitHubSnapshotWriter(self.archive, "1")
+        snapshot.add(record("repository-a"))
+        snapshot.close()
+
+        [report] = evaluate_snapshot(
+            self.archive,
+            "1",
+            RepositoryComplianceService(AssetService(MagicMock())),
+            {},
+        )
+
+        self.assertEqual(report.name, "repository-a")
+        checks = {check.name: check.status for check in report.checks}
+        self.assertEqual(checks["Default Branch Protection Enforced For Admins"], "pass")
+
+    @patch(f"{EVALUATE_MODULE}.configure_logging")
+    @patch(f"{EVALUATE_MODULE}.app_config")
+    def test_evaluating_an_empty_archive_says_so(self, mock_app_config, _):
+        mock_app_config.sync.snapshot_path = self.directory.name
+
+        with self.assertRaisesRegex(ValueError, "No archived runs"):
+            main()
+
+
+if __name__ == "__main__":
+    unittest.main()
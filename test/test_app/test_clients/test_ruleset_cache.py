@@ -0,0 +1,110 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+import requests
+
+from app.projects.repository_standards.clients.ruleset_cache import (
+    AsyncRulesetCache,
+    RulesetCache,
+)
+
+
+class TestRulesetCache(unittest.TestCase):
+    def test_organisation_rulesets_are_served_from_the_prefetch(self):
+        github_client = MagicMock()
+        github_client.get_organisation_rulesets.return_value = [{"id": 1}]
+        github_client.get_organisation_ruleset.return_value = {
+            "id": 1,
+            "enforcement": "active",
+        }
+        ruleset_cache = RulesetCache(github_client)
+        ruleset_cache.prefetch_organisation_rulesets()
+
+        for repo in ["repository-a", "repository-b"]:
+            ruleset = ruleset_cache.get_ruleset(
+                repo, {"ruleset_id": 1, "ruleset_source_type": "Organization"}
+            )
+            self.assertEqual(ruleset["enforcement"], "active")
+
+        github_client.get_repository_ruleset.assert_not_called()
+        self.assertEqual(ruleset_cache.stats()["dedup_ratio"], 1.0)
+
+    def test_repository_rulesets_are_fetched_once_per_repository(self):
+        github_client = MagicMock()
+        github_client.get_repository_ruleset.return_value = {"id": 2}
+        ruleset_cache = RulesetCache(github_client)
+        rule = {"ruleset_id": 2, "ruleset_source_type": "Repository"}
+
+        ruleset_cache.get_ruleset("repository-a", rule)
+        ruleset_cache.get_ruleset("repository-a", rule)
+        ruleset_cache.get_ruleset("repository-b", rule)
+
+        self.assertEqual(github_client.get_repository_ruleset.call_count, 2)
+        self.assertEqual(ruleset_cache.stats()["lookups"], 3)
+
+    def test_rulesets_the_prefetch_could_not_get_are_fetched_when_used(self):
+        github_client = MagicMock()
+        github_client.get_organisation_rulesets.return_value = [{"id": 1}, {"id": 2}]
+        github_client.get_organisation_ruleset.side_effect = [
+            requests.Timeout("Deadline exceeded"),
+            {"id": 2},
+        ]
+        github_client.get_repository_ruleset.return_value = {"id": 1}
+        ruleset_cache = RulesetCache(github_client)
+        ruleset_cache.prefetch_organisation_rulesets()
+
+        for ruleset_id in [1, 2]:
+            ruleset_cache.get_ruleset(
+                "repository-a",
+                {"ruleset_id": ruleset_id, "ruleset_source_type": "Organization"},
+            )
+
+        github_client.get_repository_ruleset.assert_called_once_with("repository-a", 1)
+        self.assertEqual(ruleset_cache.stats()["prefetches"], 1)
+
+    def test_an_unavailable_prefetch_does_not_stop_the_crawl(self):
+        github_client = MagicMock()
+        github_client.get_organisation_rulesets.side_effect = requests.ConnectionError()
+        ruleset_cache = RulesetCache(github_client)
+
+        ruleset_cache.prefetch_organisation_rulesets()
+
+        self.assertEqual(ruleset_cache.stats()["prefetches"], 0)
+
+
+class TestAsyncRulesetCache(unittest.TestCase):
+    def test_concurrent_lookups_share_one_fetch(self):
+        github_client = MagicMock()
+        github_client.get_repository_ruleset = AsyncMock(return_value={"id": 2})
+        ruleset_cache = AsyncRulesetCache(github_client)
+        rule = {"ruleset_id": 2, "ruleset_source_type": "Organization"}
+
+        async def look_up():
+            return await asyncio.gather(
+                ruleset_cache.get_ruleset("repository-a", rule),
+                ruleset_cache.get_ruleset("repository-b", rule),
+            )
+
+        self.assertEqual(asyncio.run(look_up()), [{"id": 2}, {"id": 2}])
+        github_client.get_repository_ruleset.assert_awaited_once()
+
+    def test_a_failed_fetch_is_tried_again_by_the_next_lookup(self):
+        github_client = MagicMock()
+        github_client.get_repository_ruleset = AsyncMock(
+            side_effect=[ConnectionError("Connection reset"), {"id": 2}]
+        )
+        ruleset_cache = AsyncRulesetCache(github_client)
+        rule = {"ruleset_id": 2, "ruleset_source_type": "Organization"}
+
+        async def look_up():
+            with self.assertRaises(ConnectionError):
+                await ruleset_cache.get_ruleset("repository-a", rule)
+            return await ruleset_cache.get_ruleset("repository-b", rule)
+
+        self.assertEqual(asyncio.run(look_up()), {"id": 2})
+        self.assertEqual(ruleset_cache.stats()["fetches"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
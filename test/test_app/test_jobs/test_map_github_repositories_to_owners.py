@@ -1,5 +1,6 @@
 import unittest
-from unittest.mock import MagicMock, call, patch
+from datetime import datetime, timezone
+from unittest.mock import ANY, MagicMock, call, patch
 from app.projects.repository_standards.jobs.map_github_repositories_to_owners import (
     main,
 )
@@ -10,20 +11,29 @@ from app.projects.repository_standards.models.repository_info import (
     RepositoryInfo,
     BasicRepositoryInfo,
 )
+from app.projects.repository_standards.repositories.asset_repository import (
+    AssetUpsertResult,
+)
 from app.projects.repository_standards.repositories.owner_repository import (
     OwnerView,
 )
 
 from app.projects.repository_standards.models.owner import OwnerConfig
+from app.projects.repository_standards.models.repository_shard import RepositoryShard
 
 test_owner_id = 1
 
 
-@patch(
-    "app.projects.repository_standards.services.github_service.GithubService.__new__"
-)
-@patch("app.projects.repository_standards.services.asset_service.AssetService.__new__")
-@patch("app.projects.repository_standards.services.owner_service.OwnerService.__new__")
+JOB_MODULE = "app.projects.repository_standards.jobs.map_github_repositories_to_owners"
+
+
+# Patched where the job looks them up, as patching a class's __new__ leaves the
+# class unable to be instantiated with arguments once the patch is removed
+@patch(f"{JOB_MODULE}.SyncRunService")
+@patch(f"{JOB_MODULE}.GitHubResponseCache")
+@patch(f"{JOB_MODULE}.GithubService")
+@patch(f"{JOB_MODULE}.AssetService")
+@patch(f"{JOB_MODULE}.OwnerService")
 class TestMain(unittest.TestCase):
     def setUp(self):
         self.app = Flask(__name__)
@@ -39,6 +49,8 @@ class TestMain(unittest.TestCase):
         mock_owner_service: MagicMock,
         mock_asset_service: MagicMock,
         mock_github_service: MagicMock,
+        mock_github_response_cache: MagicMock,
+        mock_sync_run_service: MagicMock,
     ):
         mock_repository = RepositoryInfo(
             basic=BasicRepositoryInfo(
@@ -56,7 +68,7 @@ class TestMain(unittest.TestCase):
             ),
         )
 
-        mock_github_service.return_value.get_repositories.return_value = [
+        mock_github_service.return_value.iter_repositories.return_value = [
             mock_repository
         ]
         mock_owner_service.return_value.find_all.return_value = [
@@ -72,7 +84,9 @@ class TestMain(unittest.TestCase):
         mock_asset = MagicMock()
         mock_owner = MagicMock()
         mock_owner_service.return_value.find_by_name.return_value = [mock_owner]
-        mock_asset_service.return_value.update_asset_by_name.return_value = mock_asset
+        mock_asset_service.return_value.update_assets_by_name.return_value = (
+            AssetUpsertResult(inserted=1, assets={"Test Repository": mock_asset})
+        )
 
         with self.app.app_context():
             main()
@@ -80,11 +94,13 @@ class TestMain(unittest.TestCase):
         mock_owner_service.return_value.find_by_name.assert_has_calls(
             [call("Test Owners")]
         )
-        mock_asset_service.return_value.update_asset_by_name.assert_has_calls(
-            [call(mock_repository.basic.name, mock_repository.to_dict())]
+        mock_asset_service.return_value.update_assets_by_name.assert_called_once_with(
+            {mock_repository.basic.name: mock_repository.to_dict()}, ANY
         )
-        mock_asset_service.return_value.update_relationships_with_owner.assert_has_calls(
-            [call(mock_asset, mock_owner, "ADMIN_ACCESS")]
+        mock_asset_service.return_value.reconcile_relationships.assert_called_once_with(
+            {(mock_asset.id, mock_owner.id): "ADMIN_ACCESS"},
+            [mock_asset.id],
+            sync_run_id=ANY,
         )
 
     def test_when_parent_team_has_admin_access_then_admin_relationship_created(
@@ -92,6 +108,8 @@ class TestMain(unittest.TestCase):
         mock_owner_service: MagicMock,
         mock_asset_service: MagicMock,
         mock_github_service: MagicMock,
+        mock_github_response_cache: MagicMock,
+        mock_sync_run_service: MagicMock,
     ):
         mock_repository = RepositoryInfo(
             basic=BasicRepositoryInfo(
@@ -109,7 +127,7 @@ class TestMain(unittest.TestCase):
             ),
         )
 
-        mock_github_service.return_value.get_repositories.return_value = [
+        mock_github_service.return_value.iter_repositories.return_value = [
             mock_repository
         ]
         mock_owner_service.return_value.find_all.return_value = [
@@ -125,7 +143,9 @@ class TestMain(unittest.TestCase):
         mock_asset = MagicMock()
         mock_owner = MagicMock()
         mock_owner_service.return_value.find_by_name.return_value = [mock_owner]
-        mock_asset_service.return_value.update_asset_by_name.return_value = mock_asset
+        mock_asset_service.return_value.update_assets_by_name.return_value = (
+            AssetUpsertResult(inserted=1, assets={"Test Repository": mock_asset})
+        )
 
         with self.app.app_context():
             main()
@@ -133,11 +153,13 @@ class TestMain(unittest.TestCase):
         mock_owner_service.return_value.find_by_name.assert_has_calls(
             [call("Test Owners")]
         )
-        mock_asset_service.return_value.update_asset_by_name.assert_has_calls(
-            [call(mock_repository.basic.name, mock_repository.to_dict())]
+        mock_asset_service.return_value.update_assets_by_name.assert_called_once_with(
+            {mock_repository.basic.name: mock_repository.to_dict()}, ANY
         )
-        mock_asset_service.return_value.update_relationships_with_owner.assert_has_calls(
-            [call(mock_asset, mock_owner, "ADMIN_ACCESS")]
+        mock_asset_service.return_value.reconcile_relationships.assert_called_once_with(
+            {(mock_asset.id, mock_owner.id): "ADMIN_ACCESS"},
+            [mock_asset.id],
+            sync_run_id=ANY,
         )
 
     def test_when_team_has_any_access_then_default_relationship_created(
@@ -145,6 +167,8 @@ class TestMain(unittest.TestCase):
         mock_owner_service: MagicMock,
         mock_asset_service: MagicMock,
         mock_github_service: MagicMock,
+        mock_github_response_cache: MagicMock,
+        mock_sync_run_service: MagicMock,
     ):
         mock_repository = RepositoryInfo(
             basic=BasicRepositoryInfo(
@@ -162,7 +186,7 @@ class TestMain(unittest.TestCase):
             ),
         )
 
-        mock_github_service.return_value.get_repositories.return_value = [
+        mock_github_service.return_value.iter_repositories.return_value = [
             mock_repository
         ]
         mock_owner_service.return_value.find_all.return_value = [
@@ -178,7 +202,9 @@ class TestMain(unittest.TestCase):
         mock_asset = MagicMock()
         mock_owner = MagicMock()
         mock_owner_service.return_value.find_by_name.return_value = [mock_owner]
-        mock_asset_service.return_value.update_asset_by_name.return_value = mock_asset
+        mock_asset_service.return_value.update_assets_by_name.return_value = (
+            AssetUpsertResult(inserted=1, assets={"Test Repository": mock_asset})
+        )
 
         with self.app.app_context():
             main()
@@ -186,11 +212,13 @@ class TestMain(unittest.TestCase):
         mock_owner_service.return_value.find_by_name.assert_has_calls(
             [call("Test Owners")]
         )
-        mock_asset_service.return_value.update_asset_by_name.assert_has_calls(
-            [call(mock_repository.basic.name, mock_repository.to_dict())]
+        mock_asset_service.return_value.update_assets_by_name.assert_called_once_with(
+            {mock_repository.basic.name: mock_repository.to_dict()}, ANY
         )
-        mock_asset_service.return_value.update_relationships_with_owner.assert_has_calls(
-            [call(mock_asset, mock_owner, "OTHER")]
+        mock_asset_service.return_value.reconcile_relationships.assert_called_once_with(
+            {(mock_asset.id, mock_owner.id): "OTHER"},
+            [mock_asset.id],
+            sync_run_id=ANY,
         )
 
     def test_when_parent_team_has_any_access_then_default_relationship_created(
@@ -198,6 +226,8 @@ class TestMain(unittest.TestCase):
         mock_owner_service: MagicMock,
         mock_asset_service: MagicMock,
         mock_github_service: MagicMock,
+        mock_github_response_cache: MagicMock,
+        mock_sync_run_service: MagicMock,
     ):
         mock_repository = RepositoryInfo(
             basic=BasicRepositoryInfo(
@@ -215,7 +245,7 @@ class TestMain(unittest.TestCase):
             ),
         )
 
-        mock_github_service.return_value.get_repositories.return_value = [
+        mock_github_service.return_value.iter_repositories.return_value = [
             mock_repository
         ]
         mock_owner_service.return_value.find_all.return_value = [
@@ -231,7 +261,9 @@ class TestMain(unittest.TestCase):
         mock_asset = MagicMock()
         mock_owner = MagicMock()
         mock_owner_service.return_value.find_by_name.return_value = [mock_owner]
-        mock_asset_service.return_value.update_asset_by_name.return_value = mock_asset
+        mock_asset_service.return_value.update_assets_by_name.return_value = (
+            AssetUpsertResult(inserted=1, assets={"Test Repository": mock_asset})
+        )
 
         with self.app.app_context():
             main()
@@ -239,11 +271,13 @@ class TestMain(unittest.TestCase):
         mock_owner_service.return_value.find_by_name.assert_has_calls(
             [call("Test Owners")]
         )
-        mock_asset_service.return_value.update_asset_by_name.assert_has_calls(
-            [call(mock_repository.basic.name, mock_repository.to_dict())]
+        mock_asset_service.return_value.update_assets_by_name.assert_called_once_with(
+            {mock_repository.basic.name: mock_repository.to_dict()}, ANY
         )
-        mock_asset_service.return_value.update_relationships_with_owner.assert_has_calls(
-            [call(mock_asset, mock_owner, "OTHER")]
+        mock_asset_service.return_value.reconcile_relationships.assert_called_once_with(
+            {(mock_asset.id, mock_owner.id): "OTHER"},
+            [mock_asset.id],
+            sync_run_id=ANY,
         )
 
     def test_when_prefix_matches_repository_name_then_default_relationship_created(
@@ -251,6 +285,8 @@ class TestMain(unittest.TestCase):
         mock_owner_service: MagicMock,
         mock_asset_service: MagicMock,
         mock_github_service: MagicMock,
+        mock_github_response_cache: MagicMock,
+        mock_sync_run_service: MagicMock,
     ):
         mock_repository = RepositoryInfo(
             basic=BasicRepositoryInfo(
@@ -268,7 +304,7 @@ class TestMain(unittest.TestCase):
             ),
         )
 
-        mock_github_service.return_value.get_repositories.return_value = [
+        mock_github_service.return_value.iter_repositories.return_value = [
             mock_repository
         ]
         mock_owner_service.return_value.find_all.return_value = [
@@ -284,7 +320,11 @@ class TestMain(unittest.TestCase):
         mock_asset = MagicMock()
         mock_owner = MagicMock()
         mock_owner_service.return_value.find_by_name.return_value = [mock_owner]
-        mock_asset_service.return_value.update_asset_by_name.return_value = mock_asset
+        mock_asset_service.return_value.update_assets_by_name.return_value = (
+            AssetUpsertResult(
+                inserted=1, assets={mock_repository.basic.name: mock_asset}
+            )
+        )
 
         with self.app.app_context():
             main()
@@ -292,11 +332,13 @@ class TestMain(unittest.TestCase):
         mock_owner_service.return_value.find_by_name.assert_has_calls(
             [call("Test Owners")]
         )
-        mock_asset_service.return_value.update_asset_by_name.assert_has_calls(
-            [call(mock_repository.basic.name, mock_repository.to_dict())]
+        mock_asset_service.return_value.update_assets_by_name.assert_called_once_with(
+            {mock_repository.basic.name: mock_repository.to_dict()}, ANY
         )
-        mock_asset_service.return_value.update_relationships_with_owner.assert_has_calls(
-            [call(mock_asset, mock_owner, "OTHER")]
+        mock_asset_service.return_value.reconcile_relationships.assert_called_once_with(
+            {(mock_asset.id, mock_owner.id): "OTHER"},
+            [mock_asset.id],
+            sync_run_id=ANY,
         )
 
     def test_when_no_matches_then_no_relationships_created(
@@ -304,6 +346,8 @@ class TestMain(unittest.TestCase):
         mock_owner_service: MagicMock,
         mock_asset_service: MagicMock,
         mock_github_service: MagicMock,
+        mock_github_response_cache: MagicMock,
+        mock_sync_run_service: MagicMock,
     ):
         mock_repository = RepositoryInfo(
             basic=BasicRepositoryInfo(
@@ -321,7 +365,7 @@ class TestMain(unittest.TestCase):
             ),
         )
 
-        mock_github_service.return_value.get_repositories.return_value = [
+        mock_github_service.return_value.iter_repositories.return_value = [
             mock_repository
         ]
         mock_owner_service.return_value.find_all.return_value = [
@@ -337,7 +381,11 @@ class TestMain(unittest.TestCase):
         mock_asset = MagicMock()
         mock_owner = MagicMock()
         mock_owner_service.return_value.find_by_name.return_value = [mock_owner]
-        mock_asset_service.return_value.update_asset_by_name.return_value = mock_asset
+        mock_asset_service.return_value.update_assets_by_name.return_value = (
+            AssetUpsertResult(
+                inserted=1, assets={mock_repository.basic.name: mock_asset}
+            )
+        )
 
         with self.app.app_context():
             main()
@@ -345,11 +393,118 @@ class TestMain(unittest.TestCase):
         mock_owner_service.return_value.find_by_name.assert_has_calls(
             [call("Test Owners")]
         )
-        mock_asset_service.return_value.update_asset_by_name.assert_has_calls(
-            [call(mock_repository.basic.name, mock_repository.to_dict())]
+        mock_asset_service.return_value.update_assets_by_name.assert_called_once_with(
+            {mock_repository.basic.name: mock_repository.to_dict()}, ANY
+        )
+        mock_asset_service.return_value.reconcile_relationships.assert_called_once_with(
+            {},
+            [mock_asset.id],
+            sync_run_id=ANY,
+        )
+
+    def test_when_full_sync_not_due_then_only_changed_repositories_are_enriched(
+        self,
+        mock_owner_service: MagicMock,
+        mock_asset_service: MagicMock,
+        mock_github_service: MagicMock,
+        mock_github_response_cache: MagicMock,
+        mock_sync_run_service: MagicMock,
+    ):
+        watermark = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        known_repositories = {"Test Repository": MagicMock()}
+        mock_sync_run_service.return_value.is_full_sync_due.return_value = False
+        mock_sync_run_service.return_value.get_watermark.return_value = watermark
+        mock_sync_run_service.return_value.get_checkpointed_repositories.return_value = {}
+        mock_sync_run_service.return_value.resume_or_start_sync_run.return_value.is_full_sync = False
+        mock_asset_service.return_value.get_all_repository_data.return_value = (
+            known_repositories
+        )
+        mock_github_service.return_value.iter_repositories.return_value = []
+        mock_owner_service.return_value.find_all.return_value = [MagicMock()]
+
+        with self.app.app_context():
+            main()
+
+        _, kwargs = mock_github_service.return_value.iter_repositories.call_args
+        self.assertEqual(kwargs["known_repositories"], known_repositories)
+        self.assertEqual(kwargs["changed_since"], watermark)
+        mock_sync_run_service.return_value.resume_or_start_sync_run.assert_called_once_with(
+            is_full_sync=False, resume_window_hours=12
+        )
+        mock_sync_run_service.return_value.complete_sync_run.assert_called_once()
+
+    def test_when_sync_run_is_resumed_then_checkpointed_repositories_are_skipped(
+        self,
+        mock_owner_service: MagicMock,
+        mock_asset_service: MagicMock,
+        mock_github_service: MagicMock,
+        mock_github_response_cache: MagicMock,
+        mock_sync_run_service: MagicMock,
+    ):
+        checkpointed_repository = MagicMock()
+        checkpointed_repository.basic.name = "Checkpointed Repository"
+        new_repository = MagicMock()
+        new_repository.basic.name = "New Repository"
+        checkpointed_repositories = {"Checkpointed Repository": checkpointed_repository}
+        sync_run = mock_sync_run_service.return_value.resume_or_start_sync_run.return_value
+        sync_run.is_full_sync = True
+        mock_sync_run_service.return_value.get_checkpointed_repositories.return_value = (
+            checkpointed_repositories
         )
-        mock_asset_service.return_value.update_relationships_with_owner.assert_not_called()
+        mock_github_service.return_value.iter_repositories.return_value = iter(
+            [checkpointed_repository, new_repository]
+        )
+        mock_asset_service.return_value.update_assets_by_name.return_value = (
+            AssetUpsertResult(
+                updated=2,
+                assets={
+                    "Checkpointed Repository": MagicMock(),
+                    "New Repository": MagicMock(),
+                },
+            )
+        )
+        mock_owner_service.return_value.find_all.return_value = [MagicMock()]
+
+        with self.app.app_context():
+            main()
 
+        _, kwargs = mock_github_service.return_value.iter_repositories.call_args
+        self.assertEqual(kwargs["completed_repositories"], checkpointed_repositories)
+        self.assertIsNone(kwargs["changed_since"])
+        # Every repository in the batch is written at once
+        self.assertEqual(
+            mock_asset_service.return_value.update_assets_by_name.call_count, 1
+        )
+        mock_sync_run_service.return_value.checkpoint.assert_called_once_with(
+            sync_run, [new_repository]
+        )
+
+    def test_when_other_shards_are_still_running_then_stale_data_is_kept(
+        self,
+        mock_owner_service: MagicMock,
+        mock_asset_service: MagicMock,
+        mock_github_service: MagicMock,
+        mock_github_response_cache: MagicMock,
+        mock_sync_run_service: MagicMock,
+    ):
+        shard = RepositoryShard(1, 3)
+        sync_run = mock_sync_run_service.return_value.join_or_start_sync_run.return_value
+        mock_sync_run_service.return_value.complete_shard.return_value = False
+        mock_sync_run_service.return_value.get_checkpointed_repositories.return_value = {}
+        mock_github_service.return_value.iter_repositories.return_value = []
+        mock_owner_service.return_value.find_all.return_value = [MagicMock()]
+
+        with self.app.app_context():
+            main(shard=shard, sync_run_key="map-github-repositories-to-owners-1")
+
+        _, kwargs = mock_github_service.return_value.iter_repositories.call_args
+        self.assertEqual(kwargs["shard"], shard)
+        mock_sync_run_service.return_value.resume_or_start_sync_run.assert_not_called()
+        mock_sync_run_service.return_value.complete_shard.assert_called_once_with(
+            sync_run, 1
+        )
+        mock_asset_service.return_value.remove_stale_assets.assert_not_called()
+        mock_sync_run_service.return_value.complete_sync_run.assert_not_called()
 
 if __name__ == "__main__":
     unittest.main()
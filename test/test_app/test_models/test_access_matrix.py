@@ -0,0 +1,58 @@
+import unittest
+
+from app.projects.repository_standards.models.access_matrix import (
+    AccessMatrix,
+    normalise_permission,
+)
+from app.projects.repository_standards.models.team_graph import TeamGraph
+
+
+class TestAccessMatrix(unittest.TestCase):
+    def test_normalises_rest_and_graphql_permissions_to_role_names(self):
+        self.assertEqual(normalise_permission("push"), "write")
+        self.assertEqual(normalise_permission("ADMIN"), "admin")
+        self.assertEqual(normalise_permission(None, {"pull": True}), "read")
+        self.assertEqual(
+            normalise_permission(None, {"admin": True, "pull": True}), "admin"
+        )
+        self.assertIsNone(normalise_permission(None, {}))
+
+    def test_custom_roles_take_the_role_they_extend(self):
+        admin_permissions = {
+            "admin": True,
+            "maintain": True,
+            "push": True,
+            "triage": True,
+            "pull": True,
+        }
+
+        # Listed by team, with the custom role name
+        self.assertEqual(
+            normalise_permission("security-manager", admin_permissions), "admin"
+        )
+        # Listed by repository, with the base permission
+        self.assertEqual(normalise_permission("admin", admin_permissions), "admin")
+        self.assertIsNone(normalise_permission("security-manager"))
+
+    def test_inverts_team_permissions_into_repository_access(self):
+        access_matrix = AccessMatrix(
+            TeamGraph({"admins": "business-unit", "readers": None, "ignored": None}),
+            teams_to_ignore=["ignored"],
+        )
+        access_matrix.add("repository", "admins", "admin")
+        access_matrix.add("repository", "readers", "read")
+        access_matrix.add("repository", "ignored", "admin")
+
+        access = access_matrix.get_repository_access("repository")
+
+        self.assertEqual(access.teams_with_admin, ["admins"])
+        self.assertEqual(access.teams_with_admin_parents, ["business-unit"])
+        self.assertEqual(access.teams, ["admins", "readers"])
+        self.assertEqual(access.teams_parents, ["business-unit"])
+        self.assertEqual(
+            access_matrix.get_repository_access("unknown").teams_with_admin, []
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
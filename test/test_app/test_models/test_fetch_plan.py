@@ -0,0 +1,132 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from app.projects.repository_standards.config import repository_compliance_config
+from app.projects.repository_standards.config.repository_compliance_config import (
+    COMPLIANCE_CHECK_FIELDS,
+    get_compliance_check_fields,
+)
+from app.projects.repository_standards.models.fetch_plan import FetchPlan
+from app.projects.repository_standards.models.repository_info import (
+    BasicRepositoryInfo,
+    RepositoryAccess,
+    RepositoryInfo,
+)
+from app.projects.repository_standards.repositories.asset_repository import (
+    RepositoryView,
+)
+
+NOW = datetime(2026, 1, 8, tzinfo=timezone.utc)
+
+
+class RecordingSection:
+    def __init__(self, name: str, reads: set, value):
+        self.__name = name
+        self.__reads = reads
+        self.__value = value
+
+    def __getattr__(self, attribute: str):
+        self.__reads.add(f"{self.__name}.{attribute}")
+        return self.__value
+
+
+class RecordingRepositoryInfo:
+    def __init__(self, value):
+        self.reads = set()
+        self.__value = value
+
+    def __getattr__(self, section: str):
+        return RecordingSection(section, self.reads, self.__value)
+
+
+def known_repository(fetched_at: dict) -> RepositoryInfo:
+    return RepositoryInfo.from_dict(
+        {
+            "basic": {
+                "name": "repository-a",
+                "visibility": "public",
+                "delete_branch_on_merge": True,
+                "default_branch_name": "main",
+            },
+            "access": {
+                "teams_with_admin": [],
+                "teams_with_admin_parents": [],
+                "teams": [],
+                "teams_parents": [],
+            },
+            "security_and_analysis": {},
+            "default_branch_protection": {"enforce_admins": True},
+            "default_branch_ruleset": {},
+            "fetched_at": fetched_at,
+        }
+    )
+
+
+class TestFetchPlan(unittest.TestCase):
+    def test_groups_are_derived_from_the_fields_the_checks_read(self):
+        fetch_plan = FetchPlan.from_fields(get_compliance_check_fields())
+
+        # No check reads `delete_branch_on_merge`, so it is never fetched
+        self.assertEqual(
+            fetch_plan.groups, frozenset(["branch_protection", "branch_rules"])
+        )
+
+    def test_every_check_reads_only_the_fields_it_declares(self):
+        for check_name, declared_fields in COMPLIANCE_CHECK_FIELDS.items():
+            check = getattr(repository_compliance_config, check_name)
+            # Falsy and truthy values take both sides of each condition
+            for value in [0, 1]:
+                data = RecordingRepositoryInfo(value)
+                check(RepositoryView(1, "repository-a", [], [], [], [], [], [], data))
+                self.assertLessEqual(data.reads, set(declared_fields), check_name)
+
+    def test_a_fresh_group_is_not_fetched_again(self):
+        fetch_plan = FetchPlan(
+            ttls={
+                "repository_settings": timedelta(days=7),
+                "branch_protection": timedelta(hours=1),
+            }
+        )
+        known = known_repository(
+            {
+                "repository_settings": "2026-01-02T00:00:00+00:00",
+                "branch_protection": "2026-01-02T00:00:00+00:00",
+            }
+        )
+
+        self.assertEqual(
+            fetch_plan.get_groups_to_fetch(known, NOW),
+            {"branch_protection", "branch_rules"},
+        )
+        self.assertEqual(
+            fetch_plan.get_groups_to_fetch(None, NOW), set(fetch_plan.groups)
+        )
+
+    def test_fields_not_fetched_are_carried_forward(self):
+        fetch_plan = FetchPlan(
+            frozenset(["branch_protection"]),
+            {"branch_protection": timedelta(hours=1)},
+        )
+        known = known_repository({"branch_protection": "2026-01-07T23:30:00+00:00"})
+        fetched = RepositoryInfo(
+            BasicRepositoryInfo("repository-a", "public", None, "main"),
+            RepositoryAccess([], [], [], []),
+        )
+
+        repository, reused = fetch_plan.apply(fetched, known, set(), NOW)
+
+        self.assertTrue(repository.basic.delete_branch_on_merge)
+        self.assertTrue(repository.default_branch_protection.enforce_admins)
+        self.assertEqual(
+            repository.fetched_at, {"branch_protection": "2026-01-07T23:30:00+00:00"}
+        )
+        self.assertIn("default_branch_protection", reused)
+
+        repository, _ = fetch_plan.apply(fetched, known, {"branch_protection"}, NOW)
+
+        self.assertIsNone(repository.default_branch_protection.enforce_admins)
+        self.assertEqual(repository.fetched_at["branch_protection"], NOW.isoformat())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+
+from app.projects.repository_standards.models.repository_info import (
+    BranchProtectionInfo,
+    RepositoryInfoFactory,
+)
+
+
+def build_graphql_repository(**overrides) -> dict:
+    repository = {
+        "name": "test-repository",
+        "visibility": "PUBLIC",
+        "description": "Test Description",
+        "isArchived": False,
+        "isFork": False,
+        "deleteBranchOnMerge": True,
+        "licenseInfo": {"key": "mit"},
+        "defaultBranchRef": {"name": "main", "branchProtectionRule": None},
+        "rulesets": {"nodes": []},
+    }
+    repository.update(overrides)
+    return repository
+
+
+def build_ruleset(enforcement="ACTIVE", include=None, bypass_actors=0) -> dict:
+    return {
+        "databaseId": 1,
+        "enforcement": enforcement,
+        "target": "BRANCH",
+        "conditions": {
+            "refName": {"include": include or ["~DEFAULT_BRANCH"], "exclude": []}
+        },
+        "bypassActors": {"totalCount": bypass_actors},
+        "rules": {
+            "nodes": [
+                {
+                    "type": "PULL_REQUEST",
+                    "parameters": {
+                        "requiredApprovingReviewCount": 1,
+                        "dismissStaleReviewsOnPush": True,
+                        "requireCodeOwnerReview": False,
+                    },
+                },
+                {"type": "REQUIRED_SIGNATURES", "parameters": None},
+            ]
+        },
+    }
+
+
+class TestRepositoryInfoFactoryFromGraphqlRepo(unittest.TestCase):
+    def test_maps_basic_and_security_fields(self):
+        repository = RepositoryInfoFactory.from_graphql_repo(
+            build_graphql_repository(),
+            {"secret_scanning": {"status": "enabled"}},
+            ["admin-team"],
+            ["parent-team"],
+            ["admin-team"],
+            ["parent-team"],
+        )
+
+        self.assertEqual(repository.basic.visibility, "public")
+        self.assertEqual(repository.basic.license, "mit")
+        self.assertEqual(repository.basic.default_branch_name, "main")
+        self.assertEqual(
+            repository.security_and_analysis.secret_scanning_status, "enabled"
+        )
+        self.assertIsNone(repository.security_and_analysis.push_protection_status)
+        self.assertEqual(repository.access.teams_with_admin_parents, ["parent-team"])
+        self.assertEqual(repository.default_branch_protection, BranchProtectionInfo())
+        self.assertFalse(repository.default_branch_ruleset.enabled)
+
+    def test_maps_active_rulesets_targeting_the_default_branch(self):
+        repository = RepositoryInfoFactory.from_graphql_repo(
+            build_graphql_repository(
+                rulesets={"nodes": [build_ruleset(bypass_actors=2)]}
+            ),
+            None,
+            [],
+            [],
+            [],
+            [],
+        )
+
+        ruleset = repository.default_branch_ruleset
+        self.assertTrue(ruleset.enabled)
+        self.assertEqual(ruleset.pull_request_enforcement, "active")
+        self.assertEqual(ruleset.pull_request_bypass_actors_length, 2)
+        self.assertEqual(ruleset.pull_request_required_approving_review_count, 1)
+        self.assertEqual(ruleset.required_signatures_enforcement, "active")
+
+    def test_ignores_rulesets_that_are_not_active_or_do_not_target_the_default_branch(
+        self,
+    ):
+        repository = RepositoryInfoFactory.from_graphql_repo(
+            build_graphql_repository(
+                rulesets={
+                    "nodes": [
+                        build_ruleset(enforcement="EVALUATE"),
+                        build_ruleset(include=["refs/heads/release/*"]),
+                    ]
+                }
+            ),
+            None,
+            [],
+            [],
+            [],
+            [],
+        )
+
+        self.assertFalse(repository.default_branch_ruleset.enabled)
+        self.assertIsNone(repository.default_branch_ruleset.pull_request_enforcement)
+
+
+if __name__ == "__main__":
+    unittest.main()
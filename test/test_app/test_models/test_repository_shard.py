@@ -0,0 +1,28 @@
+import unittest
+
+from app.projects.repository_standards.models.repository_shard import RepositoryShard
+
+
+class TestRepositoryShard(unittest.TestCase):
+    def test_every_repository_belongs_to_exactly_one_shard(self):
+        shards = [RepositoryShard(index, 4) for index in range(4)]
+        repository_names = [f"repository-{number}" for number in range(200)]
+
+        for repository_name in repository_names:
+            self.assertEqual(
+                sum(shard.contains(repository_name) for shard in shards), 1
+            )
+        # Roughly even, so no one pod is left with most of the crawl
+        for shard in shards:
+            self.assertGreater(
+                len([name for name in repository_names if shard.contains(name)]), 25
+            )
+
+    def test_single_shard_contains_everything(self):
+        self.assertTrue(RepositoryShard().contains("repository"))
+
+    def test_invalid_shards_are_rejected(self):
+        with self.assertRaises(ValueError):
+            RepositoryShard(2, 2)
+        with self.assertRaises(ValueError):
+            RepositoryShard(0, 0)
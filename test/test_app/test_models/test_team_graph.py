@@ -0,0 +1,29 @@
+import unittest
+
+from app.projects.repository_standards.models.team_graph import TeamGraph
+
+
+class TestTeamGraph(unittest.TestCase):
+    def test_resolves_every_ancestor_from_the_preloaded_teams(self):
+        team_graph = TeamGraph.from_github_teams(
+            [
+                {"slug": "organisation", "parent": None},
+                {"slug": "business-unit", "parent": {"slug": "organisation"}},
+                {"slug": "team", "parent": {"slug": "business-unit"}},
+            ]
+        )
+
+        self.assertEqual(
+            team_graph.get_ancestors("team"), ["business-unit", "organisation"]
+        )
+        self.assertEqual(team_graph.get_ancestors("organisation"), [])
+        self.assertEqual(team_graph.get_ancestors("unknown-team"), [])
+
+    def test_stops_walking_when_the_hierarchy_contains_a_cycle(self):
+        team_graph = TeamGraph({"a": "b", "b": "a"})
+
+        self.assertEqual(team_graph.get_ancestors("a"), ["b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import hashlib
+import hmac
+import unittest
+from unittest.mock import patch
+from urllib.parse import urlencode
+
+from flask import Flask
+
+from app.projects.repository_standards.routes.webhooks import (
+    repository_standards_webhooks,
+)
+
+MODULE = "app.projects.repository_standards.routes.webhooks"
+PAYLOAD = '{"repository": {"name": "repository-a"}}'
+
+
+def signed_headers(body: bytes, content_type: str) -> dict:
+    signature = hmac.new(b"secret", body, hashlib.sha256).hexdigest()
+    return {
+        "Content-Type": content_type,
+        "X-Hub-Signature-256": f"sha256={signature}",
+        "X-GitHub-Delivery": "delivery-1",
+        "X-GitHub-Event": "repository",
+    }
+
+
+@patch(f"{MODULE}.app_config")
+@patch(f"{MODULE}.get_webhook_service")
+class TestGithubWebhook(unittest.TestCase):
+    def setUp(self):
+        app = Flask(__name__)
+        app.register_blueprint(repository_standards_webhooks, url_prefix="/webhooks")
+        self.client = app.test_client()
+
+    def post(self, body: bytes, content_type: str):
+        return self.client.post(
+            "/webhooks/github", data=body, headers=signed_headers(body, content_type)
+        )
+
+    def test_json_payloads_are_handled(self, mock_get_webhook_service, mock_app_config):
+        mock_app_config.github.webhook_secret = "secret"
+        mock_get_webhook_service.return_value.handle.return_value = "queued"
+
+        response = self.post(PAYLOAD.encode(), "application/json")
+
+        self.assertEqual(response.status_code, 200)
+        mock_get_webhook_service.return_value.handle.assert_called_once_with(
+            "delivery-1", "repository", {"repository": {"name": "repository-a"}}
+        )
+
+    def test_form_encoded_payloads_are_handled(
+        self, mock_get_webhook_service, mock_app_config
+    ):
+        mock_app_config.github.webhook_secret = "secret"
+        mock_get_webhook_service.return_value.handle.return_value = "queued"
+
+        response = self.post(
+            urlencode({"payload": PAYLOAD}).encode(),
+            "application/x-www-form-urlencoded",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        mock_get_webhook_service.return_value.handle.assert_called_once_with(
+            "delivery-1", "repository", {"repository": {"name": "repository-a"}}
+        )
+
+    def test_payloads_that_are_not_json_are_rejected(
+        self, mock_get_webhook_service, mock_app_config
+    ):
+        mock_app_config.github.webhook_secret = "secret"
+
+        response = self.post(b"not json", "text/plain")
+
+        self.assertEqual(response.status_code, 400)
+        mock_get_webhook_service.return_value.handle.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
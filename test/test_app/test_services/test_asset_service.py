@@ -0,0 +1,440 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from flask import Flask
+from sqlalchemy import event
+
+from app.projects.repository_standards.db_models import (
+    Asset,
+    Owner,
+    OwnerTypes,
+    Relationship,
+    SyncRun,
+    db,
+)
+from app.projects.repository_standards.repositories.asset_repository import (
+    AssetRepository,
+)
+from app.projects.repository_standards.models.owner import OwnerConfig
+from app.projects.repository_standards.repositories.owner_repository import OwnerView
+from app.projects.repository_standards.services.asset_service import AssetService
+from app.projects.repository_standards.services.relationships_service import (
+    RelationshipsService,
+)
+
+
+class TestUpdateAssetsByName(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+        self.app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.asset_service = AssetService(AssetRepository(db.session))
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_assets_are_inserted_updated_or_left_unchanged(self):
+        self.asset_service.update_assets_by_name(
+            {"repository-a": {"version": 1}, "repository-b": {"version": 1}}
+        )
+
+        result = self.asset_service.update_assets_by_name(
+            {
+                "repository-a": {"version": 1},
+                "repository-b": {"version": 2},
+                "repository-c": {"version": 1},
+            }
+        )
+
+        self.assertEqual((result.inserted, result.updated, result.unchanged), (1, 1, 1))
+        self.assertEqual(
+            {name: asset.data for name, asset in result.assets.items()},
+            {
+                "repository-a": {"version": 1},
+                "repository-b": {"version": 2},
+                "repository-c": {"version": 1},
+            },
+        )
+        self.assertEqual(db.session.query(Asset).count(), 3)
+
+    def test_unchanged_assets_are_still_marked_as_updated(self):
+        first = self.asset_service.update_assets_by_name({"repository-a": {}})
+        last_updated = first.assets["repository-a"].last_updated
+
+        second = self.asset_service.update_assets_by_name({"repository-a": {}})
+
+        self.assertEqual(second.unchanged, 1)
+        self.assertEqual(
+            second.assets["repository-a"].id, first.assets["repository-a"].id
+        )
+        self.assertGreater(second.assets["repository-a"].last_updated, last_updated)
+
+
+
+class TestReconcileRelationships(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+        self.app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.asset_service = AssetService(AssetRepository(db.session))
+        self.assets = self.asset_service.update_assets_by_name(
+            {"repository-a": {}, "repository-b": {}, "repository-c": {}}
+        ).assets
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def relate(self, asset_name: str, owner_id: int, type: str) -> None:
+        db.session.add(
+            Relationship(
+                assets_id=self.assets[asset_name].id, owners_id=owner_id, type=type
+            )
+        )
+        db.session.commit()
+
+    def relationships(self) -> set:
+        return {
+            (assets_id, owners_id, type)
+            for assets_id, owners_id, type in db.session.query(
+                Relationship.assets_id, Relationship.owners_id, Relationship.type
+            )
+        }
+
+    def test_only_the_differences_are_written(self):
+        a, b, c = (self.assets[name].id for name in sorted(self.assets))
+        self.relate("repository-a", 1, "OTHER")
+        self.relate("repository-a", 2, "OTHER")
+        self.relate("repository-b", 1, "OTHER")
+        self.relate("repository-c", 1, "OTHER")
+        statements = []
+        event.listen(
+            db.engine,
+            "before_cursor_execute",
+            lambda *args: statements.append(args[2]),
+        )
+
+        changes = self.asset_service.reconcile_relationships(
+            {(a, 1): "OTHER", (a, 2): "ADMIN_ACCESS", (b, 2): "ADMIN_ACCESS"},
+            asset_ids=[a, b],
+        )
+
+        self.assertEqual(
+            (changes.inserted, changes.updated, changes.deleted, changes.unchanged),
+            (1, 1, 1, 1),
+        )
+        # A select, an insert, an update and a delete
+        self.assertEqual(len(statements), 4)
+        self.assertEqual(
+            self.relationships(),
+            {
+                (a, 1, "OTHER"),
+                (a, 2, "ADMIN_ACCESS"),
+                (b, 2, "ADMIN_ACCESS"),
+                # Outside of the assets reconciled
+                (c, 1, "OTHER"),
+            },
+        )
+
+
+
+class TestRemoveStale(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+        self.app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.asset_service = AssetService(AssetRepository(db.session))
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def start_sync_run(self, started_at: datetime) -> SyncRun:
+        sync_run = SyncRun(started_at=started_at)
+        db.session.add(sync_run)
+        db.session.commit()
+        return sync_run
+
+    def test_whatever_the_run_did_not_see_is_removed(self):
+        # Long enough ago that an age cutoff would not tell the runs apart
+        started_at = datetime.now(timezone.utc) - timedelta(days=3)
+        first_run = self.start_sync_run(started_at)
+        assets = self.asset_service.update_assets_by_name(
+            {"repository-a": {}, "repository-b": {}}, first_run.id
+        ).assets
+        a, b = assets["repository-a"].id, assets["repository-b"].id
+        self.asset_service.reconcile_relationships(
+            {(a, 1): "OTHER", (a, 2): "OTHER", (b, 1): "OTHER"},
+            sync_run_id=first_run.id,
+        )
+
+        second_run = self.start_sync_run(started_at + timedelta(minutes=1))
+        self.asset_service.update_assets_by_name({"repository-a": {}}, second_run.id)
+        self.asset_service.reconcile_relationships(
+            {(a, 1): "OTHER"}, asset_ids=[a], sync_run_id=second_run.id
+        )
+        # Written by a webhook while the run was going
+        self.asset_service.update_asset_by_name("repository-c", {})
+
+        self.assertEqual(self.asset_service.remove_stale_assets(second_run), 1)
+        self.assertEqual(self.asset_service.remove_stale_relationships(second_run), 0)
+
+        self.assertEqual(
+            sorted(name for (name,) in db.session.query(Asset.name)),
+            ["repository-a", "repository-c"],
+        )
+        self.assertEqual(
+            db.session.query(Relationship.assets_id, Relationship.owners_id).all(),
+            [(a, 1)],
+        )
+
+    def test_relationships_the_run_did_not_see_are_removed(self):
+        first_run = self.start_sync_run(datetime.now(timezone.utc))
+        asset = self.asset_service.update_assets_by_name(
+            {"repository-a": {}}, first_run.id
+        ).assets["repository-a"]
+        self.asset_service.reconcile_relationships(
+            {(asset.id, 1): "OTHER", (asset.id, 2): "OTHER"},
+            sync_run_id=first_run.id,
+        )
+
+        second_run = self.start_sync_run(datetime.now(timezone.utc))
+        # Only owner 1 is reconciled, say as owner 2 was skipped
+        self.asset_service.reconcile_relationships(
+            {(asset.id, 1): "OTHER"}, owner_ids=[1], sync_run_id=second_run.id
+        )
+
+        self.assertEqual(self.asset_service.remove_stale_relationships(second_run), 1)
+        self.assertEqual(db.session.query(Relationship.owners_id).all(), [(1,)])
+
+
+
+class TestGetAllRepositories(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+        self.app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.asset_service = AssetService(AssetRepository(db.session))
+        db.session.add_all(
+            [
+                OwnerTypes(id=1, name="BUSINESS_UNIT"),
+                OwnerTypes(id=2, name="TEAM"),
+                Owner(id=1, name="HMPPS", type_id=1, config={}),
+                Owner(id=2, name="Team A", type_id=2, config={}),
+            ]
+        )
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_repositories(self, count: int) -> None:
+        assets = self.asset_service.update_assets_by_name(
+            {
+                f"repository-{index}": {
+                    "basic": {
+                        "name": f"repository-{index}",
+                        "visibility": "public",
+                        "delete_branch_on_merge": False,
+                        "default_branch_name": "main",
+                    },
+                    "access": {
+                        "teams_with_admin": [],
+                        "teams_with_admin_parents": [],
+                        "teams": [],
+                        "teams_parents": [],
+                    },
+                }
+                for index in range(count)
+            }
+        ).assets
+        self.asset_service.reconcile_relationships(
+            {
+                (asset.id, owner_id): type
+                for asset in assets.values()
+                for owner_id, type in [(1, "OTHER"), (2, "ADMIN_ACCESS")]
+            }
+        )
+
+    def get_all_repositories(self) -> tuple[list, int]:
+        """The repositories and how many queries it took to get them."""
+        statements = []
+
+        def record(*args):
+            statements.append(args[2])
+
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            repositories = self.asset_service.get_all_repositories()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+        return repositories, len(statements)
+
+    def test_owners_are_grouped_by_relationship_and_owner_type(self):
+        self.add_repositories(1)
+
+        [repository], _ = self.get_all_repositories()
+
+        self.assertEqual(repository.name, "repository-0")
+        self.assertEqual(repository.owner_names, ["HMPPS", "Team A"])
+        self.assertEqual(repository.admin_owner_names, ["Team A"])
+        self.assertEqual(repository.business_unit_owners_names, ["HMPPS"])
+        self.assertEqual(repository.business_unit_admin_owners_names, [])
+        self.assertEqual(repository.team_owners_names, ["Team A"])
+        self.assertEqual(repository.team_admin_owners_names, ["Team A"])
+
+    def test_the_number_of_queries_does_not_grow_with_the_estate(self):
+        self.add_repositories(3)
+        _, queries_for_a_few = self.get_all_repositories()
+        self.add_repositories(50)
+        repositories, queries_for_many = self.get_all_repositories()
+
+        self.assertEqual(len(repositories), 50)
+        self.assertEqual(queries_for_a_few, 2)
+        self.assertEqual(queries_for_many, queries_for_a_few)
+
+
+
+def repository_data(
+    name: str,
+    teams_with_admin: list = [],
+    teams: list = [],
+    teams_parents: list = [],
+    secret_scanning_status: str | None = None,
+) -> dict:
+    return {
+        "basic": {
+            "name": name,
+            "visibility": "public",
+            "delete_branch_on_merge": False,
+            "default_branch_name": "main",
+        },
+        "access": {
+            "teams_with_admin": teams_with_admin,
+            "teams_with_admin_parents": [],
+            "teams": teams,
+            "teams_parents": teams_parents,
+        },
+        "security_and_analysis": {"secret_scanning_status": secret_scanning_status},
+    }
+
+
+class TestGetRepositoriesByData(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+        self.app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.asset_service = AssetService(AssetRepository(db.session))
+        self.asset_service.update_assets_by_name(
+            {
+                data["basic"]["name"]: data
+                for data in [
+                    repository_data(
+                        "repository-admin",
+                        teams_with_admin=["team-a"],
+                        teams=["team-a"],
+                        secret_scanning_status="enabled",
+                    ),
+                    repository_data("repository-parent", teams_parents=["team-a"]),
+                    repository_data(
+                        "hmpps-prefixed", teams=["team-b"], secret_scanning_status="disabled"
+                    ),
+                    repository_data("repository-other", teams=["team-b"]),
+                ]
+            }
+        )
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_repositories_are_found_by_team(self):
+        self.assertEqual(
+            [
+                repository.name
+                for repository in self.asset_service.get_repositories_by_admin_teams(
+                    ["team-a", "team-c"]
+                )
+            ],
+            ["repository-admin"],
+        )
+        self.assertEqual(
+            [
+                repository.name
+                for repository in self.asset_service.get_repositories_by_teams(
+                    ["team-a"], name_prefix="hmpps-"
+                )
+            ],
+            ["repository-admin", "repository-parent", "hmpps-prefixed"],
+        )
+        self.assertEqual(self.asset_service.get_repositories_by_teams([]), [])
+
+    def test_repositories_are_found_by_security_setting(self):
+        self.assertEqual(
+            [
+                repository.name
+                for repository in self.asset_service.get_repositories_by_security_and_analysis(
+                    secret_scanning_status="disabled"
+                )
+            ],
+            ["hmpps-prefixed"],
+        )
+
+    def test_owner_mapping_in_sql_matches_the_relationship_rules(self):
+        relationships_service = RelationshipsService(self.asset_service)
+        owner = OwnerView(
+            1, "Team A", "TEAM", OwnerConfig("Team A", ["team-a"], "hmpps-")
+        )
+
+        relationships_service.update_relationship_for_owner(owner)
+
+        relationships = {
+            name: type
+            for name, type in db.session.query(Asset.name, Relationship.type).join(
+                Relationship, Relationship.assets_id == Asset.id
+            )
+        }
+        self.assertEqual(
+            relationships,
+            {
+                repository.name: relationships_service.get_relationship_type(
+                    owner, repository.name, repository.data.access
+                )
+                for repository in self.asset_service.get_all_repositories()
+                if relationships_service.get_relationship_type(
+                    owner, repository.name, repository.data.access
+                )
+            },
+        )
+        self.assertEqual(relationships["repository-admin"], "ADMIN_ACCESS")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+import threading
+import unittest
+from datetime import datetime, timedelta, timezone
+from time import sleep
+from unittest.mock import patch
+
+from app.shared.services.github_app_auth_service import InstallationTokenBroker
+
+MODULE = "app.shared.services.github_app_auth_service"
+
+
+def token_data(token: str, expires_in: timedelta = timedelta(hours=1)) -> dict:
+    return {"token": token, "expires_at": datetime.now(timezone.utc) + expires_in}
+
+
+class TestInstallationTokenBroker(unittest.TestCase):
+    @patch(f"{MODULE}.create_installation_token")
+    def test_concurrent_callers_share_one_token(self, mock_create_installation_token):
+        mock_create_installation_token.return_value = token_data("token-1")
+        broker = InstallationTokenBroker("app-id", "private-key", 1)
+        tokens = []
+
+        threads = [
+            threading.Thread(target=lambda: tokens.append(broker.get_token()))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        broker.close()
+
+        self.assertEqual(tokens, ["token-1"] * 10)
+        mock_create_installation_token.assert_called_once()
+
+    @patch(f"{MODULE}.create_installation_token")
+    def test_token_is_refreshed_in_background_ahead_of_expiry(
+        self, mock_create_installation_token
+    ):
+        mock_create_installation_token.side_effect = [
+            token_data("token-1"),
+            token_data("token-2"),
+        ]
+        broker = InstallationTokenBroker(
+            "app-id",
+            "private-key",
+            1,
+            refresh_ahead=timedelta(hours=1) - timedelta(milliseconds=100),
+        )
+
+        self.assertEqual(broker.get_token(), "token-1")
+        # Asked for again since it was minted, so it is in use
+        self.assertEqual(broker.get_token(), "token-1")
+        sleep(0.5)
+        self.assertEqual(broker.get_token(), "token-2")
+        broker.close()
+        self.assertEqual(broker.mints, 2)
+
+    @patch(f"{MODULE}.create_installation_token")
+    def test_token_unused_since_it_was_minted_is_not_refreshed(
+        self, mock_create_installation_token
+    ):
+        mock_create_installation_token.return_value = token_data("token-1")
+        broker = InstallationTokenBroker(
+            "app-id",
+            "private-key",
+            1,
+            refresh_ahead=timedelta(hours=1) - timedelta(milliseconds=100),
+        )
+
+        broker.get_token()
+        sleep(0.5)
+        broker.close()
+
+        self.assertEqual(broker.mints, 1)
+
+    @patch(f"{MODULE}.create_installation_token")
+    def test_failed_background_refresh_is_tried_again(
+        self, mock_create_installation_token
+    ):
+        mock_create_installation_token.side_effect = [
+            token_data("token-1"),
+            ConnectionError("Connection reset"),
+            token_data("token-2"),
+        ]
+        broker = InstallationTokenBroker(
+            "app-id",
+            "private-key",
+            1,
+            refresh_ahead=timedelta(hours=1) - timedelta(milliseconds=100),
+            refresh_retry_delay=timedelta(milliseconds=100),
+        )
+
+        broker.get_token()
+        broker.get_token()
+        sleep(0.6)
+        broker.close()
+
+        self.assertEqual(mock_create_installation_token.call_count, 3)
+        self.assertEqual(broker.get_token(), "token-2")
+
+    @patch(f"{MODULE}.create_installation_token")
+    def test_callers_are_not_held_up_by_a_background_refresh(
+        self, mock_create_installation_token
+    ):
+        minting = threading.Event()
+        release = threading.Event()
+
+        def create_installation_token(*args):
+            if mock_create_installation_token.call_count == 1:
+                return token_data("token-1")
+            minting.set()
+            release.wait(5)
+            return token_data("token-2")
+
+        mock_create_installation_token.side_effect = create_installation_token
+        broker = InstallationTokenBroker(
+            "app-id",
+            "private-key",
+            1,
+            refresh_ahead=timedelta(hours=1) - timedelta(milliseconds=50),
+        )
+        broker.get_token()
+        broker.get_token()
+        self.assertTrue(minting.wait(5))
+
+        tokens = []
+        caller = threading.Thread(target=lambda: tokens.append(broker.get_token()))
+        caller.start()
+        caller.join(1)
+        release.set()
+        broker.close()
+
+        self.assertEqual(tokens, ["token-1"])
+
+    @patch(f"{MODULE}.create_installation_token")
+    def test_token_about_to_expire_is_refreshed_by_the_caller(
+        self, mock_create_installation_token
+    ):
+        mock_create_installation_token.side_effect = [
+            token_data("token-1", expires_in=timedelta(seconds=30)),
+            token_data("token-2"),
+        ]
+        broker = InstallationTokenBroker(
+            "app-id", "private-key", 1, refresh_ahead=timedelta(0)
+        )
+
+        self.assertEqual(broker.get_token(), "token-1")
+        self.assertEqual(broker.get_token(), "token-2")
+        broker.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
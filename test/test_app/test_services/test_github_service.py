@@ -0,0 +1,270 @@
+import json
+import threading
+import unittest
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.projects.repository_standards.models.fetch_plan import FetchPlan
+from app.projects.repository_standards.services.github_service import GithubService
+
+ORG = "ministryofjustice"
+
+
+def repository(name: str, archived: bool = False) -> dict:
+    return {
+        "name": name,
+        "visibility": "public",
+        "description": f"{name} description",
+        "default_branch": "main",
+        "license": {"key": "mit"},
+        "delete_branch_on_merge": True,
+        "archived": archived,
+        "fork": False,
+        "pushed_at": "2026-01-01T00:00:00Z",
+        "updated_at": "2026-01-01T00:00:00Z",
+        "security_and_analysis": {"secret_scanning": {"status": "enabled"}},
+    }
+
+
+ROUTES = {
+    ("POST", "/app/installations/1/access_tokens"): {
+        "token": "test-token",
+        "expires_at": "2099-01-01T00:00:00Z",
+    },
+    ("GET", f"/orgs/{ORG}/repos"): [
+        repository("repository-a"),
+        repository("repository-archived", archived=True),
+        repository("repository-b"),
+    ],
+    ("GET", f"/orgs/{ORG}/teams"): [{"slug": "team-a", "parent": None}],
+    ("GET", f"/orgs/{ORG}/teams/team-a/repos"): [
+        {"name": "repository-a", "role_name": "admin"},
+        {"name": "repository-b", "role_name": "push"},
+    ],
+    ("GET", f"/orgs/{ORG}/rulesets"): [{"id": 7}],
+    ("GET", f"/orgs/{ORG}/rulesets/7"): {
+        "id": 7,
+        "enforcement": "active",
+        "bypass_actors": [{"actor_id": 1}],
+    },
+    ("GET", f"/repos/{ORG}/repository-a/branches/main/protection"): {
+        "enforce_admins": {"enabled": True},
+        "required_pull_request_reviews": {"required_approving_review_count": 2},
+    },
+    ("GET", f"/repos/{ORG}/repository-a/rules/branches/main"): [
+        {
+            "type": "pull_request",
+            "ruleset_id": 7,
+            "ruleset_source_type": "Organization",
+            "parameters": {"required_approving_review_count": 1},
+        }
+    ],
+    ("GET", f"/repos/{ORG}/repository-b/rules/branches/main"): [],
+    ("GET", f"/repos/{ORG}/repository-a"): repository("repository-a"),
+    ("GET", f"/repos/{ORG}/repository-a/teams"): [
+        {
+            "slug": "team-c",
+            "permission": "admin",
+            "parent": {"slug": "team-b"},
+        }
+    ],
+    ("GET", f"/orgs/{ORG}/teams/team-b"): {
+        "slug": "team-b",
+        "parent": {"slug": "team-a"},
+    },
+    ("GET", f"/orgs/{ORG}/teams/team-a"): {"slug": "team-a", "parent": None},
+    ("GET", f"/repos/{ORG}/repository-a/rulesets/7"): {
+        "id": 7,
+        "enforcement": "active",
+        "bypass_actors": [],
+    },
+}
+
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests = []
+
+    def do_GET(self):
+        self.__respond("GET")
+
+    def do_POST(self):
+        self.__respond("POST")
+
+    def __respond(self, method: str):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        key = (method, urlsplit(self.path).path)
+        self.requests.append(key)
+        status, body = (200, ROUTES[key]) if key in ROUTES else (404, {})
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestGithubServiceAsyncCrawl(unittest.TestCase):
+    def setUp(self):
+        FakeGitHubHandler.requests.clear()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGitHubHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.private_key = private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ).decode()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_async_crawl_enriches_repositories_against_fake_github(self):
+        github_service = GithubService(
+            "client-id",
+            self.private_key,
+            1,
+            ingestion_mode="async",
+            crawl_workers=2,
+            base_url=f"http://127.0.0.1:{self.server.server_port}",
+        )
+
+        repositories = list(github_service.iter_repositories())
+
+        self.assertEqual(
+            [repository.basic.name for repository in repositories],
+            ["repository-a", "repository-b"],
+        )
+        repository_a, repository_b = repositories
+        self.assertEqual(repository_a.basic.license, "mit")
+        self.assertEqual(repository_a.access.teams_with_admin, ["team-a"])
+        self.assertEqual(repository_b.access.teams, ["team-a"])
+        self.assertEqual(
+            repository_a.security_and_analysis.secret_scanning_status, "enabled"
+        )
+        self.assertTrue(repository_a.default_branch_protection.enforce_admins)
+        self.assertEqual(
+            repository_a.default_branch_protection.required_approving_review_count, 2
+        )
+        self.assertEqual(
+            repository_a.default_branch_ruleset.pull_request_enforcement, "active"
+        )
+        self.assertEqual(
+            repository_a.default_branch_ruleset.pull_request_bypass_actors_length, 1
+        )
+        self.assertIsNone(repository_b.default_branch_protection.enabled)
+        self.assertFalse(repository_b.default_branch_ruleset.enabled)
+        # Every enrichment request shared the keep-alive connections of the pool
+        self.assertLessEqual(github_service.async_github_client.connections_opened, 2)
+
+    def test_crawl_only_fetches_planned_groups_that_are_not_fresh(self):
+        for ingestion_mode in ["rest", "async"]:
+            with self.subTest(ingestion_mode=ingestion_mode):
+                FakeGitHubHandler.requests.clear()
+                github_service = GithubService(
+                    "client-id",
+                    self.private_key,
+                    1,
+                    ingestion_mode=ingestion_mode,
+                    base_url=f"http://127.0.0.1:{self.server.server_port}",
+                )
+                known_repository_a = github_service.get_repositories()[0]
+                known_repository_a.fetched_at["branch_protection"] = (
+                    datetime.now(timezone.utc) - timedelta(minutes=5)
+                ).isoformat()
+                FakeGitHubHandler.requests.clear()
+
+                repositories = list(
+                    github_service.iter_repositories(
+                        known_repositories={"repository-a": known_repository_a},
+                        fetch_plan=FetchPlan(
+                            frozenset(["branch_protection", "branch_rules"]),
+                            {"branch_protection": timedelta(hours=1)},
+                        ),
+                    )
+                )
+
+                self.assertEqual(len(repositories), 2)
+                # Reused rather than fetched again
+                self.assertTrue(repositories[0].default_branch_protection.enforce_admins)
+                self.assertNotIn(
+                    ("GET", f"/repos/{ORG}/repository-a/branches/main/protection"),
+                    FakeGitHubHandler.requests,
+                )
+                self.assertIn(
+                    ("GET", f"/repos/{ORG}/repository-b/branches/main/protection"),
+                    FakeGitHubHandler.requests,
+                )
+                self.assertIn(
+                    ("GET", f"/repos/{ORG}/repository-a/rules/branches/main"),
+                    FakeGitHubHandler.requests,
+                )
+                # No check reads `delete_branch_on_merge`
+                self.assertNotIn(("POST", "/graphql"), FakeGitHubHandler.requests)
+
+    def test_unchanged_repositories_still_get_their_current_team_access(self):
+        for ingestion_mode in ["rest", "async"]:
+            with self.subTest(ingestion_mode=ingestion_mode):
+                github_service = GithubService(
+                    "client-id",
+                    self.private_key,
+                    1,
+                    ingestion_mode=ingestion_mode,
+                    base_url=f"http://127.0.0.1:{self.server.server_port}",
+                )
+                known_repositories = {
+                    repository.basic.name: repository
+                    for repository in github_service.get_repositories()
+                }
+                # The team was given access to repository-b after the last run
+                known_repositories["repository-b"].access.teams_with_admin = []
+                known_repositories["repository-b"].access.teams = []
+                FakeGitHubHandler.requests.clear()
+
+                repositories = list(
+                    github_service.iter_repositories(
+                        known_repositories=known_repositories,
+                        changed_since=datetime(2026, 1, 2, tzinfo=timezone.utc),
+                    )
+                )
+
+                self.assertEqual(repositories[1].access.teams, ["team-a"])
+                self.assertTrue(repositories[0].default_branch_protection.enforce_admins)
+                self.assertNotIn(
+                    ("GET", f"/repos/{ORG}/repository-a/branches/main/protection"),
+                    FakeGitHubHandler.requests,
+                )
+
+    def test_single_repository_skips_the_organisation_wide_preloads(self):
+        github_service = GithubService(
+            "client-id",
+            self.private_key,
+            1,
+            base_url=f"http://127.0.0.1:{self.server.server_port}",
+        )
+
+        repository = github_service.get_repository("repository-a")
+
+        self.assertEqual(repository.access.teams_with_admin, ["team-c"])
+        self.assertEqual(
+            repository.access.teams_with_admin_parents, ["team-b", "team-a"]
+        )
+        self.assertTrue(repository.default_branch_protection.enforce_admins)
+        self.assertEqual(
+            repository.default_branch_ruleset.pull_request_enforcement, "active"
+        )
+        self.assertNotIn(("GET", f"/orgs/{ORG}/teams"), FakeGitHubHandler.requests)
+        self.assertNotIn(("GET", f"/orgs/{ORG}/rulesets"), FakeGitHubHandler.requests)
+        self.assertNotIn(("POST", "/graphql"), FakeGitHubHandler.requests)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import socket
+import unittest
+from time import perf_counter
+from unittest.mock import MagicMock
+
+import requests
+
+from app.shared.services.http_transport import (
+    CircuitBreaker,
+    CircuitOpenError,
+    HttpTransport,
+    RetryBudget,
+    RetryPolicy,
+)
+
+
+def response(status_code: int) -> requests.Response:
+    result = requests.Response()
+    result.status_code = status_code
+    result._content = b"{}"
+    return result
+
+
+def transport(*responses, **retry_policy_kwargs) -> HttpTransport:
+    http_transport = HttpTransport(
+        "test",
+        retry_policy=RetryPolicy("test", backoff_seconds=0, **retry_policy_kwargs),
+        observer=MagicMock(),
+    )
+    http_transport.session.request = MagicMock(side_effect=list(responses))
+    return http_transport
+
+
+class TestHttpTransport(unittest.TestCase):
+    def test_idempotent_requests_are_retried(self):
+        http_transport = transport(
+            response(503), requests.ConnectionError("reset"), response(200)
+        )
+
+        result = http_transport.request("GET", "http://upstream/repos")
+
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(http_transport.session.request.call_count, 3)
+        self.assertEqual(
+            [call.args[2] for call in http_transport.observer.call_args_list],
+            [503, None, 200],
+        )
+
+    def test_non_idempotent_requests_are_not_retried(self):
+        http_transport = transport(response(503), response(200))
+
+        self.assertEqual(
+            http_transport.request("POST", "http://upstream/tokens").status_code, 503
+        )
+        self.assertEqual(
+            http_transport.request(
+                "POST", "http://upstream/graphql", idempotent=True
+            ).status_code,
+            200,
+        )
+
+    def test_retries_stop_when_the_budget_runs_out(self):
+        http_transport = transport(
+            *[response(502)] * 4, retry_budget=RetryBudget(ratio=0, capacity=2)
+        )
+
+        result = http_transport.request("GET", "http://upstream/repos")
+        self.assertEqual(result.status_code, 502)
+        self.assertEqual(http_transport.session.request.call_count, 3)
+
+        result = http_transport.request("GET", "http://upstream/repos")
+        self.assertEqual(result.status_code, 502)
+        self.assertEqual(http_transport.session.request.call_count, 4)
+
+    def test_a_hung_upstream_is_given_up_on_at_the_deadline(self):
+        with socket.socket() as listener:
+            listener.bind(("127.0.0.1", 0))
+            listener.listen()
+            started_at = perf_counter()
+            with self.assertRaises(requests.Timeout):
+                HttpTransport("test").request(
+                    "GET",
+                    f"http://127.0.0.1:{listener.getsockname()[1]}/",
+                    deadline_seconds=0.3,
+                )
+        self.assertLess(perf_counter() - started_at, 2)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_after_repeated_failures_and_closes_after_a_probe(self):
+        circuit_breaker = CircuitBreaker(
+            "test", failure_threshold=2, reset_timeout_seconds=0
+        )
+        http_transport = transport(
+            requests.ConnectionError("refused"),
+            response(500),
+            response(200),
+            circuit_breaker=circuit_breaker,
+            max_attempts=1,
+        )
+        for _ in range(2):
+            try:
+                http_transport.request("GET", "http://upstream/repos")
+            except requests.ConnectionError:
+                pass
+        self.assertEqual(circuit_breaker.state, "half_open")
+
+        circuit_breaker.before_request()
+        # Only the one probe is let through
+        with self.assertRaises(CircuitOpenError):
+            circuit_breaker.before_request()
+        circuit_breaker.record_success()
+
+        self.assertEqual(circuit_breaker.state, "closed")
+        self.assertEqual(
+            http_transport.request("GET", "http://upstream/repos").status_code, 200
+        )
+
+    def test_open_circuit_fails_without_calling_the_upstream(self):
+        circuit_breaker = CircuitBreaker(
+            "test", failure_threshold=1, reset_timeout_seconds=60
+        )
+        http_transport = transport(
+            response(503), circuit_breaker=circuit_breaker, max_attempts=1
+        )
+        http_transport.request("GET", "http://upstream/repos")
+
+        with self.assertRaises(CircuitOpenError):
+            http_transport.request("GET", "http://upstream/repos")
+        self.assertEqual(circuit_breaker.state, "open")
+        self.assertEqual(http_transport.session.request.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+
+from flask import Flask
+
+from app.projects.repository_standards.db_models import db
+from app.projects.repository_standards.repositories.sync_run_repository import (
+    SyncRunRepository,
+)
+from app.projects.repository_standards.services.sync_run_service import (
+    SyncRunService,
+)
+
+
+class TestShardedSyncRun(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+        self.app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.sync_run_service = SyncRunService(SyncRunRepository(db.session))
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_shards_share_the_run_started_by_the_first_shard(self):
+        first = self.sync_run_service.join_or_start_sync_run(
+            "job-1", is_full_sync=True, shard_count=2
+        )
+        second = self.sync_run_service.join_or_start_sync_run(
+            "job-1", is_full_sync=False, shard_count=2
+        )
+
+        self.assertEqual(first.id, second.id)
+        self.assertTrue(second.is_full_sync)
+
+    def test_run_is_only_finished_once_every_shard_completes(self):
+        sync_run = self.sync_run_service.join_or_start_sync_run(
+            "job-1", is_full_sync=True, shard_count=2
+        )
+
+        self.assertFalse(self.sync_run_service.complete_shard(sync_run, 0))
+        # A retried shard does not count twice
+        self.assertFalse(self.sync_run_service.complete_shard(sync_run, 0))
+        self.assertTrue(self.sync_run_service.complete_shard(sync_run, 1))
+
+    def test_unsharded_runs_do_not_resume_sharded_runs(self):
+        sharded_run = self.sync_run_service.join_or_start_sync_run(
+            "job-1", is_full_sync=True, shard_count=2
+        )
+
+        sync_run = self.sync_run_service.resume_or_start_sync_run(
+            is_full_sync=True, resume_window_hours=12
+        )
+
+        self.assertNotEqual(sync_run.id, sharded_run.id)
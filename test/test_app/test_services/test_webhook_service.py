@@ -0,0 +1,236 @@
+import hashlib
+import hmac
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+from flask import Flask
+
+from app.projects.repository_standards.clients.github_client import GitHubApiError
+from app.projects.repository_standards.db_models import db
+from app.projects.repository_standards.models.repository_info import (
+    BasicRepositoryInfo,
+    RepositoryAccess,
+    RepositoryInfo,
+)
+from app.projects.repository_standards.repositories.webhook_delivery_repository import (
+    WebhookDeliveryRepository,
+)
+from app.projects.repository_standards.services.webhook_service import (
+    WebhookService,
+    is_valid_signature,
+)
+
+
+def repository_info(name: str, teams: list[str]) -> RepositoryInfo:
+    return RepositoryInfo(
+        basic=BasicRepositoryInfo(
+            name=name,
+            visibility="public",
+            description="",
+            default_branch_name="main",
+            license="mit",
+            delete_branch_on_merge=True,
+        ),
+        access=RepositoryAccess(
+            teams_with_admin=[], teams_with_admin_parents=[], teams=teams, teams_parents=[]
+        ),
+    )
+
+
+class TestIsValidSignature(unittest.TestCase):
+    def test_accepts_only_the_signature_of_the_body(self):
+        body = b'{"action": "edited"}'
+        signature = "sha256=" + hmac.new(b"secret", body, hashlib.sha256).hexdigest()
+
+        self.assertTrue(is_valid_signature("secret", body, signature))
+        self.assertFalse(is_valid_signature("other-secret", body, signature))
+        self.assertFalse(is_valid_signature("secret", b"{}", signature))
+        self.assertFalse(is_valid_signature("secret", body, None))
+        self.assertFalse(is_valid_signature(None, body, signature))
+
+
+class TestWebhookService(unittest.TestCase):
+    def setUp(self):
+        self.webhook_delivery_repository = MagicMock()
+        self.webhook_delivery_repository.add_delivery.return_value = True
+        self.asset_service = MagicMock()
+        self.owner_service = MagicMock()
+        self.relationships_service = MagicMock()
+        self.github_service = MagicMock()
+        self.webhook_service = WebhookService(
+            self.webhook_delivery_repository,
+            self.asset_service,
+            self.owner_service,
+            self.relationships_service,
+            self.github_service,
+        )
+
+    def test_repository_event_queues_only_that_repository(self):
+        result = self.webhook_service.handle(
+            "delivery-1",
+            "repository",
+            {"action": "edited", "repository": {"name": "repository-a"}},
+        )
+
+        self.assertEqual(result, "queued")
+        self.webhook_delivery_repository.add_pending_repositories.assert_called_once_with(
+            ["repository-a"]
+        )
+        # Nothing is fetched from GitHub while GitHub waits for the response
+        self.github_service.get_repository.assert_not_called()
+
+    def test_duplicate_delivery_is_not_processed_again(self):
+        self.webhook_delivery_repository.add_delivery.return_value = False
+
+        result = self.webhook_service.handle(
+            "delivery-1",
+            "repository",
+            {"action": "edited", "repository": {"name": "repository-a"}},
+        )
+
+        self.assertEqual(result, "duplicate")
+        self.webhook_delivery_repository.add_pending_repositories.assert_not_called()
+
+    def test_unknown_events_are_ignored(self):
+        result = self.webhook_service.handle("delivery-1", "star", {})
+
+        self.assertEqual(result, "ignored")
+        self.webhook_delivery_repository.add_delivery.assert_not_called()
+
+    def test_team_event_affects_the_repositories_the_team_has_access_to(self):
+        repository_c = MagicMock()
+        repository_c.name = "repository-c"
+        repository_a = MagicMock()
+        repository_a.name = "repository-a"
+        self.asset_service.get_repositories_by_teams.return_value = [
+            repository_c,
+            repository_a,
+        ]
+
+        repository_names = self.webhook_service.get_affected_repository_names(
+            "team", {"action": "edited", "team": {"slug": "team-a"}}
+        )
+
+        self.assertEqual(repository_names, ["repository-a", "repository-c"])
+        self.asset_service.get_repositories_by_teams.assert_called_once_with(
+            ["team-a"]
+        )
+        self.github_service.github_client.get_team_repositories.assert_not_called()
+
+    def test_renamed_repository_removes_the_old_asset(self):
+        self.webhook_service.handle(
+            "delivery-1",
+            "repository",
+            {
+                "action": "renamed",
+                "repository": {"name": "repository-new"},
+                "changes": {"repository": {"name": {"from": "repository-old"}}},
+            },
+        )
+
+        self.asset_service.remove_asset_by_name.assert_called_once_with(
+            "repository-old"
+        )
+        self.webhook_delivery_repository.add_pending_repositories.assert_called_once_with(
+            ["repository-new"]
+        )
+
+    def test_failed_delivery_is_forgotten_so_it_can_be_redelivered(self):
+        self.webhook_delivery_repository.add_pending_repositories.side_effect = (
+            RuntimeError("Database down")
+        )
+
+        with self.assertRaises(RuntimeError):
+            self.webhook_service.handle(
+                "delivery-1",
+                "repository",
+                {"action": "edited", "repository": {"name": "repository-a"}},
+            )
+
+        self.webhook_delivery_repository.delete_delivery.assert_called_once_with(
+            "delivery-1"
+        )
+
+    def test_pending_repositories_are_refreshed_and_dequeued(self):
+        requested_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        self.webhook_delivery_repository.find_pending_repositories.return_value = [
+            ("repository-a", requested_at),
+            ("repository-b", requested_at),
+            ("repository-c", requested_at),
+        ]
+        repository = repository_info("repository-a", ["team-a"])
+        self.github_service.get_repository.side_effect = [
+            repository,
+            RuntimeError("GitHub down"),
+            GitHubApiError("Not Found", 404),
+        ]
+
+        refreshed = self.webhook_service.refresh_pending_repositories()
+
+        self.assertEqual(refreshed, 2)
+        self.asset_service.update_asset_by_name.assert_called_once_with(
+            "repository-a", repository.to_dict()
+        )
+        self.relationships_service.update_relationships_for_repository.assert_called_once_with(
+            self.asset_service.update_asset_by_name.return_value,
+            repository,
+            self.owner_service.find_all.return_value,
+        )
+        self.asset_service.remove_asset_by_name.assert_called_once_with(
+            "repository-c"
+        )
+        # The failed refresh stays queued for the next run
+        self.assertEqual(
+            [
+                call.args
+                for call in self.webhook_delivery_repository.remove_pending_repository.call_args_list
+            ],
+            [("repository-a", requested_at), ("repository-c", requested_at)],
+        )
+
+
+class TestWebhookPendingRepositories(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+        self.app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        db.init_app(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.webhook_delivery_repository = WebhookDeliveryRepository(db.session)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_repository_queued_again_while_refreshing_stays_queued(self):
+        self.webhook_delivery_repository.add_pending_repositories(
+            ["repository-a", "repository-b", "repository-a"]
+        )
+        pending = self.webhook_delivery_repository.find_pending_repositories(10)
+        self.assertEqual(
+            sorted(name for name, _ in pending), ["repository-a", "repository-b"]
+        )
+
+        self.webhook_delivery_repository.add_pending_repositories(["repository-a"])
+        for repository_name, requested_at in pending:
+            self.webhook_delivery_repository.remove_pending_repository(
+                repository_name, requested_at
+            )
+
+        self.assertEqual(
+            [
+                name
+                for name, _ in self.webhook_delivery_repository.find_pending_repositories(
+                    10
+                )
+            ],
+            ["repository-a"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()